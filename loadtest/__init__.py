@@ -0,0 +1,5 @@
+"""
+End-to-end load test of Microservice 1 and Microservice 2 against local AWS stand-ins
+
+See loadtest/run.py for usage.
+"""
@@ -0,0 +1,72 @@
+"""
+Compare two load test reports written by loadtest.run --output
+
+Prints throughput and latency percentiles side by side with the relative
+change of the candidate against the baseline. Latency going down and
+throughput going up are improvements.
+
+Usage:
+    python -m loadtest.compare baseline.json candidate.json [--json]
+"""
+
+import argparse
+import json
+
+METRICS = (
+    ("http", "requests_per_second", "http req/s"),
+    ("http", "latency_ms.p50", "http p50 ms"),
+    ("http", "latency_ms.p95", "http p95 ms"),
+    ("http", "latency_ms.p99", "http p99 ms"),
+    ("end_to_end", "delivered_per_second", "e2e msg/s"),
+    ("end_to_end", "latency_ms.p50", "e2e p50 ms"),
+    ("end_to_end", "latency_ms.p95", "e2e p95 ms"),
+    ("end_to_end", "latency_ms.p99", "e2e p99 ms"),
+    ("end_to_end", "missing", "e2e missing"),
+)
+
+
+def _lookup(report: dict, section: str, path: str):
+    value = report.get(section, {})
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(baseline: dict, candidate: dict) -> list:
+    rows = []
+    for section, path, label in METRICS:
+        before = _lookup(baseline, section, path)
+        after = _lookup(candidate, section, path)
+        change = None
+        if before and after is not None:
+            change = round((after - before) / before * 100, 1)
+        rows.append({"metric": label, "baseline": before, "candidate": after, "change_percent": change})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="Report of the reference run")
+    parser.add_argument("candidate", help="Report of the run being evaluated")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    rows = compare(baseline, candidate)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"baseline  {baseline['run']['git_commit']}  {baseline['run']['started_at']}")
+    print(f"candidate {candidate['run']['git_commit']}  {candidate['run']['started_at']}")
+    print(f"{'metric':<14}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for row in rows:
+        change = "" if row["change_percent"] is None else f"{row['change_percent']:+.1f}%"
+        print(f"{row['metric']:<14}{str(row['baseline']):>12}{str(row['candidate']):>12}{change:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Open-loop HTTP load generator for POST /api/email
+
+Each generator process sends its share of the requests on a fixed schedule,
+whether or not earlier requests have completed. Latency is measured from the
+scheduled send time, so a server that falls behind shows up as latency rather
+than as a lower request rate (no coordinated omission).
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import List, NamedTuple
+
+import httpx
+
+WORDS = (
+    "the of and to in is for on that with as this be are by from at or an it "
+    "please review attached report meeting schedule quarterly budget update team "
+    "customer invoice payment order shipment delivery contract project deadline "
+    "thanks regards hello follow up question issue ticket status approval"
+).split()
+
+SIZE_SIGMA = 1.2  # Spread of the log-normal size distribution
+SIZE_MAX_BYTES = 1024 * 1024
+
+
+class LoadPlan(NamedTuple):
+    """What one generator process sends"""
+    base_url: str
+    token: str
+    run_id: str
+    process_index: int
+    processes: int
+    rate: float  # Requests per second across all processes
+    duration: float
+    start_at: float  # Wall-clock time at which every process starts
+    payload_bytes: int
+    payload_distribution: str  # fixed or lognormal
+    content_type: str  # json or msgpack
+    max_in_flight: int
+    seed: int
+
+
+class RequestResult(NamedTuple):
+    seq: int
+    status: int  # 0 when the request failed without a response
+    latency: float  # Seconds from the scheduled send time to the response
+    completed_at: float  # Wall-clock time of the response
+
+
+def content_size(rng: random.Random, plan: LoadPlan) -> int:
+    if plan.payload_distribution == "fixed":
+        return plan.payload_bytes
+    return max(64, min(SIZE_MAX_BYTES, int(rng.lognormvariate(0, SIZE_SIGMA) * plan.payload_bytes)))
+
+
+def make_email(rng: random.Random, run_id: str, seq: int, size: int) -> dict:
+    """An email whose subject identifies the request, so it can be matched in S3"""
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return {
+        "email_subject": f"{run_id}:{seq}",
+        "email_sender": f"user{rng.randint(1, 5000)}@example.com",
+        "email_timestream": str(int(time.time())),
+        "email_content": " ".join(words)[:size],
+    }
+
+
+def encode(payload: dict, content_type: str):
+    if content_type == "msgpack":
+        import msgpack
+        return msgpack.packb(payload), "application/msgpack"
+    return json.dumps(payload).encode(), "application/json"
+
+
+async def _send_all(plan: LoadPlan) -> List[RequestResult]:
+    rng = random.Random(plan.seed + plan.process_index)
+    total = int(plan.rate * plan.duration)
+    seqs = range(plan.process_index, total, plan.processes)
+    interval = plan.processes / plan.rate
+    in_flight = asyncio.Semaphore(plan.max_in_flight)
+    results: List[RequestResult] = []
+
+    limits = httpx.Limits(max_connections=plan.max_in_flight, max_keepalive_connections=plan.max_in_flight)
+    async with httpx.AsyncClient(base_url=plan.base_url, limits=limits, timeout=60) as client:
+        loop = asyncio.get_running_loop()
+        # Wall-clock start mapped onto the loop clock, offset per process to spread the schedule
+        start = loop.time() + max(0.0, plan.start_at - time.time()) + plan.process_index * interval / plan.processes
+
+        async def send(seq: int, scheduled: float, body: bytes, media_type: str) -> None:
+            async with in_flight:
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    response = await client.post("/api/email", content=body, headers={"Content-Type": media_type})
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+            results.append(RequestResult(seq, status, loop.time() - scheduled, time.time()))
+
+        tasks = []
+        for position, seq in enumerate(seqs):
+            scheduled = start + position * interval
+            payload = {"token": plan.token, "data": make_email(rng, plan.run_id, seq, content_size(rng, plan))}
+            body, media_type = encode(payload, plan.content_type)
+            delay = scheduled - loop.time() - 0.05
+            if delay > 0:
+                await asyncio.sleep(delay)  # Build payloads just ahead of their schedule
+            tasks.append(asyncio.create_task(send(seq, scheduled, body, media_type)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def run_plan(plan: LoadPlan) -> List[RequestResult]:
+    """Entry point of a generator process"""
+    return asyncio.run(_send_all(plan))
@@ -0,0 +1,223 @@
+"""
+End-to-end load test: HTTP -> Microservice 1 -> SQS -> Microservice 2 -> S3
+
+Starts a moto server (SQS, S3, SSM) in this process, Microservice 1 under
+gunicorn and one or more Microservice 2 consumers as subprocesses pointed at it,
+then drives POST /api/email at a fixed request rate from generator processes.
+Once the load phase ends it waits for every accepted email to land in S3.
+
+Reported (and written as JSON with --output):
+  http        requests, status counts, achieved rate and p50/p95/p99 latency
+              (measured from each request's scheduled send time)
+  end_to_end  enqueue-to-S3 time per email, from Microservice 1's response to
+              the S3 object's creation, with p50/p95/p99 and delivered rate
+
+moto is single-process Python and is usually the bottleneck before the
+services are, so absolute numbers are lower than in AWS; compare runs made on
+the same machine (python -m loadtest.compare).
+
+The consumer runs with SQS_WAIT_TIME=1 and SQS_POLL_INTERVAL=0 unless
+overridden with --ms2-env, so the run drains in reasonable time.
+
+Usage (from the repository root, with both services' requirements and
+loadtest/requirements.txt installed):
+    python -m loadtest.run [--rate 50] [--duration 20] [--payload-bytes 4096]
+                           [--payload-distribution lognormal] [--ms1-workers 1]
+                           [--consumers 1] [--output results.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import timezone
+from typing import Dict, List
+
+from loadtest.load import LoadPlan, RequestResult, run_plan
+from loadtest.stack import (
+    REPO_ROOT,
+    LocalAWS,
+    start_microservice1,
+    start_microservice2,
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank percentiles in milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {f"p{p}": round(ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] * 1000, 2)
+               for p in PERCENTILES}
+    summary["max"] = round(ordered[-1] * 1000, 2)
+    summary["mean"] = round(sum(ordered) / len(ordered) * 1000, 2)
+    return summary
+
+
+def _parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        env[name] = value
+    return env
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _wait_for_delivery(aws: LocalAWS, expected: int, timeout: float) -> Dict[str, object]:
+    deadline = time.monotonic() + timeout
+    objects = aws.stored_objects()
+    while len(objects) < expected and time.monotonic() < deadline:
+        time.sleep(0.25)
+        objects = aws.stored_objects()
+    return objects
+
+
+def _end_to_end(objects: Dict[str, object], run_id: str, accepted: Dict[int, RequestResult]) -> Dict[str, object]:
+    """Match S3 objects to requests by subject and compute enqueue-to-S3 times"""
+    latencies = []
+    stored_at = []
+    for key in objects.values():
+        subject = json.loads(key.value).get("email_subject", "")
+        prefix, _, seq = subject.partition(":")
+        if prefix != run_id or not seq.isdigit() or int(seq) not in accepted:
+            continue
+        created = key.last_modified.replace(tzinfo=timezone.utc).timestamp()
+        latencies.append(max(0.0, created - accepted[int(seq)].completed_at))
+        stored_at.append(created)
+
+    first_accepted = min((r.completed_at for r in accepted.values()), default=0.0)
+    span = (max(stored_at) - first_accepted) if stored_at else 0.0
+    return {
+        "delivered": len(latencies),
+        "missing": len(accepted) - len(latencies),
+        "delivered_per_second": round(len(latencies) / span, 1) if span > 0 else 0.0,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def run(args) -> dict:
+    run_id = uuid.uuid4().hex[:12]
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix="loadtest-")
+    os.makedirs(log_dir, exist_ok=True)
+    aws = LocalAWS()
+    aws.start()
+    services = []
+    try:
+        ms1 = start_microservice1(aws, args.ms1_workers, log_dir, _parse_env(args.ms1_env))
+        services.append(ms1)
+        ms2_env = {"SQS_WAIT_TIME": "1", "SQS_POLL_INTERVAL": "0", **_parse_env(args.ms2_env)}
+        services.extend(start_microservice2(aws, index, log_dir, ms2_env) for index in range(args.consumers))
+
+        plans = [
+            LoadPlan(
+                base_url=ms1.base_url, token=aws.token, run_id=run_id,
+                process_index=index, processes=args.load_processes,
+                rate=args.rate, duration=args.duration, start_at=time.time() + 2,
+                payload_bytes=args.payload_bytes, payload_distribution=args.payload_distribution,
+                content_type=args.content_type, max_in_flight=args.max_in_flight, seed=args.seed,
+            )
+            for index in range(args.load_processes)
+        ]
+        # spawn: this process runs moto's server threads, which must not be forked
+        with multiprocessing.get_context("spawn").Pool(args.load_processes) as pool:
+            results = [result for chunk in pool.map(run_plan, plans) for result in chunk]
+        for service in services:
+            service.check_alive()
+
+        accepted = {r.seq: r for r in results if r.status == 200}
+        objects = _wait_for_delivery(aws, len(accepted), args.drain_timeout)
+        end_to_end = _end_to_end(objects, run_id, accepted)
+        queue_depth = aws.queue_depth()
+    finally:
+        for service in services:
+            service.stop()
+        aws.stop()
+
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[str(r.status)] = statuses.get(str(r.status), 0) + 1
+    return {
+        "run": {
+            "run_id": run_id,
+            "git_commit": _git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(plans[0].start_at)),
+            "rate": args.rate,
+            "duration": args.duration,
+            "payload_bytes": args.payload_bytes,
+            "payload_distribution": args.payload_distribution,
+            "content_type": args.content_type,
+            "ms1_workers": args.ms1_workers,
+            "consumers": args.consumers,
+            "ms1_env": _parse_env(args.ms1_env),
+            "ms2_env": ms2_env,
+            "cpu_count": os.cpu_count(),
+            "log_dir": log_dir,
+        },
+        "http": {
+            "requests": len(results),
+            "status": statuses,
+            "requests_per_second": round(len(results) / args.duration, 1),
+            "latency_ms": percentiles([r.latency for r in results if r.status == 200]),
+        },
+        "end_to_end": {**end_to_end, "queue_depth_after": queue_depth},
+    }
+
+
+def print_summary(report: dict) -> None:
+    http, e2e = report["http"], report["end_to_end"]
+    print(f"HTTP        {http['requests']} requests, {http['requests_per_second']} req/s, status {http['status']}")
+    print(f"            latency ms {http['latency_ms']}")
+    print(f"End-to-end  {e2e['delivered']} delivered ({e2e['missing']} missing), {e2e['delivered_per_second']} msg/s")
+    print(f"            latency ms {e2e['latency_ms']}")
+    print(f"Service logs in {report['run']['log_dir']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load")
+    parser.add_argument("--payload-bytes", type=int, default=4096, help="email_content size (median for lognormal)")
+    parser.add_argument("--payload-distribution", choices=["fixed", "lognormal"], default="lognormal",
+                        help="Content size distribution")
+    parser.add_argument("--content-type", choices=["json", "msgpack"], default="json", help="Request body encoding")
+    parser.add_argument("--ms1-workers", type=int, default=1, help="Microservice 1 worker processes")
+    parser.add_argument("--consumers", type=int, default=1, help="Microservice 2 processes")
+    parser.add_argument("--ms1-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra Microservice 1 environment (repeatable)")
+    parser.add_argument("--ms2-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra Microservice 2 environment (repeatable)")
+    parser.add_argument("--load-processes", type=int, default=1, help="Load generator processes")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Concurrent requests per generator process")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Seconds to wait for delivery to S3")
+    parser.add_argument("--seed", type=int, default=42, help="Payload random seed")
+    parser.add_argument("--log-dir", help="Where service logs are written (default: a temporary directory)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the JSON report instead of a summary")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_summary(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Local pipeline for the load test: a moto server standing in for SQS, S3 and
+SSM, plus Microservice 1 and Microservice 2 running as subprocesses against it
+
+The services are unmodified: they reach moto through AWS_ENDPOINT_URL, which
+boto3 honours for every client. moto runs in this process so the harness can
+read S3 object timestamps (microsecond resolution) directly from its backend
+instead of polling the API.
+"""
+
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import boto3
+import httpx
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.s3.models import s3_backends
+from moto.server import ThreadedMotoServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGION = "eu-west-1"
+QUEUE_NAME = "loadtest-email-queue"
+BUCKET_NAME = "loadtest-email-bucket"
+TOKEN_PARAMETER = "/loadtest/api-token"
+EMAIL_PREFIX = "emails/"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalAWS:
+    """moto server with the queue, bucket and token parameter the services expect"""
+
+    def __init__(self):
+        self.port = free_port()
+        self.endpoint_url = f"http://127.0.0.1:{self.port}"
+        self.token = uuid.uuid4().hex
+        self.queue_url: Optional[str] = None
+        self._server = ThreadedMotoServer(ip_address="127.0.0.1", port=self.port, verbose=False)
+
+    def start(self) -> None:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        os.environ.update(self.credentials())
+        self._server.start()
+        client = self.client
+        client("ssm").put_parameter(Name=TOKEN_PARAMETER, Value=self.token, Type="SecureString")
+        self.queue_url = client("sqs").create_queue(QueueName=QUEUE_NAME)["QueueUrl"]
+        client("s3").create_bucket(Bucket=BUCKET_NAME, CreateBucketConfiguration={"LocationConstraint": REGION})
+
+    def stop(self) -> None:
+        self._server.stop()
+
+    def client(self, service_name: str):
+        return boto3.client(service_name, region_name=REGION, endpoint_url=self.endpoint_url)
+
+    def credentials(self) -> Dict[str, str]:
+        return {
+            "AWS_ACCESS_KEY_ID": "loadtest",
+            "AWS_SECRET_ACCESS_KEY": "loadtest",
+            "AWS_REGION": REGION,
+            "AWS_DEFAULT_REGION": REGION,
+        }
+
+    def service_env(self) -> Dict[str, str]:
+        """Environment pointing a service at this stand-in"""
+        return {**self.credentials(), "AWS_ENDPOINT_URL": self.endpoint_url}
+
+    def queue_depth(self) -> int:
+        attributes = self.client("sqs").get_queue_attributes(
+            QueueUrl=self.queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+        )["Attributes"]
+        return int(attributes["ApproximateNumberOfMessages"]) + int(attributes["ApproximateNumberOfMessagesNotVisible"])
+
+    def stored_objects(self, prefix: str = EMAIL_PREFIX) -> Dict[str, object]:
+        """S3 objects under ``prefix``, read from the moto backend (name -> key)"""
+        bucket = s3_backends[DEFAULT_ACCOUNT_ID]["global"].buckets[BUCKET_NAME]
+        while True:
+            try:
+                return {name: key for name, key in list(bucket.keys.items()) if name.startswith(prefix)}
+            except RuntimeError:
+                continue  # The store changed under us; moto serves requests on other threads
+
+
+class Service:
+    """A service subprocess with its output captured to a log file"""
+
+    def __init__(self, name: str, args: List[str], cwd: str, env: Dict[str, str], log_dir: str):
+        self.name = name
+        self.base_url: Optional[str] = None
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            args, cwd=cwd, env={**os.environ, **env}, stdout=self._log, stderr=subprocess.STDOUT
+        )
+
+    def stop(self, timeout: float = 30) -> None:
+        if self.process.poll() is None:
+            # SIGINT: the consumer loop treats it as a graceful shutdown, gunicorn as a quick one
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+
+    def check_alive(self) -> None:
+        if self.process.poll() is not None:
+            raise RuntimeError(f"{self.name} exited with {self.process.returncode}, see {self.log_path}")
+
+
+def start_microservice1(aws: LocalAWS, workers: int, log_dir: str, extra_env: Dict[str, str]) -> Service:
+    """Run Microservice 1 as in production (gunicorn, WEB_CONCURRENCY workers) and wait for /health"""
+    port = free_port()
+    env = {
+        **aws.service_env(),
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "SQS_QUEUE_URL": aws.queue_url,
+        "SSM_TOKEN_PARAMETER": TOKEN_PARAMETER,
+        "CLAIM_CHECK_BUCKET": BUCKET_NAME,
+        "LOG_LEVEL": "WARNING",
+        **extra_env,
+    }
+    service = Service(
+        "microservice1",
+        [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py"],
+        cwd=os.path.join(REPO_ROOT, "microservice1"), env=env, log_dir=log_dir,
+    )
+    service.base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        service.check_alive()
+        try:
+            if httpx.get(f"{service.base_url}/health").status_code == 200:
+                return service
+        except httpx.TransportError:
+            time.sleep(0.2)
+    service.stop()
+    raise RuntimeError(f"microservice1 did not become ready, see {service.log_path}")
+
+
+def start_microservice2(aws: LocalAWS, index: int, log_dir: str, extra_env: Dict[str, str]) -> Service:
+    """Run one Microservice 2 consumer process"""
+    env = {
+        **aws.service_env(),
+        "SQS_QUEUE_URL": aws.queue_url,
+        "S3_BUCKET_NAME": BUCKET_NAME,
+        "LOG_LEVEL": "WARNING",
+        **extra_env,
+    }
+    return Service(
+        f"microservice2-{index}",
+        [sys.executable, "-m", "app.main"],
+        cwd=os.path.join(REPO_ROOT, "microservice2"), env=env, log_dir=log_dir,
+    )
@@ -0,0 +1,206 @@
+"""
+Admission control for the ingest endpoints: a global concurrency limit with a
+bounded wait queue and per-sender token-bucket rate limits
+
+Both checks are meant to run before any SSM or SQS work so that overload is
+answered with a cheap 503/429 instead of piling requests up in the task.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional
+
+
+class Overloaded(Exception):
+    """The request was shed; ``retry_after`` is the suggested back-off in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionStats:
+    """Counters describing admitted and shed requests"""
+
+    def __init__(self):
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_queue_timeout = 0
+        self.rate_limited = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_queue_timeout": self.shed_queue_timeout,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class ConcurrencyLimiter:
+    """
+    Lets at most ``max_concurrent`` requests run at once.
+
+    Up to ``max_queue`` more wait (FIFO) for at most ``queue_timeout`` seconds;
+    beyond that, ``slot()`` raises ``Overloaded`` immediately. A
+    ``max_concurrent`` of 0 disables the limit. Must be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: float = 1.0,
+        stats: Optional[AdmissionStats] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.stats = stats or AdmissionStats()
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        """True when every slot is taken and the queue is full, so new requests are shed"""
+        return 0 < self.max_concurrent <= self.active and len(self._waiters) >= self.max_queue
+
+    async def acquire(self) -> None:
+        if self.max_concurrent <= 0:
+            self.active += 1
+            return
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.stats.shed_queue_full += 1
+            raise Overloaded("queue_full", self.retry_after)
+
+        self.stats.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Shielded so a timeout cannot race a slot being handed over
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # The slot arrived as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.stats.shed_queue_timeout += 1
+            raise Overloaded("queue_timeout", self.retry_after)
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest waiter so newcomers cannot overtake it
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        self.stats.admitted += 1
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class TokenBucket:
+    """Classic token bucket refilled at ``rate`` tokens per second up to ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = now
+
+    def take(self, now: float) -> float:
+        """Consume one token; return 0 on success or the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SenderRateLimiter:
+    """
+    Per-sender token buckets, bounded to the ``max_senders`` most recently seen
+    senders. A ``rate`` of 0 disables the limit.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_senders: int = 10000,
+        stats: Optional[AdmissionStats] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_senders = max_senders
+        self.stats = stats or AdmissionStats()
+        self._clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, sender: str) -> None:
+        """
+        Raises:
+            Overloaded: if ``sender`` has used up its budget
+        """
+        if not self.enabled:
+            return
+        now = self._clock()
+        key = sender.strip().lower()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_senders:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        wait = bucket.take(now)
+        if wait > 0:
+            self.stats.rate_limited += 1
+            raise Overloaded("sender_rate_limited", wait)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After takes whole seconds; never advertise less than one"""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,97 @@
+"""
+Request body decoding for the email endpoints, selected by Content-Type
+
+JSON bodies are parsed and validated in one pass by pydantic-core
+(``model_validate_json``). MessagePack and CBOR bodies are decoded into plain
+Python objects and then validated with ``model_validate``, so every format goes
+through the same ``EmailData`` rules. Bodies with any other (or no)
+Content-Type are read as JSON, as before.
+
+msgpack and cbor2 are optional: when a library is missing its content type is
+answered with 415 instead of being decoded.
+"""
+
+from typing import Any, Callable, Dict, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # MessagePack support is optional
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # CBOR support is optional
+    cbor2 = None
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+CONTENT_TYPE_CBOR = "application/cbor"
+
+# Other names producers use for the same formats
+_ALIASES = {
+    "application/x-msgpack": CONTENT_TYPE_MSGPACK,
+    "application/vnd.msgpack": CONTENT_TYPE_MSGPACK,
+}
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class UnsupportedBodyType(Exception):
+    """The Content-Type names a binary format this process cannot decode"""
+
+
+class BodyDecodeError(ValueError):
+    """The body is not valid for its Content-Type"""
+
+
+def _decode_msgpack(body: bytes) -> Any:
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except (ValueError, TypeError, msgpack.UnpackException) as e:
+        raise BodyDecodeError(f"Invalid MessagePack body: {e}")
+
+
+def _decode_cbor(body: bytes) -> Any:
+    try:
+        return cbor2.loads(body)
+    except (ValueError, TypeError, cbor2.CBORDecodeError) as e:
+        raise BodyDecodeError(f"Invalid CBOR body: {e}")
+
+
+_DECODERS: Dict[str, Optional[Callable[[bytes], Any]]] = {
+    CONTENT_TYPE_MSGPACK: _decode_msgpack if msgpack is not None else None,
+    CONTENT_TYPE_CBOR: _decode_cbor if cbor2 is not None else None,
+}
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """The bare, lower-cased media type of a Content-Type header"""
+    if not content_type:
+        return ""
+    media = content_type.split(";", 1)[0].strip().lower()
+    return _ALIASES.get(media, media)
+
+
+def supported_content_types() -> tuple:
+    """Request body types accepted in this process, JSON first"""
+    return (CONTENT_TYPE_JSON,) + tuple(media for media, decoder in _DECODERS.items() if decoder is not None)
+
+
+def validate_body(model: Type[Model], body: bytes, content_type: Optional[str]) -> Model:
+    """
+    Decode ``body`` according to ``content_type`` and validate it as ``model``.
+
+    Raises:
+        UnsupportedBodyType: for a binary format whose library is not installed
+        BodyDecodeError: if the body cannot be decoded
+        pydantic.ValidationError: if the decoded document is not a valid ``model``
+    """
+    media = media_type(content_type)
+    if media not in _DECODERS:
+        return model.model_validate_json(body)
+    decoder = _DECODERS[media]
+    if decoder is None:
+        raise UnsupportedBodyType(f"{media} is not supported")
+    return model.model_validate(decoder(body))
@@ -0,0 +1,88 @@
+"""
+Circuit breaker for calls to a degraded dependency (SQS publishing)
+
+After ``failure_threshold`` consecutive failures the circuit opens and callers
+stop calling the dependency for ``reset_timeout`` seconds. The circuit then
+goes half-open and lets a single probe call through: success closes it,
+failure opens it again. Calls slower than ``slow_call_threshold`` count as
+failures, so a dependency that still answers but too slowly also trips it.
+"""
+
+import time
+from typing import Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. A ``failure_threshold`` of 0 disables
+    it (the circuit never opens). Must be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        slow_call_threshold: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self.transitions: Dict[str, int] = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now. In the half-open state only one probe
+        is let through at a time; a probe that never reports back (e.g. it was
+        cancelled) is replaced after ``reset_timeout``.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        now = self._clock()
+        if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record(self, ok: bool, elapsed: float = 0.0) -> None:
+        """Report the outcome of a call made after ``allow()`` returned True"""
+        if ok and not (self.slow_call_threshold > 0 and elapsed > self.slow_call_threshold):
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+            return
+
+        self._failures += 1
+        if self._state == HALF_OPEN or (
+            self._state == CLOSED and 0 < self.failure_threshold <= self._failures
+        ):
+            self._opened_at = self._clock()
+            self._transition(OPEN)
+
+    def reset(self) -> None:
+        self._state = CLOSED
+        self._failures = 0
+        self._probe_started_at = None
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._probe_started_at = None
+        self.transitions[state] += 1
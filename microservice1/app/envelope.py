@@ -0,0 +1,138 @@
+"""
+Versioned SQS message envelope shared by Microservice 1 and Microservice 2
+
+The message body is the JSON email document, optionally compressed. The codec
+and envelope version travel as SQS message attributes, so messages without
+attributes (older producers) are read as plain JSON.
+
+This module is kept identical in microservice1/app and microservice2/app.
+"""
+
+import base64
+import gzip
+from typing import Dict, NamedTuple, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+ENVELOPE_VERSION = "1"
+ATTR_VERSION = "EnvelopeVersion"
+ATTR_ENCODING = "ContentEncoding"
+
+CODEC_IDENTITY = "identity"
+CODEC_GZIP = "gzip"
+CODEC_ZSTD = "zstd"
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class EnvelopeError(ValueError):
+    """The message envelope is malformed or uses an unsupported codec"""
+
+
+class EncodedMessage(NamedTuple):
+    """An SQS message body with its envelope attributes"""
+    body: str
+    attributes: Dict[str, dict]
+
+    @property
+    def size(self) -> int:
+        """Bytes counted against the SQS message size limit (body plus attributes)"""
+        size = len(self.body.encode("utf-8"))
+        for name, attribute in self.attributes.items():
+            size += len(name) + len(attribute["DataType"]) + len(attribute["StringValue"].encode("utf-8"))
+        return size
+
+    @property
+    def codec(self) -> str:
+        return self.attributes.get(ATTR_ENCODING, {}).get("StringValue", CODEC_IDENTITY)
+
+    @classmethod
+    def identity(cls, body: str) -> "EncodedMessage":
+        """Wrap an uncompressed JSON body"""
+        return cls(body, _attributes(CODEC_IDENTITY))
+
+
+def available_codecs() -> tuple:
+    """Codecs usable in this process"""
+    if zstandard is not None:
+        return (CODEC_IDENTITY, CODEC_GZIP, CODEC_ZSTD)
+    return (CODEC_IDENTITY, CODEC_GZIP)
+
+
+def _attributes(codec: str) -> Dict[str, dict]:
+    return {
+        ATTR_VERSION: {"DataType": "Number", "StringValue": ENVELOPE_VERSION},
+        ATTR_ENCODING: {"DataType": "String", "StringValue": codec},
+    }
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_GZIP:
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise EnvelopeError("zstd codec requested but the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise EnvelopeError(f"Unsupported codec: {codec}")
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_GZIP:
+        return gzip.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise EnvelopeError("zstd message received but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise EnvelopeError(f"Unsupported codec: {codec}")
+
+
+def encode_message(
+    body: Union[str, bytes],
+    codec: str = CODEC_GZIP,
+    threshold: int = 1024,
+) -> EncodedMessage:
+    """
+    Build the envelope for a serialised JSON document.
+
+    Bodies of ``threshold`` bytes or more are compressed with ``codec`` and
+    base64-encoded (SQS bodies must be text). The compressed form is only used
+    when it is actually smaller than the original.
+    """
+    raw = body.encode("utf-8") if isinstance(body, str) else body
+    if codec != CODEC_IDENTITY and len(raw) >= threshold:
+        packed = base64.b64encode(_compress(raw, codec))
+        if len(packed) < len(raw):
+            return EncodedMessage(packed.decode("ascii"), _attributes(codec))
+    return EncodedMessage(raw.decode("utf-8") if isinstance(body, bytes) else body, _attributes(CODEC_IDENTITY))
+
+
+def decode_message(body: str, attributes: Optional[Dict[str, dict]] = None) -> str:
+    """
+    Return the JSON document carried by an SQS message.
+
+    Args:
+        body: SQS message body
+        attributes: SQS MessageAttributes of the message, if any
+    """
+    attributes = attributes or {}
+    version = attributes.get(ATTR_VERSION, {}).get("StringValue", ENVELOPE_VERSION)
+    if version != ENVELOPE_VERSION:
+        raise EnvelopeError(f"Unsupported envelope version: {version}")
+
+    codec = attributes.get(ATTR_ENCODING, {}).get("StringValue", CODEC_IDENTITY)
+    if codec == CODEC_IDENTITY:
+        return body
+    try:
+        packed = base64.b64decode(body, validate=True)
+    except ValueError as e:
+        raise EnvelopeError(f"Invalid base64 body for codec {codec}: {e}")
+    try:
+        return _decompress(packed, codec).decode("utf-8")
+    except EnvelopeError:
+        raise
+    except Exception as e:
+        raise EnvelopeError(f"Could not decode {codec} body: {e}")
@@ -0,0 +1,69 @@
+"""
+Bounded thread pool for blocking AWS SDK calls made from async handlers
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor already has the maximum number of calls in flight"""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking callables on a dedicated thread pool without blocking the event loop.
+
+    At most ``max_workers`` calls run concurrently and at most ``max_pending`` more
+    may wait for a thread. Beyond that, ``run`` fails fast with ``ExecutorSaturated``
+    so callers can shed load instead of queueing without bound.
+    """
+
+    def __init__(self, max_workers: int = 32, max_pending: int = 256, name: str = "aws"):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_pending
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise ExecutorSaturated(
+                    f"{self._in_flight} calls in flight (capacity {self.capacity})"
+                )
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result"""
+        self._acquire()
+        # Run in a copy of the caller's context (like asyncio.to_thread) so
+        # request-scoped context variables are visible to the blocking call
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        try:
+            future = self._pool.submit(call)
+        except BaseException:
+            self._release()
+            raise
+        # Release when the thread finishes, even if the awaiting request was cancelled
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
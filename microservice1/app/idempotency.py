@@ -0,0 +1,150 @@
+"""
+Idempotency-Key support: replay the original response for retried requests
+instead of publishing them again
+"""
+
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different payload"""
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    response: Any
+
+
+class IdempotencyBackend(ABC):
+    """
+    Storage for completed responses, shared by every request of the process.
+
+    Implementations must be safe to call from several threads. A shared store
+    (e.g. Redis) can implement the same three methods to deduplicate across tasks.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[StoredResponse]:
+        """The response stored under ``key``, or None if absent or expired"""
+
+    @abstractmethod
+    def put(self, key: str, value: StoredResponse) -> None:
+        """Store the response for ``key``, replacing any previous one"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every stored response"""
+
+
+class InMemoryBackend(IdempotencyBackend):
+    """Bounded LRU cache whose entries expire ``ttl`` seconds after being stored"""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: StoredResponse) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def create_backend(name: str, max_entries: int, ttl: float) -> IdempotencyBackend:
+    """Build the backend selected by configuration"""
+    if name == "memory":
+        return InMemoryBackend(max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unknown idempotency backend: {name}")
+
+
+def fingerprint(data: bytes) -> str:
+    """Stable hash of a request payload"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class IdempotencyCache:
+    """
+    Runs a request handler at most once per key within the backend's TTL.
+
+    - A completed response is replayed for later requests with the same key.
+    - Concurrent duplicates wait for the in-flight request instead of racing it.
+    - Failures are not stored, so the client can retry.
+    """
+
+    def __init__(self, backend: IdempotencyBackend):
+        self.backend = backend
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def run(
+        self,
+        key: str,
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Return ``(response, replayed)`` for the request identified by ``key``.
+
+        Raises:
+            IdempotencyConflict: if ``key`` was used with a different payload
+        """
+        stored = self.backend.get(key)
+        if stored is not None:
+            if stored.fingerprint != request_fingerprint:
+                raise IdempotencyConflict(key)
+            return stored.response, True
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            stored = await asyncio.shield(pending)
+            if stored.fingerprint != request_fingerprint:
+                raise IdempotencyConflict(key)
+            return stored.response, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await handler()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.set_exception(RuntimeError("Original request was cancelled"))
+            else:
+                future.set_exception(e)
+            # Waiters receive the exception; mark it retrieved when nobody waited
+            future.exception()
+            raise
+        else:
+            stored = StoredResponse(request_fingerprint, response)
+            self.backend.put(key, stored)
+            future.set_result(stored)
+            return response, False
+        finally:
+            del self._in_flight[key]
@@ -3,38 +3,176 @@ Microservice 1 - REST API
 Receives requests from ELB, validates token and payload, publishes to SQS
 """
 
-from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel, Field, field_validator
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, ValidationInfo, field_validator
 import os
+import asyncio
 import logging
 import boto3
-import json
-from typing import Optional
-from botocore.exceptions import ClientError
+import hmac
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Union
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from app.envelope import CODEC_GZIP, CODEC_IDENTITY, EncodedMessage, available_codecs, encode_message
+from app import fast_json
+from app.body_codecs import BodyDecodeError, UnsupportedBodyType, supported_content_types, validate_body
+from app.admission import (
+    AdmissionStats,
+    ConcurrencyLimiter,
+    Overloaded,
+    SenderRateLimiter,
+    retry_after_header,
 )
+from app.circuit_breaker import OPEN, CircuitBreaker
+from app.executor import BoundedExecutor, ExecutorSaturated
+from app import metrics
+from app.log_config import SampledLogger, setup_logging
+from app.idempotency import IdempotencyCache, IdempotencyConflict, create_backend, fingerprint
+from app.request_timing import RequestTimingMiddleware, stage
+from app.spool import DiskSpool, SpoolDrainer, SpoolFull, SpoolStats
+from app.ndjson_ingest import ingest_ndjson
+from app.readiness import ReadinessChecker
+from app.sqs_batcher import SQS_MAX_BATCH_BYTES, SQSBatcher, SQSPublishError, split_into_batches
+from app.token_cache import TokenCache
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Root log level
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json or text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered before new ones are dropped
+LOG_MESSAGE_RATE_LIMIT = float(os.getenv("LOG_MESSAGE_RATE_LIMIT", "10"))  # Per-request INFO lines per second (0 = unlimited)
+LOG_MESSAGE_SAMPLE_RATE = float(os.getenv("LOG_MESSAGE_SAMPLE_RATE", "1.0"))  # Fraction of per-request INFO lines kept
+
+
+
+def configure_logging(force: bool = False) -> None:
+    """Set up queue-based logging; called again in each forked worker (``force``)"""
+    setup_logging("microservice1", level=LOG_LEVEL, fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE, force=force)
+
+
+configure_logging()
 logger = logging.getLogger(__name__)
+# Per-request INFO lines, rate limited and sampled so they stay cheap under load
+request_log = SampledLogger(logger, rate_limit=LOG_MESSAGE_RATE_LIMIT, sample_rate=LOG_MESSAGE_SAMPLE_RATE)
 
 app = FastAPI(title="Microservice 1 - REST API", version="1.0.0")
+app.add_middleware(
+    metrics.MetricsMiddleware,
+    endpoints=("/api/email", "/api/email/batch", "/api/email/stream", "/health", "/ready", "/metrics")
+)
 
 # AWS clients
 ssm_client = None
 sqs_client = None
+s3_client = None
+aws_executor = None
+sqs_batcher = None
+message_spool = None
+spool_drainer = None
+readiness_checker = None
 
 # Environment variables
 AWS_REGION = os.getenv("AWS_REGION", "eu-west-1")
 SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
 SSM_TOKEN_PARAMETER = os.getenv("SSM_TOKEN_PARAMETER")
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))  # Seconds a cached token is served
+TOKEN_CACHE_REFRESH_AHEAD = float(os.getenv("TOKEN_CACHE_REFRESH_AHEAD", "0.8"))  # Fraction of TTL before background refresh
+TOKEN_ROTATION_GRACE = float(os.getenv("TOKEN_ROTATION_GRACE", "300"))  # Seconds the previous token stays valid
+AWS_EXECUTOR_WORKERS = int(os.getenv("AWS_EXECUTOR_WORKERS", "32"))  # Threads for blocking AWS calls
+AWS_EXECUTOR_MAX_PENDING = int(os.getenv("AWS_EXECUTOR_MAX_PENDING", "256"))  # Calls allowed to wait for a thread
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", str(AWS_EXECUTOR_WORKERS)))  # HTTP connections per client
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "2"))  # Seconds to establish a connection
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "10"))  # Seconds to wait for a response
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")  # botocore retry mode: legacy, standard or adaptive
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))  # Attempts per AWS call, including the first
+AWS_WARMUP_ENABLED = os.getenv("AWS_WARMUP_ENABLED", "true").lower() == "true"  # Open connections at startup
+AWS_WARMUP_CONNECTIONS = int(os.getenv("AWS_WARMUP_CONNECTIONS", "4"))  # Concurrent SQS connections opened at startup
+SQS_BATCHING_ENABLED = os.getenv("SQS_BATCHING_ENABLED", "false").lower() == "true"  # Coalesce publishes into batches
+SQS_BATCH_LINGER_MS = float(os.getenv("SQS_BATCH_LINGER_MS", "5"))  # Max wait for a batch to fill
+SQS_BATCH_MAX_SIZE = int(os.getenv("SQS_BATCH_MAX_SIZE", "10"))  # Entries per batch (SQS max 10)
+SQS_BATCH_MAX_BYTES = int(os.getenv("SQS_BATCH_MAX_BYTES", str(256 * 1024)))  # Payload bytes per batch (SQS max 256 KB)
+SQS_BATCH_MAX_CONCURRENT_FLUSHES = int(os.getenv("SQS_BATCH_MAX_CONCURRENT_FLUSHES", "8"))  # Batches in flight
+SQS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("SQS_CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures that open the circuit (0 = off)
+SQS_CIRCUIT_RESET_TIMEOUT = float(os.getenv("SQS_CIRCUIT_RESET_TIMEOUT", "10"))  # Seconds open before a probe is let through
+SQS_CIRCUIT_SLOW_CALL_MS = float(os.getenv("SQS_CIRCUIT_SLOW_CALL_MS", "2000"))  # Sends slower than this count as failures (0 = off)
+SPOOL_DIR = os.getenv("SPOOL_DIR")  # Directory for the local spool (spooling disabled when unset)
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(1024 * 1024 * 1024)))  # Spool size before new messages get 503
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(16 * 1024 * 1024)))  # Size at which a spool file is sealed
+SPOOL_FSYNC_INTERVAL_MS = float(os.getenv("SPOOL_FSYNC_INTERVAL_MS", "2"))  # Max wait to group appends into one fsync
+SPOOL_DRAIN_INTERVAL_MS = float(os.getenv("SPOOL_DRAIN_INTERVAL_MS", "1000"))  # Pause between replay attempts when idle
+SPOOL_SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SPOOL_SHUTDOWN_DRAIN_TIMEOUT", "20"))  # Seconds to replay the spool on shutdown (0 = off)
+READY_PROBE_INTERVAL = float(os.getenv("READY_PROBE_INTERVAL", "15"))  # Seconds between SSM/SQS readiness probes (0 = off)
+READY_PROBE_TTL = float(os.getenv("READY_PROBE_TTL", "45"))  # Age after which a probe result no longer counts
+READY_PROBE_TIMEOUT = float(os.getenv("READY_PROBE_TIMEOUT", "2"))  # Seconds before a probe counts as failed
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "5"))  # Seconds between each worker's runtime metrics updates
+EMAIL_BATCH_MAX_ITEMS = int(os.getenv("EMAIL_BATCH_MAX_ITEMS", "500"))  # Items per /api/email/batch request
+EMAIL_BATCH_MAX_BYTES = int(os.getenv("EMAIL_BATCH_MAX_BYTES", str(5 * 1024 * 1024)))  # Body size of /api/email/batch
+EMAIL_STREAM_MAX_IN_FLIGHT = int(os.getenv("EMAIL_STREAM_MAX_IN_FLIGHT", "8"))  # SQS batches in flight per stream
+EMAIL_STREAM_MAX_LINE_BYTES = int(os.getenv("EMAIL_STREAM_MAX_LINE_BYTES", str(256 * 1024)))  # Max NDJSON record size
+EMAIL_STREAM_MAX_REPORTED_ERRORS = int(os.getenv("EMAIL_STREAM_MAX_REPORTED_ERRORS", "1000"))  # Rejected lines listed in summary
+CLAIM_CHECK_BUCKET = os.getenv("CLAIM_CHECK_BUCKET")  # Bucket for oversized email bodies (claim check disabled when unset)
+CLAIM_CHECK_THRESHOLD_BYTES = int(os.getenv("CLAIM_CHECK_THRESHOLD_BYTES", str(200 * 1024)))  # Offload messages above this size
+CLAIM_CHECK_PREFIX = os.getenv("CLAIM_CHECK_PREFIX", "claim-checks/")  # Key prefix for offloaded bodies
+ENVELOPE_CODEC = os.getenv("ENVELOPE_CODEC", CODEC_IDENTITY)  # identity, gzip or zstd (only once every consumer decodes it)
+ENVELOPE_COMPRESS_THRESHOLD_BYTES = int(os.getenv("ENVELOPE_COMPRESS_THRESHOLD_BYTES", "1024"))  # Compress messages from this size
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "128"))  # Concurrent /api/email requests (0 = unlimited)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))  # Requests allowed to wait for a slot
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))  # Max wait for a slot before 503
+SENDER_RATE_LIMIT = float(os.getenv("SENDER_RATE_LIMIT", "0"))  # Emails per second per email_sender (0 = unlimited)
+SENDER_RATE_BURST = float(os.getenv("SENDER_RATE_BURST", "20"))  # Emails a sender may send in a burst
+SENDER_RATE_MAX_TRACKED = int(os.getenv("SENDER_RATE_MAX_TRACKED", "10000"))  # Senders with a live token bucket
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"  # Return stage timings in Server-Timing
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))  # Log slower requests with their breakdown (0 = off)
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"  # Honour Idempotency-Key headers
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")  # Where completed responses are stored
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "3600"))  # Seconds a response is replayed
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))  # LRU bound of the in-memory backend
+IDEMPOTENCY_DERIVE_KEY = os.getenv("IDEMPOTENCY_DERIVE_KEY", "false").lower() == "true"  # Hash the payload when no header is sent
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+BODY_CONTENT_TYPES = supported_content_types()  # JSON, plus MessagePack/CBOR when their libraries are installed
+
+if ENVELOPE_CODEC not in available_codecs():
+    logger.warning(f"Envelope codec '{ENVELOPE_CODEC}' is not available, falling back to {CODEC_GZIP}")
+    ENVELOPE_CODEC = CODEC_GZIP
+
+if SERVER_TIMING_ENABLED or SLOW_REQUEST_THRESHOLD_MS > 0:
+    app.add_middleware(
+        RequestTimingMiddleware,
+        server_timing=SERVER_TIMING_ENABLED,
+        slow_request_seconds=SLOW_REQUEST_THRESHOLD_MS / 1000
+    )
+
+
+# boto3's default session is not thread-safe; clients are built under this lock
+_client_lock = threading.Lock()
+
+
+def _client_config() -> Config:
+    """botocore config: pool sized for the executor, bounded timeouts, configurable retries"""
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        retries={"mode": AWS_RETRY_MODE, "max_attempts": AWS_MAX_ATTEMPTS},
+        tcp_keepalive=True
+    )
+
+
+def _create_client(service_name: str):
+    return boto3.session.Session().client(service_name, region_name=AWS_REGION, config=_client_config())
 
 
 def get_ssm_client():
     """Get or create SSM client"""
     global ssm_client
     if ssm_client is None:
-        ssm_client = boto3.client("ssm", region_name=AWS_REGION)
+        with _client_lock:
+            if ssm_client is None:
+                ssm_client = _create_client("ssm")
     return ssm_client
 
 
@@ -42,10 +180,92 @@ def get_sqs_client():
     """Get or create SQS client"""
     global sqs_client
     if sqs_client is None:
-        sqs_client = boto3.client("sqs", region_name=AWS_REGION)
+        with _client_lock:
+            if sqs_client is None:
+                sqs_client = _create_client("sqs")
     return sqs_client
 
 
+def get_s3_client():
+    """Get or create S3 client"""
+    global s3_client
+    if s3_client is None:
+        with _client_lock:
+            if s3_client is None:
+                s3_client = _create_client("s3")
+    return s3_client
+
+
+def _warm_up(description: str, call) -> None:
+    """
+    Make one cheap AWS call so the TLS connection is open before traffic arrives.
+    An error response (e.g. AccessDenied) still leaves the connection pooled.
+    """
+    try:
+        call()
+    except ClientError as e:
+        logger.info(f"Warm-up {description} returned {e.response.get('Error', {}).get('Code')}, connection is open")
+    except Exception as e:
+        logger.warning(f"Warm-up {description} failed: {e}")
+
+
+async def init_aws_clients() -> None:
+    """
+    Build every AWS client before the first request and, when AWS_WARMUP_ENABLED,
+    open their connections: SSM (also priming the token cache), SQS with
+    AWS_WARMUP_CONNECTIONS concurrent calls, and the claim-check bucket.
+    """
+    get_ssm_client()
+    get_sqs_client()
+    get_s3_client()
+    if not AWS_WARMUP_ENABLED:
+        return
+    
+    warm_ups = []
+    if SSM_TOKEN_PARAMETER:
+        warm_ups.append(run_blocking(_warm_up, "SSM token", token_cache.get))
+    if SQS_QUEUE_URL:
+        warm_ups.extend(
+            run_blocking(_warm_up, "SQS", lambda: get_sqs_client().get_queue_attributes(
+                QueueUrl=SQS_QUEUE_URL, AttributeNames=["QueueArn"]
+            ))
+            for _ in range(max(AWS_WARMUP_CONNECTIONS, 1))
+        )
+    if CLAIM_CHECK_BUCKET:
+        warm_ups.append(run_blocking(_warm_up, "S3", lambda: get_s3_client().get_bucket_location(
+            Bucket=CLAIM_CHECK_BUCKET
+        )))
+    await asyncio.gather(*warm_ups)
+    logger.info(f"AWS clients ready ({len(warm_ups)} warm-up call(s))")
+
+
+def get_aws_executor() -> BoundedExecutor:
+    """Get or create the executor used for blocking AWS calls"""
+    global aws_executor
+    if aws_executor is None:
+        aws_executor = BoundedExecutor(
+            max_workers=AWS_EXECUTOR_WORKERS,
+            max_pending=AWS_EXECUTOR_MAX_PENDING
+        )
+    return aws_executor
+
+
+async def run_blocking(fn, *args):
+    """
+    Run a blocking AWS call on the bounded executor.
+    Responds 503 instead of queueing when the executor is saturated.
+    """
+    try:
+        return await get_aws_executor().run(fn, *args)
+    except ExecutorSaturated as e:
+        logger.warning(f"AWS executor saturated: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Service is overloaded, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+
 def get_token_from_ssm() -> str:
     """
     Retrieve the API token from SSM Parameter Store
@@ -55,10 +275,11 @@ def get_token_from_ssm() -> str:
     
     try:
         ssm = get_ssm_client()
-        response = ssm.get_parameter(
-            Name=SSM_TOKEN_PARAMETER,
-            WithDecryption=True
-        )
+        with stage("ssm_fetch", metrics.STAGE_SSM_FETCH):
+            response = ssm.get_parameter(
+                Name=SSM_TOKEN_PARAMETER,
+                WithDecryption=True
+            )
         return response["Parameter"]["Value"]
     except ClientError as e:
         logger.error(f"Error retrieving token from SSM: {e}")
@@ -68,25 +289,74 @@ def get_token_from_ssm() -> str:
         )
 
 
+# Cached copy of the SSM token; the lambda keeps get_token_from_ssm patchable in tests
+token_cache = TokenCache(
+    fetch=lambda: get_token_from_ssm().strip(),
+    ttl=TOKEN_CACHE_TTL,
+    refresh_ahead=TOKEN_CACHE_REFRESH_AHEAD,
+    rotation_grace=TOKEN_ROTATION_GRACE,
+)
+
+
+def _token_matches(token_clean: str) -> bool:
+    """Constant-time comparison against every currently accepted token"""
+    provided = token_clean.encode("utf-8")
+    return any(
+        hmac.compare_digest(provided, accepted.encode("utf-8"))
+        for accepted in token_cache.accepted()
+    )
+
+
+# Admission control for /api/email (and its batch and stream forms), applied before any SSM or SQS work
+admission_stats = AdmissionStats()
+admission_limiter = ConcurrencyLimiter(
+    max_concurrent=ADMISSION_MAX_CONCURRENT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    stats=admission_stats
+)
+sender_rate_limiter = SenderRateLimiter(
+    rate=SENDER_RATE_LIMIT,
+    burst=SENDER_RATE_BURST,
+    max_senders=SENDER_RATE_MAX_TRACKED,
+    stats=admission_stats
+)
+
+sqs_circuit = CircuitBreaker(
+    failure_threshold=SQS_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=SQS_CIRCUIT_RESET_TIMEOUT,
+    slow_call_threshold=SQS_CIRCUIT_SLOW_CALL_MS / 1000
+)
+spool_stats = SpoolStats()
+
+# Responses of completed /api/email requests, keyed by Idempotency-Key
+idempotency_cache = IdempotencyCache(
+    create_backend(IDEMPOTENCY_BACKEND, max_entries=IDEMPOTENCY_MAX_ENTRIES, ttl=IDEMPOTENCY_TTL)
+)
+
+
 def validate_token(token: str) -> bool:
     """
-    Validate the provided token against SSM Parameter Store
+    Validate the provided token against SSM Parameter Store (via the token cache)
     """
     try:
-        expected_token = get_token_from_ssm()
         # Strip whitespace from both tokens for comparison
         token_clean = token.strip()
-        expected_clean = expected_token.strip()
-        is_valid = token_clean == expected_clean
+        is_valid = _token_matches(token_clean)
+        
+        # The token may have been rotated since it was cached; re-check once (rate limited)
+        if not is_valid and token_cache.force_refresh():
+            is_valid = _token_matches(token_clean)
         
         if not is_valid:
+            expected_clean = token_cache.get()
             logger.warning(f"Token mismatch. Expected: '{expected_clean}' (len={len(expected_clean)}), Got: '{token_clean}' (len={len(token_clean)})")
             # Debug: show first and last characters
             if expected_clean and token_clean:
                 logger.debug(f"Expected first char: '{expected_clean[0]}', last char: '{expected_clean[-1]}'")
                 logger.debug(f"Got first char: '{token_clean[0]}', last char: '{token_clean[-1]}'")
         else:
-            logger.info("Token validation successful")
+            request_log.info("Token validation successful")
         
         return is_valid
     except Exception as e:
@@ -94,8 +364,24 @@ def validate_token(token: str) -> bool:
         return False
 
 
+async def validate_token_async(token: str) -> bool:
+    """
+    Validate a token without blocking the event loop.
+    A match against a fresh cache is answered inline; anything that may reach
+    SSM (a stale cache, or the re-check after a mismatch) runs on the AWS executor.
+    """
+    with stage("token_validation", metrics.STAGE_TOKEN_VALIDATION):
+        if token_cache.is_fresh() and _token_matches(token.strip()):
+            request_log.info("Token validation successful")
+            return True
+        return await run_blocking(validate_token, token)
+
+
 class EmailData(BaseModel):
     """Email data model with validation"""
+    # Unknown fields are kept (but never forwarded) so pass-through can detect them
+    model_config = ConfigDict(extra="allow")
+    
     email_subject: str = Field(..., min_length=1, description="Email subject")
     email_sender: str = Field(..., min_length=1, description="Email sender")
     email_timestream: str = Field(..., min_length=1, description="Email timestamp")
@@ -103,10 +389,14 @@ class EmailData(BaseModel):
 
     @field_validator('email_subject', 'email_sender', 'email_timestream', 'email_content')
     @classmethod
-    def validate_not_empty(cls, v: str) -> str:
+    def validate_not_empty(cls, v: str, info: ValidationInfo) -> str:
         if not v or not v.strip():
             raise ValueError("Field cannot be empty")
-        return v.strip()
+        stripped = v.strip()
+        # Tell pass-through callers that the validated data differs from the input
+        if stripped != v and info.context is not None:
+            info.context["modified"] = True
+        return stripped
 
 
 class RequestPayload(BaseModel):
@@ -115,9 +405,131 @@ class RequestPayload(BaseModel):
     token: str = Field(..., min_length=1, description="Authentication token")
 
 
-def publish_to_sqs(message_body: dict) -> bool:
+class BatchRequestPayload(BaseModel):
+    """Batch request payload model; items are validated one by one"""
+    token: str = Field(..., min_length=1, description="Authentication token")
+    items: List[Dict[str, Any]] = Field(..., min_length=1, description="EmailData items")
+
+
+def passthrough_body(raw: bytes, email: EmailData, context: dict) -> Optional[bytes]:
+    """
+    Return the raw JSON record if validation left it unchanged, so it can be
+    forwarded without re-serialising; None if it must be rebuilt.
+    """
+    if context.get("modified") or email.model_extra:
+        return None
+    return raw.strip()
+
+
+def build_message_body(email: EmailData) -> dict:
+    """Build the SQS message body for a validated email"""
+    return {
+        "email_subject": email.email_subject,
+        "email_sender": email.email_sender,
+        "email_timestream": email.email_timestream,
+        "email_content": email.email_content
+    }
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Flatten a Pydantic validation error into a short reason string"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'item'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+async def read_body_limited(request: Request, max_bytes: int) -> bytes:
+    """Read the request body, responding 413 as soon as it exceeds max_bytes"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Request body exceeds {max_bytes} bytes"
+        )
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request body exceeds {max_bytes} bytes"
+            )
+    return bytes(body)
+
+
+def store_claim_check(message_body: dict) -> dict:
+    """
+    Write a full message to S3 and return the small pointer envelope that is
+    enqueued instead. The object is stored exactly as Microservice 2 would write
+    it, so the consumer can copy it server-side into its final key.
+    """
+    key = f"{CLAIM_CHECK_PREFIX}{uuid.uuid4()}.json"
+    body = fast_json.dumps(message_body)
+    try:
+        s3 = get_s3_client()
+        with stage("claim_check", metrics.STAGE_CLAIM_CHECK):
+            s3.put_object(
+                Bucket=CLAIM_CHECK_BUCKET,
+                Key=key,
+                Body=body,
+                ContentType="application/json"
+            )
+    except ClientError as e:
+        logger.error(f"Error storing claim check in S3: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to store email content"
+        )
+    
+    request_log.info("Email content offloaded to s3://%s/%s (%d bytes)", CLAIM_CHECK_BUCKET, key, len(body))
+    return {
+        "email_subject": message_body["email_subject"],
+        "email_sender": message_body["email_sender"],
+        "email_timestream": message_body["email_timestream"],
+        "claim_check": {
+            "bucket": CLAIM_CHECK_BUCKET,
+            "key": key,
+            "size": len(body)
+        }
+    }
+
+
+def encode_sqs_message(message_body: dict, serialised: Optional[bytes] = None) -> EncodedMessage:
+    """
+    Serialise a message into the versioned envelope, compressing it above the threshold
+    
+    Args:
+        message_body: Message dict
+        serialised: Already validated JSON for message_body, forwarded as-is when given
+    """
+    return encode_message(
+        serialised if serialised is not None else fast_json.dumps(message_body),
+        codec=ENVELOPE_CODEC,
+        threshold=ENVELOPE_COMPRESS_THRESHOLD_BYTES
+    )
+
+
+async def prepare_message(message_body: dict, serialised: Optional[bytes] = None) -> EncodedMessage:
+    """
+    Encode a message for SQS.
+    If the encoded message is still above CLAIM_CHECK_THRESHOLD_BYTES the body goes
+    to S3 and a pointer is enqueued instead.
+    """
+    message = encode_sqs_message(message_body, serialised)
+    if CLAIM_CHECK_BUCKET and message.size > CLAIM_CHECK_THRESHOLD_BYTES:
+        pointer = await run_blocking(store_claim_check, message_body)
+        message = encode_sqs_message(pointer)
+    return message
+
+
+def publish_to_sqs(message_body: Union[dict, EncodedMessage]) -> bool:
     """
     Publish message to SQS queue
+    
+    Args:
+        message_body: Message dict, or an already encoded message
     """
     if not SQS_QUEUE_URL:
         logger.error("SQS_QUEUE_URL environment variable is not set")
@@ -128,11 +540,14 @@ def publish_to_sqs(message_body: dict) -> bool:
     
     try:
         sqs = get_sqs_client()
-        response = sqs.send_message(
-            QueueUrl=SQS_QUEUE_URL,
-            MessageBody=json.dumps(message_body)
-        )
-        logger.info(f"Message sent to SQS. MessageId: {response['MessageId']}")
+        message = message_body if isinstance(message_body, EncodedMessage) else encode_sqs_message(message_body)
+        with stage("sqs_send", metrics.STAGE_SQS_SEND):
+            response = sqs.send_message(
+                QueueUrl=SQS_QUEUE_URL,
+                MessageBody=message.body,
+                MessageAttributes=message.attributes
+            )
+        request_log.info("Message sent to SQS. MessageId: %s", response["MessageId"])
         return True
     except ClientError as e:
         logger.error(f"Error publishing to SQS: {e}")
@@ -142,6 +557,138 @@ def publish_to_sqs(message_body: dict) -> bool:
         )
 
 
+def publish_batch_to_sqs(messages: list) -> list:
+    """
+    Publish up to 10 encoded messages with a single SendMessageBatch call
+
+    Returns:
+        One entry per message: the SQS MessageId, or an SQSPublishError for that entry
+    """
+    if not SQS_QUEUE_URL:
+        logger.error("SQS_QUEUE_URL environment variable is not set")
+        raise HTTPException(
+            status_code=500,
+            detail="SQS queue configuration is missing"
+        )
+    
+    try:
+        sqs = get_sqs_client()
+        with stage("sqs_send_batch", metrics.STAGE_SQS_SEND_BATCH):
+            response = sqs.send_message_batch(
+                QueueUrl=SQS_QUEUE_URL,
+                Entries=[
+                    {"Id": str(index), "MessageBody": message.body, "MessageAttributes": message.attributes}
+                    for index, message in enumerate(messages)
+                ]
+            )
+    except ClientError as e:
+        logger.error(f"Error publishing batch to SQS: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to publish message to queue"
+        )
+    
+    results = [SQSPublishError("No result returned for entry")] * len(messages)
+    for entry in response.get("Successful", []):
+        results[int(entry["Id"])] = entry["MessageId"]
+    for entry in response.get("Failed", []):
+        logger.error(f"SQS rejected batch entry {entry['Id']}: {entry.get('Code')} - {entry.get('Message')}")
+        results[int(entry["Id"])] = SQSPublishError(f"{entry.get('Code')}: {entry.get('Message')}")
+    request_log.info("Batch of %d message(s) sent to SQS, %d failed", len(messages), len(response.get("Failed", [])))
+    return results
+
+
+async def _send_sqs_batch(messages: list) -> list:
+    """Batcher hook: send one batch on the AWS executor"""
+    return await get_aws_executor().run(publish_batch_to_sqs, messages)
+
+
+async def send_message(message: EncodedMessage) -> None:
+    """Send one encoded message through the micro-batcher when it is running, otherwise directly"""
+    if sqs_batcher is None or not sqs_batcher.running:
+        await run_blocking(publish_to_sqs, message)
+        return
+    
+    try:
+        await sqs_batcher.publish(message)
+    except ExecutorSaturated as e:
+        logger.warning(f"AWS executor saturated: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Service is overloaded, please retry",
+            headers={"Retry-After": "1"}
+        )
+    except SQSPublishError as e:
+        logger.error(f"Error publishing to SQS: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to publish message to queue"
+        )
+
+
+async def spool_message(message: EncodedMessage) -> bool:
+    """
+    Write a message SQS could not take to the local spool for later replay.
+    Responds 503 with Retry-After when spooling is disabled or the spool is full.
+    """
+    if message_spool is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Message queue is unavailable, please retry",
+            headers={"Retry-After": retry_after_header(sqs_circuit.reset_timeout)}
+        )
+    try:
+        with stage("spool", metrics.STAGE_SPOOL):
+            await message_spool.append(message)
+    except SpoolFull as e:
+        logger.warning(f"Rejecting message, {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Message queue is unavailable, please retry",
+            headers={"Retry-After": retry_after_header(sqs_circuit.reset_timeout)}
+        )
+    request_log.info("SQS unavailable, message spooled for replay")
+    return True
+
+
+async def publish_message(message_body: dict) -> bool:
+    """
+    Publish a message without blocking the event loop.
+    While the SQS circuit is open the message goes straight to the local spool;
+    a send that fails (or is too slow) is reported to the circuit breaker and
+    its message spooled too. Without a spool, an open circuit answers 503.
+    
+    Returns:
+        True if the message was spooled rather than sent to SQS
+    """
+    message = await prepare_message(message_body)
+    if not sqs_circuit.allow():
+        return await spool_message(message)
+    
+    start = time.perf_counter()
+    try:
+        await send_message(message)
+    except HTTPException as e:
+        if e.status_code == 503:
+            raise  # The executor is saturated, SQS itself is fine
+        sqs_circuit.record(False)
+        if message_spool is None:
+            raise
+    except BotoCoreError as e:
+        # Connection errors and timeouts, which publish_to_sqs does not map
+        logger.error(f"Error publishing to SQS: {e}")
+        sqs_circuit.record(False)
+        if message_spool is None:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to publish message to queue"
+            )
+    else:
+        sqs_circuit.record(True, time.perf_counter() - start)
+        return False
+    return await spool_message(message)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -152,6 +699,77 @@ async def health_check():
     }
 
 
+async def probe_ssm() -> None:
+    """Readiness probe: read the token parameter, as a token refresh would"""
+    await run_blocking(lambda: get_ssm_client().get_parameter(Name=SSM_TOKEN_PARAMETER, WithDecryption=True))
+
+
+async def probe_sqs() -> None:
+    """Readiness probe: a cheap call on the queue messages are published to"""
+    await run_blocking(lambda: get_sqs_client().get_queue_attributes(
+        QueueUrl=SQS_QUEUE_URL, AttributeNames=["QueueArn"]
+    ))
+
+
+def readiness_probes() -> dict:
+    probes = {}
+    if SSM_TOKEN_PARAMETER:
+        probes["ssm"] = probe_ssm
+    if SQS_QUEUE_URL:
+        probes["sqs"] = probe_sqs
+    return probes
+
+
+def readiness_reasons() -> Tuple[List[str], List[str]]:
+    """
+    Why this task should not get traffic, and what is degraded but still served
+
+    /ready is the ALB health check, and ECS replaces tasks that fail it, so
+    only conditions under which the task cannot accept emails make it not
+    ready. A failing SSM probe is tolerated while the cached token is valid,
+    and SQS trouble (failing probe, open circuit) while messages can be
+    spooled. Saturated admission is never a reason: taking a busy task out of
+    rotation would push its load onto the others until they fail in turn.
+    """
+    not_ready, degraded = [], []
+    spooling = message_spool is not None
+    if readiness_checker is not None:
+        for name, status in readiness_checker.snapshot().items():
+            if status["status"] == "ok":
+                continue
+            tolerated = (name == "ssm" and token_cache.is_fresh()) or (name == "sqs" and spooling)
+            (degraded if tolerated else not_ready).append(f"{name} {status['status']}")
+    if sqs_circuit.state == OPEN:
+        (degraded if spooling else not_ready).append("sqs circuit open")
+    if admission_limiter.saturated:
+        degraded.append("admission saturated")
+    return not_ready, degraded
+
+
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """
+    Readiness endpoint for the load balancer. Answers from the background
+    probe results only, so it never makes an AWS call itself.
+    """
+    reasons, degraded = readiness_reasons()
+    if reasons:
+        response.status_code = 503
+    return {
+        "status": "not_ready" if reasons else "ready",
+        "service": "microservice1",
+        "reasons": reasons,
+        "degraded": degraded,
+        "dependencies": readiness_checker.snapshot() if readiness_checker is not None else {},
+        "sqs_circuit": sqs_circuit.state,
+        "admission": {
+            "active": admission_limiter.active,
+            "waiting": admission_limiter.waiting,
+            "saturated": admission_limiter.saturated
+        }
+    }
+
+
 @app.get("/debug/token")
 async def debug_token():
     """Debug endpoint to check token configuration (remove in production)"""
@@ -177,17 +795,170 @@ async def debug_token():
         }
 
 
-@app.post("/api/email")
-async def process_email(request: RequestPayload):
+@app.get("/stats/admission")
+async def admission_statistics():
+    """Admission control counters, for tuning the limits"""
+    return {
+        **admission_stats.as_dict(),
+        "active": admission_limiter.active,
+        "waiting": admission_limiter.waiting,
+        "max_concurrent": ADMISSION_MAX_CONCURRENT,
+        "max_queue": ADMISSION_MAX_QUEUE,
+        "tracked_senders": len(sender_rate_limiter)
+    }
+
+
+def _admission_counters():
+    yield metrics.ADMISSION_REQUESTS, admission_stats.as_dict()
+    yield metrics.SQS_CIRCUIT_TRANSITIONS, sqs_circuit.transitions
+    yield metrics.SPOOL_MESSAGES, spool_stats.as_dict()
+
+
+def _runtime_gauges():
+    yield metrics.ADMISSION_ACTIVE, admission_limiter.active
+    yield metrics.ADMISSION_WAITING, admission_limiter.waiting
+    yield metrics.AWS_EXECUTOR_IN_FLIGHT, aws_executor.in_flight if aws_executor is not None else 0
+    yield metrics.SQS_CIRCUIT_OPEN, int(sqs_circuit.state != "closed")
+    yield metrics.READY, int(not readiness_reasons()[0])
+    # Refreshed by the spool drainer, so a scrape does not scan the spool directory
+    segments, pending = message_spool.last_depth if message_spool is not None else (0, 0)
+    yield metrics.SPOOL_SEGMENTS, segments
+    yield metrics.SPOOL_BYTES, pending
+
+
+# Each worker keeps these values in memory; the publisher writes them to the
+# metrics shared by all workers, at every scrape and in the background
+stats_publisher = metrics.StatsPublisher(
+    counters=_admission_counters,
+    gauges=_runtime_gauges,
+    interval=METRICS_PUBLISH_INTERVAL
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    stats_publisher.publish()
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+def shed_response(overloaded: Overloaded) -> HTTPException:
+    """429 for a sender over its rate limit, 503 when the service itself is saturated"""
+    logger.warning(f"Shedding request: {overloaded.reason}")
+    if overloaded.reason == "sender_rate_limited":
+        return HTTPException(
+            status_code=429,
+            detail="Sender rate limit exceeded",
+            headers={"Retry-After": retry_after_header(overloaded.retry_after)}
+        )
+    return HTTPException(
+        status_code=503,
+        detail="Service overloaded, retry later",
+        headers={"Retry-After": retry_after_header(overloaded.retry_after)}
+    )
+
+
+def openapi_body(model, content_types=("application/json",)) -> dict:
+    """OpenAPI requestBody for handlers that read the raw body, with $defs inlined"""
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+    
+    def inline(node):
+        if isinstance(node, dict):
+            ref = node.get("$ref", "")
+            if ref.startswith("#/$defs/"):
+                return inline(definitions[ref[len("#/$defs/"):]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(item) for item in node]
+        return node
+    
+    schema = inline(schema)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {content_type: {"schema": schema} for content_type in content_types}
+        }
+    }
+
+
+def get_idempotency_key(http_request: Request, message_body: dict) -> Optional[str]:
+    """
+    Idempotency key for a request: the Idempotency-Key header, or (when
+    IDEMPOTENCY_DERIVE_KEY is set) a hash of the email payload. None disables dedup.
+    """
+    if not IDEMPOTENCY_ENABLED:
+        return None
+    header = http_request.headers.get("idempotency-key")
+    if header is not None:
+        header = header.strip()
+        if not header or len(header) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+            )
+        return f"key:{header}"
+    if IDEMPOTENCY_DERIVE_KEY:
+        return f"payload:{fingerprint(fast_json.dumps(message_body))}"
+    return None
+
+
+def parse_body(model, body: bytes, content_type: Optional[str]):
+    """
+    Decode and validate a request body in the format named by its Content-Type.
+    JSON is parsed and validated in one pass by pydantic-core; MessagePack and
+    CBOR are decoded first and then validated against the same model.
+    """
+    try:
+        return validate_body(model, body, content_type)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except BodyDecodeError as e:
+        raise RequestValidationError([{"type": "body_invalid", "loc": ("body",), "msg": str(e), "input": None}])
+    except UnsupportedBodyType:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be one of: {', '.join(BODY_CONTENT_TYPES)}"
+        )
+
+
+def parse_request_payload(body: bytes, content_type: Optional[str] = None) -> RequestPayload:
+    """Parse and validate a /api/email request body (JSON, MessagePack or CBOR)"""
+    with stage("validation", metrics.STAGE_VALIDATION):
+        return parse_body(RequestPayload, body, content_type)
+
+
+@app.post("/api/email", openapi_extra=openapi_body(RequestPayload, content_types=BODY_CONTENT_TYPES))
+async def process_email(http_request: Request, response: Response):
     """
     Process email request:
     1. Validate token
     2. Validate payload structure (4 required fields)
     3. Publish to SQS
+    Requests repeated with the same Idempotency-Key get the original response
+    (marked with Idempotent-Replayed: true) without being published again.
+    When the service or the sender is over its limits the request is rejected
+    with 503/429 and Retry-After before the body is processed.
+    The body may be JSON, MessagePack (application/msgpack) or CBOR
+    (application/cbor), chosen by Content-Type.
     """
+    try:
+        async with admission_limiter.slot():
+            return await handle_email(http_request, response)
+    except Overloaded as e:
+        raise shed_response(e)
+
+
+async def handle_email(http_request: Request, response: Response):
+    """Handle one admitted /api/email request"""
+    with stage("read_body"):
+        body = await http_request.body()
+    request = parse_request_payload(body, http_request.headers.get("content-type"))
+    sender_rate_limiter.check(request.data.email_sender)
     try:
         # Step 1: Validate token
-        if not validate_token(request.token):
+        if not await validate_token_async(request.token):
             logger.warning("Invalid token provided")
             raise HTTPException(
                 status_code=401,
@@ -198,35 +969,298 @@ async def process_email(request: RequestPayload):
         # The 4 required fields are: email_subject, email_sender, email_timestream, email_content
         # These are already validated by the EmailData model
         
-        logger.info(f"Processing email request: {request.data.email_subject}")
+        request_log.info("Processing email request: %s", request.data.email_subject)
         
         # Step 3: Prepare message for SQS
-        message_body = {
-            "email_subject": request.data.email_subject,
-            "email_sender": request.data.email_sender,
-            "email_timestream": request.data.email_timestream,
-            "email_content": request.data.email_content
-        }
+        message_body = build_message_body(request.data)
+        
+        async def publish():
+            # Step 4: Publish to SQS (off the event loop, batched when enabled)
+            with stage("publish", metrics.STAGE_PUBLISH):
+                spooled = await publish_message(message_body)
+            return {
+                "status": "success",
+                "message": (
+                    "Email request accepted and spooled for delivery to queue" if spooled
+                    else "Email request processed and published to queue"
+                ),
+                "email_subject": request.data.email_subject
+            }
+        
+        idempotency_key = get_idempotency_key(http_request, message_body)
+        if idempotency_key is None:
+            return await publish()
         
-        # Step 4: Publish to SQS
-        publish_to_sqs(message_body)
+        try:
+            result, replayed = await idempotency_cache.run(
+                idempotency_key,
+                fingerprint(fast_json.dumps(message_body)),
+                publish
+            )
+        except IdempotencyConflict:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different payload"
+            )
+        if replayed:
+            request_log.info("Replaying response for repeated Idempotency-Key")
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error processing email: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+
+async def _publish_batch_results(messages: list) -> list:
+    """
+    Publish one SQS batch through the SQS circuit breaker, turning a
+    whole-batch failure into per-entry errors. While the circuit is open the
+    batch is not sent; a failed or slow send is reported to the breaker.
+    """
+    if not sqs_circuit.allow():
+        return [SQSPublishError("Message queue is unavailable, please retry")] * len(messages)
+    
+    start = time.perf_counter()
+    try:
+        results = await get_aws_executor().run(publish_batch_to_sqs, messages)
+    except ExecutorSaturated:
+        return [SQSPublishError("Service is overloaded, please retry")] * len(messages)
+    except HTTPException as e:
+        sqs_circuit.record(False)
+        return [SQSPublishError(e.detail)] * len(messages)
+    except BotoCoreError as e:
+        logger.error(f"Error publishing batch to SQS: {e}")
+        sqs_circuit.record(False)
+        return [SQSPublishError("Failed to publish message to queue")] * len(messages)
+    sqs_circuit.record(True, time.perf_counter() - start)
+    return results
+
+
+def reject_while_circuit_open() -> None:
+    """503 with Retry-After for batch and stream requests while the SQS circuit is open"""
+    if sqs_circuit.state == OPEN:
+        raise HTTPException(
+            status_code=503,
+            detail="Message queue is unavailable, please retry",
+            headers={"Retry-After": retry_after_header(sqs_circuit.reset_timeout)}
+        )
+
+
+@app.post("/api/email/batch", openapi_extra=openapi_body(BatchRequestPayload, content_types=BODY_CONTENT_TYPES))
+async def process_email_batch(request: Request):
+    """
+    Process a batch of emails:
+    1. Enforce body size and item count limits
+    2. Validate token once
+    3. Validate each item independently and apply its sender's rate limit
+    4. Publish accepted items with SendMessageBatch
+    Returns a result per item so one bad item does not fail the batch.
+    The batch takes one admission slot, like a single /api/email request, and
+    is refused with 503 while the SQS circuit is open (batches are not spooled).
+    """
+    try:
+        async with admission_limiter.slot():
+            return await handle_email_batch(request)
+    except Overloaded as e:
+        raise shed_response(e)
+
+
+async def handle_email_batch(request: Request):
+    """Handle one admitted /api/email/batch request"""
+    try:
+        reject_while_circuit_open()
+        body = await read_body_limited(request, EMAIL_BATCH_MAX_BYTES)
+        payload = parse_body(BatchRequestPayload, body, request.headers.get("content-type"))
+        
+        if len(payload.items) > EMAIL_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds {EMAIL_BATCH_MAX_ITEMS} items"
+            )
+        
+        # Step 1: Validate token once for the whole batch
+        if not await validate_token_async(payload.token):
+            logger.warning("Invalid token provided")
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid authentication token"
+            )
+        
+        # Step 2: Validate each item and build its message
+        results: List[Dict[str, Any]] = [None] * len(payload.items)
+        valid_indexes = []
+        valid_emails = []
+        for index, item in enumerate(payload.items):
+            try:
+                email = EmailData.model_validate(item)
+                sender_rate_limiter.check(email.email_sender)
+            except ValidationError as e:
+                results[index] = {"index": index, "status": "rejected", "reason": format_validation_error(e)}
+                continue
+            except Overloaded:
+                results[index] = {"index": index, "status": "rejected", "reason": "Sender rate limit exceeded"}
+                continue
+            valid_emails.append(email)
+            valid_indexes.append(index)
+        
+        prepared = await asyncio.gather(
+            *(prepare_message(build_message_body(email)) for email in valid_emails),
+            return_exceptions=True
+        )
+        accepted_indexes = []
+        messages = []
+        for index, message in zip(valid_indexes, prepared):
+            if isinstance(message, Exception):
+                reason = message.detail if isinstance(message, HTTPException) else str(message)
+                results[index] = {"index": index, "status": "rejected", "reason": reason}
+                continue
+            if message.size > SQS_MAX_BATCH_BYTES:
+                results[index] = {"index": index, "status": "rejected", "reason": "Email exceeds the SQS message size limit"}
+                continue
+            accepted_indexes.append(index)
+            messages.append(message)
+        
+        # Step 3: Publish in SQS batches concurrently
+        batches = split_into_batches([m.size for m in messages])
+        batch_results = await asyncio.gather(*(
+            _publish_batch_results([messages[i] for i in batch])
+            for batch in batches
+        ))
+        for batch, outcomes in zip(batches, batch_results):
+            for position, outcome in zip(batch, outcomes):
+                index = accepted_indexes[position]
+                if isinstance(outcome, Exception):
+                    results[index] = {"index": index, "status": "rejected", "reason": str(outcome)}
+                else:
+                    results[index] = {"index": index, "status": "accepted", "message_id": outcome}
+        
+        accepted = sum(1 for r in results if r["status"] == "accepted")
+        logger.info(f"Processed email batch: {accepted}/{len(results)} accepted")
         return {
-            "status": "success",
-            "message": "Email request processed and published to queue",
-            "email_subject": request.data.email_subject
+            "status": "success" if accepted == len(results) else "partial",
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "results": results
         }
+    
+    except (HTTPException, RequestValidationError):
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error processing email batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+
+async def parse_email_line(raw: bytes) -> EncodedMessage:
+    """
+    Validate one NDJSON record as EmailData, apply its sender's rate limit and
+    return its encoded SQS message. Records that validation leaves unchanged
+    are forwarded byte-for-byte.
+    """
+    context: Dict[str, Any] = {}
+    try:
+        email = EmailData.model_validate_json(raw, context=context)
+    except ValidationError as e:
+        raise ValueError(format_validation_error(e))
+    try:
+        sender_rate_limiter.check(email.email_sender)
+    except Overloaded:
+        raise ValueError("Sender rate limit exceeded")
+    try:
+        return await prepare_message(build_message_body(email), passthrough_body(raw, email, context))
+    except HTTPException as e:
+        raise ValueError(e.detail)
+
+
+@app.post("/api/email/stream", openapi_extra=openapi_body(EmailData, content_types=NDJSON_CONTENT_TYPES))
+async def process_email_stream(request: Request):
+    """
+    Stream emails as NDJSON (one EmailData object per line) for large backfills.
+    The token is sent in the X-API-Token header. The body is read incrementally
+    and published in SQS batches with bounded in-flight concurrency.
+    Returns a summary with counts, rejected line numbers and throughput.
+    The stream holds one admission slot until it completes, and is refused
+    with 503 while the SQS circuit is open (streamed records are not spooled).
+    """
+    try:
+        async with admission_limiter.slot():
+            return await handle_email_stream(request)
+    except Overloaded as e:
+        raise shed_response(e)
+
+
+async def handle_email_stream(request: Request):
+    """Handle one admitted /api/email/stream request"""
+    try:
+        reject_while_circuit_open()
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type not in NDJSON_CONTENT_TYPES:
+            raise HTTPException(
+                status_code=415,
+                detail="Content-Type must be application/x-ndjson"
+            )
+        
+        token = request.headers.get("x-api-token", "")
+        if not token or not await validate_token_async(token):
+            logger.warning("Invalid token provided")
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid authentication token"
+            )
         
+        summary = await ingest_ndjson(
+            request.stream(),
+            parse_line=parse_email_line,
+            publish_batch=_publish_batch_results,
+            max_in_flight=EMAIL_STREAM_MAX_IN_FLIGHT,
+            max_line_bytes=EMAIL_STREAM_MAX_LINE_BYTES,
+            max_reported_errors=EMAIL_STREAM_MAX_REPORTED_ERRORS
+        )
+        logger.info(
+            f"Processed email stream: {summary['accepted']}/{summary['received']} accepted "
+            f"({summary['records_per_second']} records/s)"
+        )
+        return summary
+    
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error processing email: {e}")
+        logger.error(f"Unexpected error processing email stream: {e}")
         raise HTTPException(
             status_code=500,
             detail="Internal server error"
         )
 
 
+def reset_after_fork() -> None:
+    """
+    Make a worker forked from a preloaded master start from a clean slate: its
+    own log writer thread, no inherited clients or executor threads, and empty
+    caches. Clients are then built per worker by startup_event.
+    """
+    global ssm_client, sqs_client, s3_client, aws_executor, sqs_batcher, message_spool, spool_drainer
+    global readiness_checker
+    configure_logging(force=True)
+    ssm_client = sqs_client = s3_client = None
+    aws_executor = None
+    sqs_batcher = None
+    message_spool = spool_drainer = None
+    readiness_checker = None
+    sqs_circuit.reset()
+    token_cache.clear()
+    idempotency_cache.backend.clear()
+    sender_rate_limiter.clear()
+    stats_publisher.clear()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize on startup"""
@@ -234,6 +1268,76 @@ async def startup_event():
     logger.info(f"AWS Region: {AWS_REGION}")
     logger.info(f"SQS Queue URL: {SQS_QUEUE_URL}")
     logger.info(f"SSM Token Parameter: {SSM_TOKEN_PARAMETER}")
+    
+    await init_aws_clients()
+    
+    global sqs_batcher
+    if SQS_BATCHING_ENABLED:
+        sqs_batcher = SQSBatcher(
+            send_batch=_send_sqs_batch,
+            max_batch_size=SQS_BATCH_MAX_SIZE,
+            max_batch_bytes=SQS_BATCH_MAX_BYTES,
+            linger=SQS_BATCH_LINGER_MS / 1000,
+            max_concurrent_flushes=SQS_BATCH_MAX_CONCURRENT_FLUSHES
+        )
+        await sqs_batcher.start()
+        logger.info(f"SQS batching enabled (linger {SQS_BATCH_LINGER_MS} ms)")
+    
+    global message_spool, spool_drainer
+    if SPOOL_DIR:
+        message_spool = DiskSpool(
+            SPOOL_DIR,
+            max_bytes=SPOOL_MAX_BYTES,
+            segment_bytes=SPOOL_SEGMENT_BYTES,
+            fsync_interval=SPOOL_FSYNC_INTERVAL_MS / 1000,
+            stats=spool_stats
+        )
+        spool_drainer = SpoolDrainer(
+            message_spool,
+            send_batch=_send_sqs_batch,
+            breaker=sqs_circuit,
+            interval=SPOOL_DRAIN_INTERVAL_MS / 1000
+        )
+        await spool_drainer.start()
+        segments, pending = message_spool.last_depth
+        logger.info(f"SQS spool enabled at {SPOOL_DIR} ({segments} segment(s), {pending} bytes to replay)")
+    
+    global readiness_checker
+    if READY_PROBE_INTERVAL > 0:
+        readiness_checker = ReadinessChecker(
+            readiness_probes(),
+            interval=READY_PROBE_INTERVAL,
+            ttl=READY_PROBE_TTL,
+            timeout=READY_PROBE_TIMEOUT
+        )
+        await readiness_checker.start()
+    
+    await stats_publisher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending messages and release resources on shutdown"""
+    global aws_executor, sqs_batcher, message_spool, spool_drainer, readiness_checker
+    if readiness_checker is not None:
+        await readiness_checker.stop()
+        readiness_checker = None
+    if spool_drainer is not None:
+        await spool_drainer.stop()
+        # Replay what was spooled before exiting, while SQS accepts it
+        if SPOOL_SHUTDOWN_DRAIN_TIMEOUT > 0:
+            await spool_drainer.drain_remaining(SPOOL_SHUTDOWN_DRAIN_TIMEOUT)
+        spool_drainer = None
+    if message_spool is not None:
+        await message_spool.close()
+        message_spool = None
+    if sqs_batcher is not None:
+        await sqs_batcher.stop()
+        sqs_batcher = None
+    if aws_executor is not None:
+        aws_executor.shutdown(wait=True)
+        aws_executor = None
+    await stats_publisher.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,299 @@
+"""
+Prometheus metrics for Microservice 1
+
+Request counters and latency histograms are recorded by ``MetricsMiddleware``;
+``process_email`` and the AWS helpers time their stages with ``STAGE_*``.
+Label children are resolved once and reused, so recording a sample on the hot
+path is a lock-protected add rather than a label lookup.
+
+Under the multi-worker server (PROMETHEUS_MULTIPROC_DIR set before import)
+counters, histograms and gauges are aggregated across workers. Counters kept
+as plain integers by other components (admission, circuit breaker, spool) are
+copied in by ``StatsPublisher`` in every worker, so they aggregate the same way.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.gc_collector import GCCollector
+from prometheus_client.platform_collector import PlatformCollector
+from prometheus_client.process_collector import ProcessCollector
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "ms1"
+
+HTTP_METHODS = frozenset(("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"))
+
+# Latency buckets from sub-millisecond cache hits up to slow AWS calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REGISTRY = CollectorRegistry()
+if not MULTIPROCESS:
+    ProcessCollector(registry=REGISTRY)
+    PlatformCollector(registry=REGISTRY)
+    GCCollector(registry=REGISTRY)
+
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests by endpoint, method and status code",
+    ["endpoint", "method", "status"],
+    namespace=NAMESPACE,
+    registry=REGISTRY,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "End-to-end HTTP request latency",
+    ["endpoint"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being processed",
+    ["endpoint"],
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Latency of the stages of email processing",
+    ["stage"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+# Stages of process_email, resolved once for the hot path
+STAGE_SSM_FETCH = STAGE_SECONDS.labels("ssm_fetch")
+STAGE_TOKEN_VALIDATION = STAGE_SECONDS.labels("token_validation")
+STAGE_VALIDATION = STAGE_SECONDS.labels("validation")
+STAGE_CLAIM_CHECK = STAGE_SECONDS.labels("claim_check")
+STAGE_SQS_SEND = STAGE_SECONDS.labels("sqs_send")
+STAGE_SQS_SEND_BATCH = STAGE_SECONDS.labels("sqs_send_batch")
+STAGE_SPOOL = STAGE_SECONDS.labels("spool")
+# Whole publish step: encoding, executor and batcher waits plus the SQS call
+STAGE_PUBLISH = STAGE_SECONDS.labels("publish")
+
+# Published by StatsPublisher from the counters of the components that own them.
+# Counters are summed over workers; the live* gauge modes drop exited workers.
+ADMISSION_REQUESTS = Counter(
+    "admission_requests",
+    "Admitted, queued and shed requests by outcome",
+    ["outcome"],
+    namespace=NAMESPACE,
+    registry=REGISTRY,
+)
+SQS_CIRCUIT_TRANSITIONS = Counter(
+    "sqs_circuit_transitions",
+    "SQS circuit breaker transitions by the state entered",
+    ["state"],
+    namespace=NAMESPACE,
+    registry=REGISTRY,
+)
+SPOOL_MESSAGES = Counter(
+    "spool_messages",
+    "Spooled and replayed messages by event",
+    ["event"],
+    namespace=NAMESPACE,
+    registry=REGISTRY,
+)
+ADMISSION_ACTIVE = Gauge(
+    "admission_active",
+    "Requests holding an admission slot",
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+ADMISSION_WAITING = Gauge(
+    "admission_waiting",
+    "Requests waiting for an admission slot",
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+AWS_EXECUTOR_IN_FLIGHT = Gauge(
+    "aws_executor_in_flight",
+    "Blocking AWS calls running or queued on the executor",
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+SQS_CIRCUIT_OPEN = Gauge(
+    "sqs_circuit_open",
+    "1 while the SQS circuit is open or half-open (in any worker)",
+    namespace=NAMESPACE,
+    multiprocess_mode="livemax",
+    registry=REGISTRY,
+)
+READY = Gauge(
+    "ready",
+    "1 while /ready reports every worker ready",
+    namespace=NAMESPACE,
+    multiprocess_mode="livemin",
+    registry=REGISTRY,
+)
+SPOOL_SEGMENTS = Gauge(
+    "spool_segments",
+    "Spool files waiting to be replayed (all workers)",
+    namespace=NAMESPACE,
+    multiprocess_mode="livemax",
+    registry=REGISTRY,
+)
+SPOOL_BYTES = Gauge(
+    "spool_bytes",
+    "Spooled bytes waiting to be replayed (all workers)",
+    namespace=NAMESPACE,
+    multiprocess_mode="livemax",
+    registry=REGISTRY,
+)
+
+
+class StatsPublisher:
+    """
+    Copies counters and gauges kept elsewhere (e.g. ``AdmissionStats``) into
+    the metrics above, so the code that owns them pays nothing extra per
+    request. ``counters`` yields ``(Counter, {label value: running total})``
+    and ``gauges`` yields ``(Gauge, value)``.
+
+    ``publish`` runs before every scrape and every ``interval`` seconds in
+    each worker: a scrape is served by one worker, and the others must have
+    written their values to the shared files too.
+    """
+
+    def __init__(
+        self,
+        counters: Callable[[], Iterable[Tuple[Counter, Dict[str, float]]]] = lambda: (),
+        gauges: Callable[[], Iterable[Tuple[Gauge, float]]] = lambda: (),
+        interval: float = 5.0,
+    ):
+        self._counters = counters
+        self._gauges = gauges
+        self.interval = interval
+        self._published: Dict[Tuple[Counter, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self) -> None:
+        for counter, values in self._counters():
+            for label_value, value in values.items():
+                published = self._published.get((counter, label_value), 0)
+                if value < published:
+                    published = 0  # The owner was reset
+                child = counter.labels(label_value)
+                if value > published:
+                    child.inc(value - published)
+                self._published[(counter, label_value)] = value
+        for gauge, value in self._gauges():
+            gauge.set(value)
+
+    def clear(self) -> None:
+        """Forget what was published, e.g. in a freshly forked worker"""
+        self._published.clear()
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Final values, which outlive the worker in the counter files
+        self.publish()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Error publishing runtime metrics: {e}")
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with their content type"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per endpoint.
+
+    Only paths in ``endpoints`` get their own label value; anything else is
+    reported as ``other`` to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, endpoints: Iterable[str]):
+        self.app = app
+        self.endpoints = frozenset(endpoints)
+        self._latency = {}
+        self._in_flight = {}
+        self._requests = {}
+
+    def _children(self, endpoint: str):
+        latency = self._latency.get(endpoint)
+        if latency is None:
+            latency = self._latency[endpoint] = HTTP_REQUEST_SECONDS.labels(endpoint)
+            self._in_flight[endpoint] = HTTP_IN_FLIGHT.labels(endpoint)
+        return latency, self._in_flight[endpoint]
+
+    def _request_counter(self, endpoint: str, method: str, status: int):
+        key = (endpoint, method, status)
+        counter = self._requests.get(key)
+        if counter is None:
+            counter = self._requests[key] = HTTP_REQUESTS.labels(endpoint, method, str(status))
+        return counter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        endpoint = path if path in self.endpoints else "other"
+        latency, in_flight = self._children(endpoint)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency.observe(time.perf_counter() - start)
+            in_flight.dec()
+            method = scope["method"]
+            self._request_counter(endpoint, method if method in HTTP_METHODS else "OTHER", status).inc()
@@ -0,0 +1,181 @@
+"""
+Streaming NDJSON ingestion: validate records as they arrive and publish them
+to SQS in batches with bounded in-flight concurrency
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Set, Tuple
+
+from app.envelope import EncodedMessage
+from app.sqs_batcher import BatchResult, SQS_MAX_BATCH_BYTES, SQS_MAX_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Turns one raw line into an encoded SQS message; raises ValueError with a reason
+ParseLine = Callable[[bytes], Awaitable[EncodedMessage]]
+PublishBatch = Callable[[List[EncodedMessage]], Awaitable[BatchResult]]
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into lines without buffering more than one line.
+
+    Yields ``(line_number, line)`` for every non-blank line (1-based). Lines longer
+    than ``max_line_bytes`` are yielded as ``(line_number, None)`` and their bytes
+    are discarded as they arrive.
+    """
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline == -1:
+                if not oversized:
+                    buffer.extend(chunk[start:])
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, None
+            else:
+                buffer.extend(chunk[start:newline])
+                if len(buffer) > max_line_bytes:
+                    yield line_number, None
+                elif buffer.strip():
+                    yield line_number, bytes(buffer)
+            buffer.clear()
+            start = newline + 1
+
+    if oversized:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, bytes(buffer)
+
+
+class IngestSummary:
+    """Counters for one streaming ingest, with a bounded list of rejected lines"""
+
+    def __init__(self, max_reported_errors: int):
+        self.max_reported_errors = max_reported_errors
+        self.started_at = time.perf_counter()
+        self.received = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.bytes_received = 0
+        self.rejected_lines: List[dict] = []
+
+    def reject(self, line_number: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.rejected_lines) < self.max_reported_errors:
+            self.rejected_lines.append({"line": line_number, "reason": reason})
+
+    def as_dict(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            "status": "success" if self.rejected == 0 else "partial",
+            "received": self.received,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "rejected_lines": self.rejected_lines,
+            "rejected_lines_truncated": self.rejected > len(self.rejected_lines),
+            "bytes_received": self.bytes_received,
+            "duration_seconds": round(elapsed, 3),
+            "records_per_second": round(self.received / elapsed, 1),
+        }
+
+
+async def ingest_ndjson(
+    chunks: AsyncIterator[bytes],
+    parse_line: ParseLine,
+    publish_batch: PublishBatch,
+    max_in_flight: int = 8,
+    max_line_bytes: int = SQS_MAX_BATCH_BYTES,
+    max_reported_errors: int = 1000,
+) -> dict:
+    """
+    Consume an NDJSON body and publish every valid record.
+
+    At most ``max_in_flight`` SQS batches are outstanding; once that limit is hit
+    the body is not read any further until a batch completes, so memory stays
+    bounded by the batch size regardless of the body size.
+    """
+    summary = IngestSummary(max_reported_errors)
+    slots = asyncio.Semaphore(max_in_flight)
+    in_flight: Set[asyncio.Task] = set()
+
+    pending_lines: List[int] = []
+    pending_messages: List[EncodedMessage] = []
+    pending_bytes = 0
+
+    async def counted_chunks():
+        async for chunk in chunks:
+            summary.bytes_received += len(chunk)
+            yield chunk
+
+    async def publish(lines: List[int], messages: List[EncodedMessage]) -> None:
+        try:
+            try:
+                results = await publish_batch(messages)
+            except Exception as e:
+                logger.error(f"Error publishing streamed batch: {e}")
+                results = [e] * len(messages)
+            for line_number, result in zip(lines, results):
+                if isinstance(result, Exception):
+                    summary.reject(line_number, str(result))
+                else:
+                    summary.accepted += 1
+        finally:
+            slots.release()
+
+    async def flush() -> None:
+        nonlocal pending_lines, pending_messages, pending_bytes
+        if not pending_messages:
+            return
+        await slots.acquire()
+        task = asyncio.create_task(publish(pending_lines, pending_messages))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        pending_lines, pending_messages, pending_bytes = [], [], 0
+
+    try:
+        async for line_number, raw in iter_ndjson_lines(counted_chunks(), max_line_bytes):
+            summary.received += 1
+            if raw is None:
+                summary.reject(line_number, f"Line exceeds {max_line_bytes} bytes")
+                continue
+            try:
+                message = await parse_line(raw)
+            except ValueError as e:
+                summary.reject(line_number, str(e))
+                continue
+
+            size = message.size
+            if size > SQS_MAX_BATCH_BYTES:
+                summary.reject(line_number, "Email exceeds the SQS message size limit")
+                continue
+            if pending_bytes + size > SQS_MAX_BATCH_BYTES:
+                await flush()
+            pending_lines.append(line_number)
+            pending_messages.append(message)
+            pending_bytes += size
+            if len(pending_messages) >= SQS_MAX_BATCH_SIZE:
+                await flush()
+
+        await flush()
+    finally:
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    return summary.as_dict()
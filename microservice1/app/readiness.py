@@ -0,0 +1,129 @@
+"""
+Background dependency probes for the readiness endpoint
+
+Probes run on a timer, never on the request path: /ready only reads the last
+result of each one. A result older than ``ttl`` counts as stale, so a stuck
+checker makes the task not ready rather than reporting an old success.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+Probe = Callable[[], Awaitable[None]]
+
+STATUS_OK = "ok"
+STATUS_FAILING = "failing"
+STATUS_STALE = "stale"
+STATUS_UNKNOWN = "unknown"
+
+
+class ProbeResult(NamedTuple):
+    ok: bool
+    latency: float  # Seconds the probe took (the timeout when it timed out)
+    checked_at: float  # Clock time the probe finished
+    error: Optional[str] = None
+
+
+class ReadinessChecker:
+    """
+    Runs every probe concurrently each ``interval`` seconds and keeps the
+    latest result per dependency. A probe that raises or takes longer than
+    ``timeout`` seconds is recorded as failing.
+    """
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        interval: float = 15.0,
+        ttl: float = 45.0,
+        timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self._clock = clock
+        self.results: Dict[str, ProbeResult] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="readiness-checker")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.error(f"Error running readiness probes: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _probe(self, name: str, probe: Probe) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            result = ProbeResult(False, self.timeout, self._clock(), f"timed out after {self.timeout:g}s")
+        except Exception as e:
+            result = ProbeResult(False, time.perf_counter() - start, self._clock(), str(e))
+        else:
+            result = ProbeResult(True, time.perf_counter() - start, self._clock())
+        previous = self.results.get(name)
+        if previous is not None and previous.ok != result.ok:
+            if result.ok:
+                logger.info(f"Dependency {name} recovered")
+            else:
+                logger.warning(f"Dependency {name} is failing: {result.error}")
+        self.results[name] = result
+
+    async def check_once(self) -> None:
+        """Run every probe once and record the results"""
+        await asyncio.gather(*(self._probe(name, probe) for name, probe in self.probes.items()))
+
+    def status(self, name: str) -> str:
+        result = self.results.get(name)
+        if result is None:
+            return STATUS_UNKNOWN
+        if self._clock() - result.checked_at > self.ttl:
+            return STATUS_STALE
+        return STATUS_OK if result.ok else STATUS_FAILING
+
+    @property
+    def ready(self) -> bool:
+        """True when every dependency's latest result is a fresh success"""
+        return all(self.status(name) == STATUS_OK for name in self.probes)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Status, latency and age of the latest result of every dependency"""
+        now = self._clock()
+        snapshot = {}
+        for name in self.probes:
+            result = self.results.get(name)
+            entry = {"status": self.status(name)}
+            if result is not None:
+                entry["latency_ms"] = round(result.latency * 1000, 1)
+                entry["age_seconds"] = round(now - result.checked_at, 1)
+                if result.error:
+                    entry["error"] = result.error
+            snapshot[name] = entry
+        return snapshot
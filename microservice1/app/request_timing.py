@@ -0,0 +1,116 @@
+"""
+Per-request stage timings: returned in a Server-Timing header and logged for
+slow requests
+
+Code that does measurable work wraps it in ``stage(name)``. While a request
+is handled by ``RequestTimingMiddleware`` the durations are collected for that
+request; outside of a request (or with the middleware disabled) ``stage``
+only feeds the optional Prometheus histogram.
+"""
+
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    """Accumulated seconds per stage for one request, in first-seen order"""
+
+    __slots__ = ("started_at", "stages")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+    def breakdown(self) -> str:
+        """Compact breakdown for log lines"""
+        return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.stages.items())
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def stage(name: str, histogram=None):
+    """
+    Time a block as stage ``name`` of the current request.
+
+    Args:
+        name: Stage name as it appears in Server-Timing
+        histogram: Prometheus histogram (child) that also receives the duration
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if histogram is not None:
+            histogram.observe(elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+class RequestTimingMiddleware:
+    """
+    ASGI middleware collecting stage timings for every HTTP request.
+
+    Args:
+        server_timing: Add a Server-Timing header with the stages recorded
+            before the response started
+        slow_request_seconds: Log requests taking at least this long with
+            their breakdown (0 disables the log)
+    """
+
+    def __init__(self, app, server_timing: bool = False, slow_request_seconds: float = 0.0):
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _current.get() is not None:
+            # Not HTTP, or an outer instance already times this request
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = timings.server_timing(timings.elapsed()).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = timings.elapsed()
+            if self.slow_request_seconds and total >= self.slow_request_seconds:
+                logger.warning(
+                    f"Slow request: {scope['method']} {scope['path']} status={status} "
+                    f"total={total * 1000:.1f}ms {timings.breakdown()}"
+                )
@@ -0,0 +1,459 @@
+"""
+Durable local spool for messages accepted while SQS publishing is degraded
+
+Messages are appended to segment files in a spool directory as length-prefixed,
+CRC-checked records. Appends are fsynced in groups: every append waits for the
+next fsync, which runs at most ``fsync_interval`` seconds after the first
+unsynced record, so one fsync covers every request that arrived in between.
+
+Segments are claimed with an exclusive ``flock``: the writer holds the lock on
+its open segment, and a drainer only replays segments it can lock. Workers of
+the multi-worker server can therefore share one directory, and segments left by
+a worker that died are picked up by the others. A drainer records its progress
+in a ``.offset`` file next to the segment and deletes both once the segment is
+replayed. Delivery is at least once: a batch whose send fails or is interrupted
+is sent again in full.
+
+The spool directory may be on a network file system (EFS), so file system calls
+made while serving requests or draining run on the default executor, never on
+the event loop.
+"""
+
+import asyncio
+import fcntl
+import glob
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from app import fast_json
+from app.circuit_breaker import OPEN, CircuitBreaker
+from app.envelope import EncodedMessage
+from app.sqs_batcher import SQS_MAX_BATCH_BYTES, SendBatch, split_into_batches
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+OFFSET_SUFFIX = ".offset"
+# Record header: payload length and CRC32 of the payload
+_HEADER = struct.Struct(">II")
+
+
+class SpoolFull(Exception):
+    """The spool has reached its size limit"""
+
+
+class SpoolStats:
+    """Counters describing spooled and replayed messages"""
+
+    def __init__(self):
+        self.spooled = 0
+        self.drained = 0
+        self.drain_failures = 0
+        self.corrupt = 0
+        self.rejected_full = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "spooled": self.spooled,
+            "drained": self.drained,
+            "drain_failures": self.drain_failures,
+            "corrupt": self.corrupt,
+            "rejected_full": self.rejected_full,
+        }
+
+
+def encode_record(message: EncodedMessage) -> bytes:
+    payload = fast_json.dumps({"body": message.body, "attributes": message.attributes})
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(data: bytes, offset: int = 0) -> Tuple[List[Tuple[int, EncodedMessage]], int]:
+    """
+    Decode the records of a segment starting at ``offset``.
+
+    Returns:
+        ``(end_offset, message)`` for each intact record, and the number of
+        records skipped because their checksum did not match. A record cut
+        short by a crash ends the segment.
+    """
+    records = []
+    corrupt = 0
+    while offset + _HEADER.size <= len(data):
+        length, checksum = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        end = start + length
+        if end > len(data):
+            break
+        payload = data[start:end]
+        offset = end
+        if zlib.crc32(payload) != checksum:
+            corrupt += 1
+            continue
+        record = fast_json.loads(payload)
+        records.append((end, EncodedMessage(record["body"], record["attributes"])))
+    return records, corrupt
+
+
+def _fsync(file, directory: Optional[str] = None) -> None:
+    file.flush()
+    os.fsync(file.fileno())
+    if directory is not None:
+        # Make the new segment's directory entry durable too
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _create_segment(directory: str):
+    """Open a new segment locked by this process; returns its file and path"""
+    # Created under a staging name and renamed once locked, so a drainer
+    # never sees (and claims) a segment before its writer holds the lock
+    path = os.path.join(directory, f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}")
+    staging = path + ".new"
+    file = open(staging, "ab")
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    os.rename(staging, path)
+    return file, path
+
+
+def _claim_segment(directory: str, own_segment: Optional[str]) -> Optional["SpoolSegment"]:
+    for path in sorted(glob.glob(os.path.join(directory, "*" + SEGMENT_SUFFIX))):
+        if path == own_segment:
+            continue
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            continue
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            continue
+        if not os.path.exists(path):
+            file.close()  # Replayed and removed while we were opening it
+            continue
+        return SpoolSegment(path, file)
+    return None
+
+
+def committed_offset(segment_path: str) -> int:
+    """Bytes of a segment already replayed"""
+    try:
+        with open(segment_path + OFFSET_SUFFIX) as f:
+            return int(f.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+class SpoolSegment:
+    """
+    A sealed segment locked by this process for replay. Its methods block on
+    the file system; ``SpoolDrainer`` runs them on the executor.
+    """
+
+    def __init__(self, path: str, file):
+        self.path = path
+        self._file = file
+        self._offset_path = path + OFFSET_SUFFIX
+
+    def read(self) -> Tuple[List[Tuple[int, EncodedMessage]], int]:
+        """Records not yet replayed, see ``read_records``"""
+        self._file.seek(0)
+        return read_records(self._file.read(), committed_offset(self.path))
+
+    def commit(self, offset: int) -> None:
+        """Record that everything before ``offset`` has been replayed"""
+        staging = self._offset_path + ".new"
+        with open(staging, "w") as f:
+            f.write(str(offset))
+        os.replace(staging, self._offset_path)
+
+    def remove(self) -> None:
+        os.unlink(self.path)
+        try:
+            os.unlink(self._offset_path)
+        except FileNotFoundError:
+            pass
+
+    def release(self) -> None:
+        self._file.close()
+
+
+class DiskSpool:
+    """
+    Append-only spool of encoded messages in ``directory``.
+
+    ``append`` returns once the record has been fsynced. The open segment is
+    sealed once it reaches ``segment_bytes``; appends fail with ``SpoolFull``
+    when the spool would exceed ``max_bytes``. Must be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        segment_bytes: int = 16 * 1024 * 1024,
+        fsync_interval: float = 0.002,
+        stats: Optional[SpoolStats] = None,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.stats = stats or SpoolStats()
+        os.makedirs(directory, exist_ok=True)
+
+        self._file = None
+        self._segment_path: Optional[str] = None
+        self._segment_size = 0
+        self._new_segment = False
+        self._sync: Optional[asyncio.Future] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.last_depth = self.depth()
+        self._size_estimate = self.last_depth[1]
+
+    @property
+    def has_open_records(self) -> bool:
+        """Whether this process's open segment holds records (not yet drainable)"""
+        return self._file is not None and self._segment_size > 0
+
+    def depth(self) -> Tuple[int, int]:
+        """
+        Segments in the spool and bytes not yet replayed, across all processes.
+        Scans the directory: from the event loop, use ``refresh_depth``.
+        """
+        segments = 0
+        pending = 0
+        for path in glob.glob(os.path.join(self.directory, "*" + SEGMENT_SUFFIX)):
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+            segments += 1
+            pending += size - committed_offset(path)
+        return segments, pending
+
+    async def refresh_depth(self) -> Tuple[int, int]:
+        """``depth`` on the executor; the result is kept in ``last_depth`` for metrics"""
+        self.last_depth = await asyncio.get_running_loop().run_in_executor(None, self.depth)
+        self._size_estimate = self.last_depth[1]
+        return self.last_depth
+
+    async def append(self, message: EncodedMessage) -> None:
+        """Write one message and wait until it is on disk"""
+        record = encode_record(message)
+        if self._size_estimate + len(record) > self.max_bytes:
+            # The estimate only grows between scans; check what is really left
+            _, pending = await self.refresh_depth()
+            if pending + len(record) > self.max_bytes:
+                self.stats.rejected_full += 1
+                raise SpoolFull(f"Spool holds {pending} bytes (limit {self.max_bytes})")
+
+        if self._file is None:
+            async with self._lock:
+                if self._file is None:
+                    await self._open_segment()
+        # No await between the check above and the write, so the segment cannot be sealed in between
+        self._file.write(record)
+        self._segment_size += len(record)
+        self._size_estimate += len(record)
+
+        if self._sync is None:
+            self._sync = asyncio.get_running_loop().create_future()
+            self._sync_task = asyncio.create_task(self._sync_soon())
+        await asyncio.shield(self._sync)
+        self.stats.spooled += 1
+
+    async def rotate(self) -> None:
+        """Seal the open segment so it can be drained"""
+        async with self._lock:
+            if self._file is not None:
+                await self._close_segment()
+
+    async def close(self) -> None:
+        await self.rotate()
+
+    async def claim(self) -> Optional[SpoolSegment]:
+        """Lock the oldest sealed segment no other process is replaying"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, _claim_segment, self.directory, self._segment_path
+        )
+
+    async def _open_segment(self) -> None:
+        file, path = await asyncio.get_running_loop().run_in_executor(None, _create_segment, self.directory)
+        self._file = file
+        self._segment_path = path
+        self._segment_size = 0
+        self._new_segment = True
+
+    async def _fsync_segment(self) -> None:
+        directory = self.directory if self._new_segment else None
+        self._new_segment = False
+        await asyncio.get_running_loop().run_in_executor(None, _fsync, self._file, directory)
+
+    async def _close_segment(self) -> None:
+        # Detached before the final fsync: a record appended while it runs goes
+        # to a new segment, instead of into this one after it was synced
+        file, new_segment = self._file, self._new_segment
+        self._file = None
+        self._segment_path = None
+        self._segment_size = 0
+        self._new_segment = False
+        loop = asyncio.get_running_loop()
+        try:
+            directory = self.directory if new_segment else None
+            await loop.run_in_executor(None, _fsync, file, directory)
+        finally:
+            await loop.run_in_executor(None, file.close)
+
+    async def _sync_soon(self) -> None:
+        await asyncio.sleep(self.fsync_interval)
+        async with self._lock:
+            # Records appended from here on wait for the next fsync
+            future, self._sync = self._sync, None
+            try:
+                if self._file is not None:
+                    await self._fsync_segment()
+                    if self._segment_size >= self.segment_bytes:
+                        await self._close_segment()
+                # else: the segment was sealed (and fsynced) by rotate(), which
+                # held the lock until every record written to it was synced
+            except Exception as e:
+                logger.error(f"Error syncing spool segment: {e}")
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+
+class SpoolDrainer:
+    """
+    Background task replaying spooled messages to SQS in batches.
+
+    Every ``interval`` seconds, while the circuit is not open, it claims the
+    oldest sealed segment (sealing this process's own open segment if there is
+    nothing else) and sends its records through ``send_batch``, reporting each
+    batch to the circuit breaker. A failed batch stops the pass; the segment is
+    retried from its last committed offset on the next one.
+    """
+
+    def __init__(
+        self,
+        spool: DiskSpool,
+        send_batch: SendBatch,
+        breaker: CircuitBreaker,
+        interval: float = 1.0,
+        max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+    ):
+        self.spool = spool
+        self.breaker = breaker
+        self.interval = interval
+        self.max_batch_bytes = max_batch_bytes
+        self._send_batch = send_batch
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="spool-drainer")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+        self._stopping = None
+
+    async def drain_remaining(self, timeout: float) -> int:
+        """
+        Replay everything still spooled, for up to ``timeout`` seconds, before
+        the process exits. Call after ``stop``. Returns the messages sent; the
+        ones left (circuit open, SQS still failing, or out of time) stay in
+        their segments for the next process using the directory.
+        """
+        sent = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            try:
+                drained = await asyncio.wait_for(self.drain_once(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if not drained:
+                break
+            sent += drained
+        segments, pending = await self.spool.refresh_depth()
+        if pending:
+            logger.warning(f"{pending} spooled byte(s) in {segments} segment(s) not replayed before exit")
+        return sent
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                drained = await self.drain_once()
+                # Also keeps last_depth current for the spool gauges
+                await self.spool.refresh_depth()
+            except Exception as e:
+                logger.error(f"Error draining spool: {e}")
+                drained = 0
+            if drained:
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain_once(self) -> int:
+        """Replay (part of) one segment; returns the number of messages sent"""
+        if self.breaker.state == OPEN:
+            return 0
+        segment = await self.spool.claim()
+        if segment is None and self.spool.has_open_records:
+            await self.spool.rotate()
+            segment = await self.spool.claim()
+        if segment is None:
+            return 0
+
+        sent = 0
+        loop = asyncio.get_running_loop()
+        try:
+            records, corrupt = await loop.run_in_executor(None, segment.read)
+            if corrupt:
+                logger.error(f"Skipped {corrupt} corrupt record(s) in spool segment {segment.path}")
+                self.spool.stats.corrupt += corrupt
+            batches = split_into_batches([message.size for _, message in records], max_batch_bytes=self.max_batch_bytes)
+            for batch in batches:
+                if (self._stopping is not None and self._stopping.is_set()) or not self.breaker.allow():
+                    return sent
+                messages = [records[index][1] for index in batch]
+                start = loop.time()
+                try:
+                    results = await self._send_batch(messages)
+                except Exception as e:
+                    results = [e] * len(messages)
+                failed = [result for result in results if isinstance(result, Exception)]
+                self.breaker.record(not failed, loop.time() - start)
+                if failed:
+                    logger.warning(f"Spool replay paused, {len(failed)} of {len(messages)} message(s) failed: {failed[0]}")
+                    self.spool.stats.drain_failures += 1
+                    return sent
+                await loop.run_in_executor(None, segment.commit, records[batch[-1]][0])
+                sent += len(messages)
+                self.spool.stats.drained += len(messages)
+            await loop.run_in_executor(None, segment.remove)
+            if sent:
+                logger.info(f"Replayed {sent} spooled message(s) from {os.path.basename(segment.path)}")
+            return sent
+        finally:
+            await loop.run_in_executor(None, segment.release)
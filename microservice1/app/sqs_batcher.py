@@ -0,0 +1,183 @@
+"""
+Background micro-batcher that coalesces SQS publishes into send_message_batch calls
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Set, Union
+
+from app.envelope import EncodedMessage
+
+logger = logging.getLogger(__name__)
+
+# SQS limits for a single SendMessageBatch call
+SQS_MAX_BATCH_SIZE = 10
+SQS_MAX_BATCH_BYTES = 256 * 1024
+
+
+class SQSPublishError(Exception):
+    """A single entry of a batch was rejected by SQS"""
+
+
+# Result for each entry of a batch: the SQS MessageId, or the error for that entry
+BatchResult = List[Union[str, Exception]]
+SendBatch = Callable[[List[EncodedMessage]], Awaitable[BatchResult]]
+
+
+def split_into_batches(
+    sizes: List[int],
+    max_batch_size: int = SQS_MAX_BATCH_SIZE,
+    max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+) -> List[List[int]]:
+    """
+    Group message indexes into batches that respect the SQS entry and byte limits.
+
+    Args:
+        sizes: Encoded size in bytes of each message (each must fit in one batch)
+
+    Returns:
+        Lists of indexes into ``sizes``, in order
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_bytes = 0
+    for index, size in enumerate(sizes):
+        if current and (len(current) >= max_batch_size or current_bytes + size > max_batch_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(index)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+class _Entry:
+    __slots__ = ("message", "size", "future")
+
+    def __init__(self, message: EncodedMessage, size: int, future: asyncio.Future):
+        self.message = message
+        self.size = size
+        self.future = future
+
+
+class SQSBatcher:
+    """
+    Collects messages from concurrent requests and sends them in batches.
+
+    A batch is flushed when it holds ``max_batch_size`` entries, when adding the
+    next entry would exceed ``max_batch_bytes``, or ``linger`` seconds after its
+    first entry arrived. Each caller awaits the result for its own entry.
+    """
+
+    def __init__(
+        self,
+        send_batch: SendBatch,
+        max_batch_size: int = SQS_MAX_BATCH_SIZE,
+        max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+        linger: float = 0.005,
+        max_concurrent_flushes: int = 8,
+    ):
+        self._send_batch = send_batch
+        self.max_batch_size = min(max_batch_size, SQS_MAX_BATCH_SIZE)
+        self.max_batch_bytes = min(max_batch_bytes, SQS_MAX_BATCH_BYTES)
+        self.linger = linger
+        self.max_concurrent_flushes = max_concurrent_flushes
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_slots: Optional[asyncio.Semaphore] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    async def start(self) -> None:
+        """Start the background collector on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._flush_slots = asyncio.Semaphore(self.max_concurrent_flushes)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="sqs-batcher")
+
+    async def stop(self) -> None:
+        """Flush every pending entry, wait for in-flight batches and stop"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._queue.put_nowait(None)
+        await self._task
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        self._task = None
+
+    async def publish(self, message: EncodedMessage) -> str:
+        """Queue one message and wait until its batch has been sent"""
+        if not self.running:
+            raise RuntimeError("SQS batcher is not running")
+        size = message.size
+        if size > self.max_batch_bytes:
+            raise SQSPublishError(f"Message of {size} bytes exceeds the SQS limit of {self.max_batch_bytes} bytes")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Entry(message, size, future))
+        return await future
+
+    async def _next_entry(self, timeout: float) -> Optional[_Entry]:
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            if timeout <= 0:
+                raise asyncio.TimeoutError
+            return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        carry: Optional[_Entry] = None
+        stop = False
+
+        while not stop:
+            first = carry if carry is not None else await self._queue.get()
+            carry = None
+            if first is None:
+                break
+
+            batch = [first]
+            batch_bytes = first.size
+            deadline = loop.time() + self.linger
+
+            while len(batch) < self.max_batch_size:
+                try:
+                    entry = await self._next_entry(deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                if batch_bytes + entry.size > self.max_batch_bytes:
+                    carry = entry
+                    break
+                batch.append(entry)
+                batch_bytes += entry.size
+
+            await self._flush_slots.acquire()
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[_Entry]) -> None:
+        try:
+            results = await self._send_batch([entry.message for entry in batch])
+        except Exception as e:
+            logger.error(f"Error sending batch of {len(batch)} message(s) to SQS: {e}")
+            results = [e] * len(batch)
+        finally:
+            self._flush_slots.release()
+
+        for entry, result in zip(batch, results):
+            if entry.future.done():
+                continue  # Caller went away (e.g. request cancelled)
+            if isinstance(result, Exception):
+                entry.future.set_exception(result)
+            else:
+                entry.future.set_result(result)
@@ -0,0 +1,124 @@
+"""
+In-process cache for the API token stored in SSM Parameter Store
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    TTL cache for a single secret value with single-flight refresh.
+
+    - Entries are served from memory until ``ttl`` seconds have passed.
+    - Once ``refresh_ahead`` of the TTL has elapsed, a background thread refreshes
+      the value while callers keep using the cached one.
+    - When the entry has expired, concurrent callers share one fetch.
+    - After a rotation the previous value stays valid for ``rotation_grace`` seconds.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], str],
+        ttl: float = 300.0,
+        refresh_ahead: float = 0.8,
+        rotation_grace: float = 300.0,
+        min_refresh_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.rotation_grace = rotation_grace
+        self.min_refresh_interval = min_refresh_interval
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._current: Optional[str] = None
+        self._previous: Optional[str] = None
+        self._fetched_at = 0.0
+        self._generation = 0
+        self._previous_expires_at = 0.0
+        self._background_refresh: Optional[threading.Thread] = None
+
+    def _store(self, value: str) -> None:
+        now = self._clock()
+        with self._lock:
+            if self._current is not None and value != self._current:
+                logger.info("API token rotated, accepting previous token during grace period")
+                self._previous = self._current
+                self._previous_expires_at = now + self.rotation_grace
+            self._current = value
+            self._fetched_at = now
+            self._generation += 1
+
+    def _refresh(self) -> str:
+        """Fetch a new value; only one caller performs the fetch at a time"""
+        generation = self._generation
+        with self._refresh_lock:
+            # Another caller refreshed while we were waiting for the lock
+            if self._current is not None and self._generation != generation:
+                return self._current
+            value = self._fetch()
+            self._store(value)
+            return value
+
+    def _refresh_in_background(self) -> None:
+        def _run():
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.warning(f"Background token refresh failed: {e}")
+
+        with self._lock:
+            if self._background_refresh is not None and self._background_refresh.is_alive():
+                return
+            self._background_refresh = threading.Thread(
+                target=_run, name="token-cache-refresh", daemon=True
+            )
+            self._background_refresh.start()
+
+    def is_fresh(self) -> bool:
+        """True if ``get`` can be answered from memory without blocking"""
+        return self._current is not None and self._clock() - self._fetched_at < self.ttl
+
+    def get(self) -> str:
+        """Return the current value, refreshing it if it has expired"""
+        age = self._clock() - self._fetched_at
+        if self._current is None or age >= self.ttl:
+            return self._refresh()
+        if age >= self.ttl * self.refresh_ahead:
+            self._refresh_in_background()
+        return self._current
+
+    def accepted(self) -> Tuple[str, ...]:
+        """Return every value currently accepted (current, plus previous during rotation)"""
+        current = self.get()
+        if self._previous is not None and self._clock() < self._previous_expires_at:
+            return (current, self._previous)
+        return (current,)
+
+    def force_refresh(self) -> bool:
+        """
+        Refresh immediately unless the value was fetched very recently.
+
+        Used when a token does not match, so a freshly rotated token is picked up
+        without letting invalid tokens hammer SSM.
+        """
+        if self._clock() - self._fetched_at < self.min_refresh_interval:
+            return False
+        self._refresh()
+        return True
+
+    def clear(self) -> None:
+        """Drop all cached values"""
+        with self._lock:
+            self._current = None
+            self._previous = None
+            self._fetched_at = 0.0
+            self._previous_expires_at = 0.0
@@ -0,0 +1,11 @@
+"""
+Gunicorn worker class for the production server (see gunicorn.conf.py)
+"""
+
+from uvicorn.workers import UvicornWorker
+
+
+class FastUvicornWorker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop and httptools, failing at boot if either is missing"""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
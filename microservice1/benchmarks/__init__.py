@@ -0,0 +1 @@
+# Microservice 1 - Benchmarks
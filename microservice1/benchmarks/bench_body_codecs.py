@@ -0,0 +1,105 @@
+"""
+Benchmark: /api/email body parsing by codec and payload size
+
+For each email_content size, times decoding plus RequestPayload validation of
+the same request encoded as:
+  json           RequestPayload.model_validate_json (the JSON path)
+  json_orjson    orjson.loads + model_validate (decode-then-validate, for reference)
+  msgpack        msgpack.unpackb + model_validate
+  cbor           cbor2.loads + model_validate
+
+and reports µs per request, MB/s of body and the body size of each encoding.
+Content mixes prose, HTML and base64 like the shared corpus, so it is almost
+all string data: the binary formats mainly save the JSON string unescaping.
+
+Usage (from microservice1/):
+    python -m benchmarks.bench_body_codecs [--sizes 1024,16384,131072,1048576] [--json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue")
+
+from app import fast_json  # noqa: E402
+from app.body_codecs import CONTENT_TYPE_CBOR, CONTENT_TYPE_JSON, CONTENT_TYPE_MSGPACK, validate_body  # noqa: E402
+from app.main import RequestPayload  # noqa: E402
+from benchmarks.corpus import make_fixed_size_corpus  # noqa: E402
+
+try:
+    import cbor2
+    import msgpack
+except ImportError:
+    raise SystemExit("msgpack and cbor2 are required: pip install -r requirements.txt")
+
+VARIANTS = (
+    ("json", lambda doc: json.dumps(doc).encode(), CONTENT_TYPE_JSON),
+    ("json_orjson", lambda doc: json.dumps(doc).encode(), None),
+    ("msgpack", msgpack.packb, CONTENT_TYPE_MSGPACK),
+    ("cbor", cbor2.dumps, CONTENT_TYPE_CBOR),
+)
+
+
+def _orjson_validate(body: bytes) -> RequestPayload:
+    return RequestPayload.model_validate(fast_json.loads(body))
+
+
+def _best_of(repeats: int, fn, inputs) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, count: int, repeats: int = 5) -> list:
+    results = []
+    for size in sizes:
+        requests = [{"token": "bench-token", "data": email} for email in make_fixed_size_corpus(count, size)]
+        for name, encode, content_type in VARIANTS:
+            bodies = [encode(request) for request in requests]
+            if content_type is None:
+                parse = _orjson_validate
+            else:
+                def parse(body, content_type=content_type):
+                    return validate_body(RequestPayload, body, content_type)
+            seconds = _best_of(repeats, parse, bodies)
+            total_bytes = sum(len(body) for body in bodies)
+            results.append({
+                "content_bytes": size,
+                "codec": name,
+                "body_bytes": round(total_bytes / count),
+                "us_per_request": round(seconds / count * 1e6, 1),
+                "mb_per_second": round(total_bytes / seconds / 1e6),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1024,16384,131072,1048576", help="Comma-separated email_content sizes")
+    parser.add_argument("--count", type=int, default=50, help="Requests per size")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",")], args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'content':>9}  {'codec':<12}{'body B':>10}{'us/req':>10}{'MB/s':>8}{'vs json':>9}")
+    baseline = {}
+    for r in results:
+        if r["codec"] == "json":
+            baseline[r["content_bytes"]] = r["us_per_request"]
+        speedup = baseline[r["content_bytes"]] / r["us_per_request"]
+        print(f"{r['content_bytes']:>9}  {r['codec']:<12}{r['body_bytes']:>10}{r['us_per_request']:>10}"
+              f"{r['mb_per_second']:>8}{speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
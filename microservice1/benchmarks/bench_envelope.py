@@ -0,0 +1,76 @@
+"""
+Benchmark: SQS envelope codecs
+
+Reports, per codec, the bytes sent to SQS (body plus attributes) and the CPU
+time to encode in Microservice 1 and decode in Microservice 2, over the
+realistic corpus from benchmarks.corpus.
+
+Usage (from microservice1/):
+    python -m benchmarks.bench_envelope [--count 500] [--threshold 1024] [--json]
+"""
+
+import argparse
+import json
+import time
+
+from app.envelope import available_codecs, decode_message, encode_message
+from benchmarks.corpus import make_corpus
+
+
+def _best_of(repeats: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, threshold: int, repeats: int = 3) -> list:
+    bodies = [json.dumps(email) for email in make_corpus(count)]
+    raw_bytes = sum(len(body.encode("utf-8")) for body in bodies)
+
+    results = []
+    for codec in available_codecs():
+        messages = [encode_message(body, codec=codec, threshold=threshold) for body in bodies]
+        wire_bytes = sum(message.size for message in messages)
+        encode_seconds = _best_of(repeats, lambda: [
+            encode_message(body, codec=codec, threshold=threshold) for body in bodies
+        ])
+        decode_seconds = _best_of(repeats, lambda: [
+            decode_message(message.body, message.attributes) for message in messages
+        ])
+        results.append({
+            "codec": codec,
+            "messages": count,
+            "raw_bytes": raw_bytes,
+            "wire_bytes": wire_bytes,
+            "ratio": round(raw_bytes / wire_bytes, 2),
+            "encode_us_per_msg": round(encode_seconds / count * 1e6, 1),
+            "decode_us_per_msg": round(decode_seconds / count * 1e6, 1),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Emails in the corpus")
+    parser.add_argument("--threshold", type=int, default=1024, help="Compression threshold in bytes")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.count, args.threshold)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'codec':<10}{'raw MB':>10}{'wire MB':>10}{'ratio':>8}{'encode us':>12}{'decode us':>12}")
+    for r in results:
+        print(
+            f"{r['codec']:<10}{r['raw_bytes'] / 1e6:>10.2f}{r['wire_bytes'] / 1e6:>10.2f}"
+            f"{r['ratio']:>8}{r['encode_us_per_msg']:>12}{r['decode_us_per_msg']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
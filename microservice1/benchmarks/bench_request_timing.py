@@ -0,0 +1,89 @@
+"""
+Benchmark: per-request overhead of RequestTimingMiddleware
+
+Runs a minimal ASGI app that records four stages (like /api/email) with and
+without the middleware, and reports microseconds per request for:
+  bare            no middleware, stage() calls are no-ops apart from the clock
+  slow_log_only   middleware collecting timings for the slow-request log
+  server_timing   middleware also formatting the Server-Timing header
+
+Usage (from microservice1/):
+    python -m benchmarks.bench_request_timing [--count 20000] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from app.request_timing import RequestTimingMiddleware, stage
+
+STAGES = ("read_body", "validation", "token_validation", "publish")
+
+
+async def handler(scope, receive, send):
+    for name in STAGES:
+        with stage(name):
+            pass
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+def _seconds_per_request(app, count: int, repeats: int = 3) -> float:
+    scope = {"type": "http", "method": "POST", "path": "/api/email"}
+
+    async def loop():
+        for _ in range(count):
+            await app(scope, _receive, _send)
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        asyncio.run(loop())
+        best = min(best, time.perf_counter() - start)
+    return best / count
+
+
+def run(count: int) -> dict:
+    variants = {
+        "bare": handler,
+        "slow_log_only": RequestTimingMiddleware(handler, slow_request_seconds=60),
+        "server_timing": RequestTimingMiddleware(handler, server_timing=True, slow_request_seconds=60),
+    }
+    results = {name: _seconds_per_request(app, count) for name, app in variants.items()}
+    bare = results["bare"]
+    return {
+        "requests": count,
+        **{f"{name}_us": round(seconds * 1e6, 2) for name, seconds in results.items()},
+        **{
+            f"{name}_overhead_us": round((seconds - bare) * 1e6, 2)
+            for name, seconds in results.items() if name != "bare"
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000, help="Requests per measurement")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, value in results.items():
+        print(f"{name:<32}{value:>12}")
+
+
+if __name__ == "__main__":
+    main()
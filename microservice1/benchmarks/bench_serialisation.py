@@ -0,0 +1,91 @@
+"""
+Benchmark: request parsing and SQS message serialisation in Microservice 1
+
+Compares CPU per message for:
+  before       json.loads + RequestPayload(**...) + dict copy + json.dumps
+  after        RequestPayload.model_validate_json + compact fast_json.dumps
+  passthrough  NDJSON record validated and forwarded byte-for-byte
+
+Usage (from microservice1/):
+    python -m benchmarks.bench_serialisation [--count 500] [--json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue")
+
+from app import fast_json  # noqa: E402
+from app.main import EmailData, RequestPayload, build_message_body, passthrough_body  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+
+
+def before(body: bytes) -> str:
+    request = RequestPayload(**json.loads(body))
+    return json.dumps({
+        "email_subject": request.data.email_subject,
+        "email_sender": request.data.email_sender,
+        "email_timestream": request.data.email_timestream,
+        "email_content": request.data.email_content
+    })
+
+
+def after(body: bytes) -> bytes:
+    request = RequestPayload.model_validate_json(body)
+    return fast_json.dumps(build_message_body(request.data))
+
+
+def passthrough(line: bytes) -> bytes:
+    context = {}
+    email = EmailData.model_validate_json(line, context=context)
+    forwarded = passthrough_body(line, email, context)
+    return forwarded if forwarded is not None else fast_json.dumps(build_message_body(email))
+
+
+def _best_of(repeats: int, fn, inputs) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeats: int = 5) -> list:
+    corpus = make_corpus(count)
+    requests = [json.dumps({"token": "bench-token", "data": email}).encode() for email in corpus]
+    lines = [json.dumps(email).encode() for email in corpus]
+
+    results = []
+    for name, fn, inputs in (("before", before, requests), ("after", after, requests), ("passthrough", passthrough, lines)):
+        seconds = _best_of(repeats, fn, inputs)
+        results.append({
+            "variant": name,
+            "messages": count,
+            "us_per_msg": round(seconds / count * 1e6, 1),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Emails in the corpus")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]["us_per_msg"]
+    print(f"{'variant':<14}{'us/msg':>10}{'speedup':>10}")
+    for r in results:
+        print(f"{r['variant']:<14}{r['us_per_msg']:>10}{baseline / r['us_per_msg']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: requests/sec of the production server by number of workers
+
+Starts `gunicorn app.main:app -c gunicorn.conf.py` with each WEB_CONCURRENCY
+value, drives it with load-generator processes for a fixed duration and
+reports requests/sec. AWS warm-up is disabled and the default target is
+GET /health, so the numbers measure serving capacity (event loop, HTTP parsing,
+middleware) rather than AWS latency; `--target validation` posts an invalid
+email instead, which exercises body parsing and Pydantic validation.
+
+Run on a machine with at least as many cores as the largest worker count plus
+the load generators; on a single core the numbers will not scale.
+
+Usage (from microservice1/):
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--duration 10] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+TARGETS = {
+    "health": ("GET", "/health", None),
+    "validation": ("POST", "/api/email", {"token": "bench", "data": {"email_subject": "missing fields"}}),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "AWS_WARMUP_ENABLED": "false",
+        "SLOW_REQUEST_THRESHOLD_MS": "0",
+        "LOG_LEVEL": "WARNING",
+        "SQS_QUEUE_URL": os.environ.get("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue"),
+        "SSM_TOKEN_PARAMETER": os.environ.get("SSM_TOKEN_PARAMETER", "/bench/api-token"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not become ready")
+
+
+def _generate_load(args) -> int:
+    port, target, concurrency, duration = args
+    method, path, body = TARGETS[target]
+
+    async def worker(client, stop_at):
+        done = 0
+        while time.monotonic() < stop_at:
+            await client.request(method, path, json=body)
+            done += 1
+        return done
+
+    async def run():
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            stop_at = time.monotonic() + duration
+            return sum(await asyncio.gather(*(worker(client, stop_at) for _ in range(concurrency))))
+
+    return asyncio.run(run())
+
+
+def run(worker_counts, duration: float, load_processes: int, concurrency: int, target: str) -> list:
+    results = []
+    for workers in worker_counts:
+        port = _free_port()
+        server = _start_server(workers, port)
+        try:
+            with multiprocessing.Pool(load_processes) as pool:
+                counts = pool.map(_generate_load, [(port, target, concurrency, duration)] * load_processes)
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+        results.append({
+            "workers": workers,
+            "target": target,
+            "requests": sum(counts),
+            "requests_per_second": round(sum(counts) / duration),
+        })
+    baseline = results[0]["requests_per_second"] or 1
+    for result in results:
+        result["speedup"] = round(result["requests_per_second"] / baseline, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per worker count")
+    parser.add_argument("--load-processes", type=int, default=max(multiprocessing.cpu_count() // 2, 1),
+                        help="Load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests per load process")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="health", help="Request to send")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    worker_counts = [int(count) for count in args.workers.split(",")]
+    results = run(worker_counts, args.duration, args.load_processes, args.concurrency, args.target)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'workers':>8}{'req/s':>10}{'speedup':>10}")
+    for r in results:
+        print(f"{r['workers']:>8}{r['requests_per_second']:>10}{r['speedup']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for the production (multi-worker) server
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload) and forked into WEB_CONCURRENCY
+uvicorn workers running uvloop + httptools. Workers are recycled after
+GUNICORN_MAX_REQUESTS requests (with jitter so they do not restart together)
+and given GUNICORN_GRACEFUL_TIMEOUT seconds to finish in-flight requests.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))  # Worker processes
+worker_class = "app.workers.FastUvicornWorker"
+preload_app = True
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))  # Requests before a worker is recycled (0 = never)
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))  # Random extra requests per worker
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))  # Seconds to drain a worker on restart/stop
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))  # Seconds of silence before a worker is killed
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))  # Above the ALB idle timeout (60s) to avoid 502s
+accesslog = None
+
+# Prometheus metrics are aggregated across workers through files in this
+# directory; it must be set before the app (and prometheus_client) is imported
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "ms1-prometheus"))
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def when_ready(server):
+    # The preloaded master wrote zero-valued gauges on import but serves no
+    # requests; left in place they would drag the livemin/livesum gauges
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(os.getpid())
+
+
+def post_fork(server, worker):
+    from app import main
+    main.reset_after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,88 @@
+"""
+Shared fixtures for Microservice 1 tests
+"""
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.sqs_batcher import SQSPublishError
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """A FakeClock to pass as the ``clock`` of time-based components"""
+    return FakeClock()
+
+
+class LocalSQS:
+    """
+    In-process SQS stand-in that can be made to fail: the boto3 client calls
+    made by app.main, and the async send_batch the spool drainer replays with
+    """
+
+    def __init__(self):
+        self.failing = False
+        self.fail_batches = set()  # send_batch calls (counting from 1) that fail
+        self.calls = 0
+        self.batches = 0
+        self.received = []
+
+    def _maybe_fail(self, operation):
+        self.calls += 1
+        if self.failing:
+            raise ClientError({"Error": {"Code": "ServiceUnavailable", "Message": "Unavailable"}}, operation)
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes):
+        self._maybe_fail("SendMessage")
+        self.received.append(MessageBody)
+        return {"MessageId": f"m-{len(self.received)}"}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._maybe_fail("SendMessageBatch")
+        self.received.extend(entry["MessageBody"] for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"], "MessageId": f"m-{entry['Id']}"} for entry in Entries]}
+
+    def get_queue_attributes(self, **kwargs):
+        return {"Attributes": {}}
+
+    async def send_batch(self, messages):
+        self.batches += 1
+        await asyncio.sleep(0)
+        if self.failing or self.batches in self.fail_batches:
+            return [SQSPublishError("ServiceUnavailable")] * len(messages)
+        self.received.extend(m.body for m in messages)
+        return [f"id-{m.body}" for m in messages]
+
+
+@pytest.fixture
+def sqs():
+    """A LocalSQS that accepts every message until told to fail"""
+    return LocalSQS()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Each test starts with empty token and idempotency caches and a closed SQS circuit"""
+    # Imported lazily so test modules can set environment variables first
+    from app import main as app_main
+    app_main.token_cache.clear()
+    app_main.idempotency_cache.backend.clear()
+    app_main.sender_rate_limiter.clear()
+    app_main.sqs_circuit.reset()
+    yield
+    app_main.token_cache.clear()
+    app_main.idempotency_cache.backend.clear()
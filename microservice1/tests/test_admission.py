@@ -0,0 +1,146 @@
+"""
+Unit tests for admission control
+"""
+import asyncio
+
+import pytest
+
+from app.admission import (
+    ConcurrencyLimiter,
+    Overloaded,
+    SenderRateLimiter,
+    TokenBucket,
+    retry_after_header,
+)
+
+
+class TestConcurrencyLimiter:
+    """Test the concurrency limit and its bounded wait queue"""
+
+    async def test_requests_beyond_limit_wait_for_a_slot(self):
+        """Test queued requests run once a slot is released"""
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout=1)
+        release = asyncio.Event()
+        order = []
+
+        async def request(name):
+            async with limiter.slot():
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(request(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert limiter.active == 1
+        assert limiter.waiting == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+        assert limiter.active == 0
+        assert limiter.stats.admitted == 3
+        assert limiter.stats.queued == 2
+
+    async def test_full_queue_sheds_immediately(self):
+        """Test a request is rejected without waiting when the queue is full"""
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=1, retry_after=2)
+        assert not limiter.saturated
+        await limiter.acquire()
+        assert limiter.saturated
+
+        with pytest.raises(Overloaded) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.reason == "queue_full"
+        assert exc_info.value.retry_after == 2
+        assert limiter.stats.shed_queue_full == 1
+
+    async def test_queue_timeout_sheds(self):
+        """Test a queued request gives up after the queue timeout"""
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+        await limiter.acquire()
+
+        with pytest.raises(Overloaded) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.reason == "queue_timeout"
+        assert limiter.waiting == 0
+        assert limiter.stats.shed_queue_timeout == 1
+
+        limiter.release()
+        assert limiter.active == 0
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """Test a client disconnecting while queued leaves the limiter consistent"""
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        assert limiter.active == 0
+        assert limiter.waiting == 0
+
+    async def test_zero_disables_limit(self):
+        """Test max_concurrent=0 admits everything"""
+        limiter = ConcurrencyLimiter(max_concurrent=0, max_queue=0, queue_timeout=0)
+        for _ in range(100):
+            await limiter.acquire()
+        assert limiter.active == 100
+
+
+class TestSenderRateLimiter:
+    """Test per-sender token buckets"""
+
+    def test_burst_then_rate_limited(self, clock):
+        """Test a sender may burst, is then limited, and recovers at the refill rate"""
+        limiter = SenderRateLimiter(rate=2, burst=3, clock=clock)
+        for _ in range(3):
+            limiter.check("a@example.com")
+
+        with pytest.raises(Overloaded) as exc_info:
+            limiter.check("a@example.com")
+        assert exc_info.value.reason == "sender_rate_limited"
+        assert exc_info.value.retry_after == pytest.approx(0.5)
+
+        clock.advance(0.5)
+        limiter.check("a@example.com")
+        assert limiter.stats.rate_limited == 1
+
+    def test_senders_are_independent_and_case_insensitive(self, clock):
+        """Test one sender's budget does not affect another's"""
+        limiter = SenderRateLimiter(rate=1, burst=1, clock=clock)
+        limiter.check("A@example.com")
+        with pytest.raises(Overloaded):
+            limiter.check("a@example.com")
+        limiter.check("b@example.com")
+
+    def test_tracked_senders_are_bounded(self, clock):
+        """Test the least recently seen sender's bucket is dropped"""
+        limiter = SenderRateLimiter(rate=1, burst=1, max_senders=2, clock=clock)
+        for sender in ("a", "b", "c"):
+            limiter.check(sender)
+        assert len(limiter) == 2
+        # "a" was evicted, so it starts again with a full bucket
+        limiter.check("a")
+
+    def test_zero_rate_disables_limit(self):
+        """Test rate=0 never limits"""
+        limiter = SenderRateLimiter(rate=0, burst=1)
+        for _ in range(100):
+            limiter.check("a@example.com")
+        assert len(limiter) == 0
+
+
+def test_token_bucket_refill_is_capped_at_burst():
+    """Test an idle bucket never holds more than its burst"""
+    bucket = TokenBucket(rate=10, burst=2, now=0)
+    assert bucket.take(100) == 0
+    assert bucket.take(100) == 0
+    assert bucket.take(100) > 0
+
+
+def test_retry_after_header_rounds_up():
+    """Test Retry-After is a whole number of seconds, at least 1"""
+    assert retry_after_header(0.2) == "1"
+    assert retry_after_header(1.5) == "2"
@@ -0,0 +1,102 @@
+"""
+Unit tests for Content-Type based request body decoding
+"""
+import json
+from unittest.mock import patch
+
+import cbor2
+import msgpack
+import pytest
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from app import body_codecs
+from app.body_codecs import (
+    BodyDecodeError,
+    UnsupportedBodyType,
+    media_type,
+    supported_content_types,
+    validate_body,
+)
+
+
+class EmailData(BaseModel):
+    """Cut-down EmailData (app.main reads its environment at import)"""
+    email_subject: str = Field(..., min_length=1)
+    email_sender: str = Field(..., min_length=1)
+    email_timestream: str = Field(..., min_length=1)
+    email_content: str = Field(..., min_length=1)
+
+    @field_validator("email_subject", "email_sender", "email_timestream", "email_content")
+    @classmethod
+    def validate_not_empty(cls, v: str) -> str:
+        if not v.strip():
+            raise ValueError("Field cannot be empty")
+        return v.strip()
+
+
+class RequestPayload(BaseModel):
+    data: EmailData
+    token: str
+
+
+PAYLOAD = {
+    "token": "t",
+    "data": {
+        "email_subject": "Subject",
+        "email_sender": "sender@example.com",
+        "email_timestream": "2024-01-01T00:00:00Z",
+        "email_content": "  Content  ",
+    },
+}
+
+ENCODINGS = {
+    "application/json": lambda doc: json.dumps(doc).encode(),
+    "application/msgpack": msgpack.packb,
+    "application/cbor": cbor2.dumps,
+}
+
+
+class TestValidateBody:
+    """Test every format is validated by the same model"""
+
+    @pytest.mark.parametrize("content_type", sorted(ENCODINGS))
+    def test_formats_decode_to_same_model(self, content_type):
+        """Test JSON, MessagePack and CBOR give identical validated payloads"""
+        request = validate_body(RequestPayload, ENCODINGS[content_type](PAYLOAD), content_type)
+        assert request.data.email_content == "Content"
+        assert request.model_dump() == validate_body(RequestPayload, json.dumps(PAYLOAD).encode(), None).model_dump()
+
+    @pytest.mark.parametrize("content_type", ["application/msgpack", "application/cbor"])
+    def test_binary_formats_apply_field_rules(self, content_type):
+        """Test a blank field is rejected whatever the encoding"""
+        payload = {"token": "t", "data": {**PAYLOAD["data"], "email_subject": "   "}}
+        with pytest.raises(ValidationError):
+            validate_body(RequestPayload, ENCODINGS[content_type](payload), content_type)
+
+    @pytest.mark.parametrize("content_type", ["application/msgpack", "application/cbor"])
+    def test_garbage_raises_decode_error(self, content_type):
+        """Test undecodable bodies raise BodyDecodeError"""
+        with pytest.raises(BodyDecodeError):
+            validate_body(RequestPayload, b"\xc1\xff\x00", content_type)
+
+    def test_unknown_content_type_read_as_json(self):
+        """Test bodies without a binary Content-Type are still parsed as JSON"""
+        request = validate_body(RequestPayload, json.dumps(PAYLOAD).encode(), "application/x-www-form-urlencoded")
+        assert request.token == "t"
+
+    def test_missing_library_is_unsupported(self):
+        """Test a format whose library is not installed is refused"""
+        with patch.dict(body_codecs._DECODERS, {"application/cbor": None}):
+            with pytest.raises(UnsupportedBodyType):
+                validate_body(RequestPayload, cbor2.dumps(PAYLOAD), "application/cbor")
+
+
+def test_media_type_normalised():
+    """Test parameters, case and MessagePack aliases are normalised"""
+    assert media_type("Application/MsgPack; charset=binary") == "application/msgpack"
+    assert media_type("application/x-msgpack") == "application/msgpack"
+    assert media_type(None) == ""
+
+
+def test_supported_content_types_lists_json_first():
+    assert supported_content_types() == ("application/json", "application/msgpack", "application/cbor")
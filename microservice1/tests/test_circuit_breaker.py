@@ -0,0 +1,85 @@
+"""
+Unit tests for the circuit breaker
+"""
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def tripped_breaker(clock, **kwargs):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock, **kwargs)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(False)
+    return breaker
+
+
+class TestCircuitBreaker:
+    """Test state transitions"""
+
+    def test_opens_after_consecutive_failures(self, clock):
+        """Test the circuit opens on the threshold and then rejects calls"""
+        breaker = tripped_breaker(clock)
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.transitions[OPEN] == 1
+
+    def test_success_resets_failure_count(self, clock):
+        """Test failures must be consecutive to open the circuit"""
+        breaker = CircuitBreaker(failure_threshold=3, clock=clock)
+        for ok in (False, False, True, False, False):
+            breaker.record(ok)
+        assert breaker.state == CLOSED
+
+    def test_half_open_lets_one_probe_through(self, clock):
+        """Test only one call is allowed after the reset timeout"""
+        breaker = tripped_breaker(clock)
+        clock.advance(10)
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+    def test_successful_probe_closes_circuit(self, clock):
+        """Test a successful probe closes the circuit"""
+        breaker = tripped_breaker(clock)
+        clock.advance(10)
+        assert breaker.allow()
+        breaker.record(True)
+
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens_circuit(self, clock):
+        """Test a failed probe opens the circuit for another reset timeout"""
+        breaker = tripped_breaker(clock)
+        clock.advance(10)
+        assert breaker.allow()
+        breaker.record(False)
+
+        assert breaker.state == OPEN
+        clock.advance(9)
+        assert not breaker.allow()
+        clock.advance(1)
+        assert breaker.allow()
+
+    def test_abandoned_probe_is_replaced(self, clock):
+        """Test a probe that never reports back does not keep the circuit stuck"""
+        breaker = tripped_breaker(clock)
+        clock.advance(10)
+        assert breaker.allow()
+        clock.advance(10)
+        assert breaker.allow()
+
+    def test_slow_calls_count_as_failures(self, clock):
+        """Test successful but slow calls open the circuit"""
+        breaker = CircuitBreaker(failure_threshold=2, slow_call_threshold=0.5, clock=clock)
+        breaker.record(True, elapsed=0.1)
+        breaker.record(True, elapsed=0.8)
+        breaker.record(True, elapsed=0.9)
+        assert breaker.state == OPEN
+
+    def test_zero_threshold_disables(self, clock):
+        """Test a threshold of 0 never opens the circuit"""
+        breaker = CircuitBreaker(failure_threshold=0, clock=clock)
+        for _ in range(100):
+            breaker.record(False)
+        assert breaker.allow()
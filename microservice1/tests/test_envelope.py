@@ -0,0 +1,73 @@
+"""
+Unit tests for encoding the SQS message envelope
+"""
+import base64
+import json
+import os
+
+import pytest
+
+from app.envelope import (
+    ATTR_ENCODING,
+    ATTR_VERSION,
+    ENVELOPE_VERSION,
+    EncodedMessage,
+    EnvelopeError,
+    available_codecs,
+    decode_message,
+    encode_message,
+)
+
+
+def email_json(content):
+    return json.dumps({
+        "email_subject": "Quarterly report",
+        "email_sender": "sender@example.com",
+        "email_timestream": "1704067200",
+        "email_content": content
+    })
+
+
+class TestEnvelopeEncoding:
+    """Test codec selection and attributes"""
+    
+    def test_small_body_is_not_compressed(self):
+        """Test bodies under the threshold stay plain JSON"""
+        body = email_json("short")
+        message = encode_message(body, codec="gzip", threshold=1024)
+        assert message.body == body
+        assert message.codec == "identity"
+        assert message.attributes[ATTR_VERSION]["StringValue"] == ENVELOPE_VERSION
+    
+    def test_large_body_is_compressed(self):
+        """Test bodies over the threshold are compressed and marked"""
+        body = email_json("Please review the attached figures. " * 200)
+        message = encode_message(body, codec="gzip", threshold=1024)
+        assert message.codec == "gzip"
+        assert message.attributes[ATTR_ENCODING]["StringValue"] == "gzip"
+        assert message.size < len(body) / 4
+        assert decode_message(message.body, message.attributes) == body
+    
+    def test_incompressible_body_stays_identity(self):
+        """Test compression is skipped when it would not shrink the body"""
+        body = email_json(base64.b64encode(os.urandom(4096)).decode())
+        message = encode_message(body, codec="gzip", threshold=0)
+        assert message.codec == "identity"
+        assert message.body == body
+    
+    @pytest.mark.parametrize("codec", available_codecs())
+    def test_round_trip(self, codec):
+        """Test every available codec decodes back to the original body"""
+        body = email_json("Meeting notes: " + "action item, owner, due date. " * 100)
+        message = encode_message(body, codec=codec, threshold=0)
+        assert decode_message(message.body, message.attributes) == body
+    
+    def test_unknown_codec_raises(self):
+        """Test an unsupported codec is refused at encode time"""
+        with pytest.raises(EnvelopeError):
+            encode_message(email_json("x" * 2048), codec="brotli", threshold=0)
+    
+    def test_size_counts_attributes(self):
+        """Test the SQS size includes the message attributes"""
+        message = EncodedMessage.identity("{}")
+        assert message.size > len("{}")
@@ -0,0 +1,55 @@
+"""
+Unit tests for the bounded AWS executor
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.executor import BoundedExecutor, ExecutorSaturated
+
+
+class TestBoundedExecutor:
+    """Test concurrency and backpressure of the executor"""
+
+    async def test_run_returns_result(self):
+        """Test the callable result is returned to the awaiting coroutine"""
+        executor = BoundedExecutor(max_workers=2, max_pending=0)
+        assert await executor.run(lambda a, b: a + b, 2, 3) == 5
+        assert executor.in_flight == 0
+
+    async def test_run_propagates_exceptions(self):
+        """Test exceptions raised in the worker thread reach the caller"""
+        executor = BoundedExecutor(max_workers=1, max_pending=0)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await executor.run(fail)
+        assert executor.in_flight == 0
+
+    async def test_calls_run_in_parallel(self):
+        """Test blocking calls overlap instead of running one after another"""
+        executor = BoundedExecutor(max_workers=10, max_pending=0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(10)))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.5
+
+    async def test_rejects_when_saturated(self):
+        """Test calls beyond workers + pending fail fast"""
+        executor = BoundedExecutor(max_workers=1, max_pending=1)
+        release = threading.Event()
+
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+
+        release.set()
+        await asyncio.gather(*running)
+        assert executor.in_flight == 0
@@ -0,0 +1,120 @@
+"""
+Unit tests for Idempotency-Key deduplication
+"""
+import asyncio
+
+import pytest
+
+from app.idempotency import (
+    IdempotencyBackend,
+    IdempotencyCache,
+    IdempotencyConflict,
+    InMemoryBackend,
+    StoredResponse,
+    create_backend,
+    fingerprint,
+)
+
+
+class TestInMemoryBackend:
+    """Test LRU bound and TTL expiry"""
+
+    def test_entries_expire_after_ttl(self, clock):
+        """Test a stored response is dropped once its TTL has passed"""
+        backend = InMemoryBackend(max_entries=10, ttl=60, clock=clock)
+        backend.put("a", StoredResponse("fp", {"ok": True}))
+
+        clock.advance(59)
+        assert backend.get("a") == StoredResponse("fp", {"ok": True})
+        clock.advance(1)
+        assert backend.get("a") is None
+        assert len(backend) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the bound evicts the entry read least recently"""
+        backend = InMemoryBackend(max_entries=2, ttl=60)
+        backend.put("a", StoredResponse("fp", 1))
+        backend.put("b", StoredResponse("fp", 2))
+        backend.get("a")
+        backend.put("c", StoredResponse("fp", 3))
+
+        assert backend.get("a") is not None
+        assert backend.get("b") is None
+        assert backend.get("c") is not None
+
+    def test_incomplete_backend_cannot_be_created(self):
+        """Test a backend missing one of get/put/clear fails at instantiation, not on first use"""
+        class GetOnlyBackend(IdempotencyBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnlyBackend()
+
+    def test_unknown_backend_rejected(self):
+        """Test an unknown backend name is a configuration error"""
+        with pytest.raises(ValueError):
+            create_backend("dynamodb", max_entries=10, ttl=60)
+
+
+class TestIdempotencyCache:
+    """Test replay, single-flight and conflict handling"""
+
+    async def test_completed_response_is_replayed(self):
+        """Test a repeated key returns the stored response without running the handler"""
+        cache = IdempotencyCache(InMemoryBackend())
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return {"status": "success"}
+
+        assert await cache.run("k", "fp", handler) == ({"status": "success"}, False)
+        assert await cache.run("k", "fp", handler) == ({"status": "success"}, True)
+        assert len(calls) == 1
+
+    async def test_concurrent_duplicates_run_once(self):
+        """Test duplicates arriving while the first request is in flight wait for it"""
+        cache = IdempotencyCache(InMemoryBackend())
+        release = asyncio.Event()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await release.wait()
+            return "done"
+
+        tasks = [asyncio.ensure_future(cache.run("k", "fp", handler)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert len(calls) == 1
+        assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+        assert all(response == "done" for response, _ in results)
+
+    async def test_failures_are_not_stored(self):
+        """Test a failed request can be retried with the same key"""
+        cache = IdempotencyCache(InMemoryBackend())
+        attempts = []
+
+        async def handler():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("SQS down")
+            return "done"
+
+        with pytest.raises(RuntimeError):
+            await cache.run("k", "fp", handler)
+        assert await cache.run("k", "fp", handler) == ("done", False)
+
+    async def test_key_reused_with_different_payload(self):
+        """Test reusing a key for another payload is a conflict"""
+        cache = IdempotencyCache(InMemoryBackend())
+
+        async def handler():
+            return "done"
+
+        await cache.run("k", fingerprint(b"first"), handler)
+        with pytest.raises(IdempotencyConflict):
+            await cache.run("k", fingerprint(b"second"), handler)
@@ -0,0 +1,115 @@
+"""
+Unit tests for the shared logging setup
+"""
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from app.log_config import DroppingQueueHandler, SampledLogger, setup_logging
+
+
+@pytest.fixture
+def root_logger():
+    """Restore the root logger's handlers and level after the test"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+class TestSetupLogging:
+    """Test the queue-based JSON pipeline"""
+
+    def test_json_lines_written_by_listener(self, root_logger):
+        """Test records come out as JSON tagged with the service"""
+        stream = io.StringIO()
+        listener = setup_logging("svc", stream=stream, force=True)
+        try:
+            logging.getLogger("app.test").info("hello %s", "world")
+        finally:
+            listener.stop()
+
+        record = json.loads(stream.getvalue().splitlines()[0])
+        assert record["message"] == "hello world"
+        assert record["service"] == "svc"
+        assert record["level"] == "INFO"
+        assert record["logger"] == "app.test"
+
+    def test_exception_text_preserved(self, root_logger):
+        """Test tracebacks survive the hand-off to the listener thread"""
+        stream = io.StringIO()
+        listener = setup_logging("svc", stream=stream, force=True)
+        try:
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logging.getLogger("app.test").exception("failed")
+        finally:
+            listener.stop()
+
+        record = json.loads(stream.getvalue().splitlines()[0])
+        assert "ValueError: boom" in record["exc_info"]
+
+    def test_existing_configuration_left_alone(self, root_logger):
+        """Test nothing changes when the root logger already has handlers"""
+        root_logger.addHandler(logging.NullHandler())
+        before = root_logger.handlers[:]
+        assert setup_logging("svc") is None
+        assert root_logger.handlers == before
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test records beyond the queue size are dropped and counted"""
+    handler = DroppingQueueHandler(queue.Queue(2))
+    logger = logging.getLogger("app.test.dropping")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for index in range(5):
+            logger.warning("line %d", index)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+class TestSampledLogger:
+    """Test rate limiting and sampling of per-message lines"""
+
+    def test_rate_limit_reports_suppressed_lines(self, caplog, clock):
+        """Test lines over the rate are skipped and counted on the next emitted line"""
+        sampled = SampledLogger(logging.getLogger("app.test.sampled"), rate_limit=2, clock=clock)
+        with caplog.at_level(logging.INFO, logger="app.test.sampled"):
+            for index in range(5):
+                sampled.info("message %d", index)
+            clock.advance(1)
+            sampled.info("message %d", 5)
+
+        assert [r.getMessage() for r in caplog.records] == ["message 0", "message 1", "message 5"]
+        assert caplog.records[-1].suppressed == 3
+
+    def test_zero_sample_rate_drops_everything(self, caplog):
+        """Test a sample rate of 0 emits nothing"""
+        sampled = SampledLogger(logging.getLogger("app.test.sampled"), sample_rate=0.0)
+        with caplog.at_level(logging.INFO, logger="app.test.sampled"):
+            for _ in range(10):
+                sampled.info("message")
+        assert caplog.records == []
+
+    def test_disabled_level_costs_nothing(self, caplog):
+        """Test nothing is counted when INFO is disabled"""
+        logger = logging.getLogger("app.test.sampled")
+        sampled = SampledLogger(logger, rate_limit=1)
+        with caplog.at_level(logging.WARNING, logger="app.test.sampled"):
+            sampled.info("message")
+        assert caplog.records == []
+        assert sampled._suppressed == 0
@@ -4,6 +4,12 @@ Unit tests for Microservice 1
 import pytest
 import os
 import json
+import time
+import asyncio
+import threading
+import httpx
+import cbor2
+import msgpack
 from unittest.mock import Mock, patch, MagicMock
 from fastapi.testclient import TestClient
 from botocore.exceptions import ClientError
@@ -14,6 +20,9 @@ os.environ["SQS_QUEUE_URL"] = "https://sqs.eu-west-1.amazonaws.com/123456789/tes
 os.environ["AWS_REGION"] = "eu-west-1"
 
 from app.main import app, validate_token, get_token_from_ssm, publish_to_sqs
+from app import main as app_main
+from app import body_codecs
+from app.idempotency import StoredResponse
 
 
 @pytest.fixture
@@ -89,6 +98,40 @@ class TestTokenValidation:
         
         result = validate_token("any-token")
         assert result is False
+    
+    @patch('app.main.get_ssm_client')
+    def test_validate_token_uses_cache(self, mock_ssm_client, mock_ssm_token):
+        """Test repeated validations only call SSM once"""
+        mock_ssm = Mock()
+        mock_ssm.get_parameter.return_value = {
+            "Parameter": {
+                "Value": mock_ssm_token
+            }
+        }
+        mock_ssm_client.return_value = mock_ssm
+        
+        for _ in range(5):
+            assert validate_token(mock_ssm_token) is True
+        assert mock_ssm.get_parameter.call_count == 1
+
+    async def test_mismatch_recheck_runs_off_the_event_loop(self, mock_ssm_token):
+        """Test the SSM re-check after a wrong token does not run on the event loop thread"""
+        fetch_threads = []
+
+        def fetch():
+            fetch_threads.append(threading.current_thread())
+            return mock_ssm_token
+
+        with patch('app.main.get_token_from_ssm', side_effect=fetch):
+            assert await app_main.validate_token_async(mock_ssm_token) is True
+            # Fresh, but old enough for a forced refresh
+            app_main.token_cache._fetched_at -= app_main.token_cache.min_refresh_interval + 1
+            fetch_threads.clear()
+
+            assert await app_main.validate_token_async("wrong-token") is False
+
+        assert len(fetch_threads) == 1
+        assert fetch_threads[0] is not threading.current_thread()
 
 
 class TestPayloadValidation:
@@ -212,11 +255,1009 @@ class TestAPIEndpoints:
             
             response = client.post("/api/email", json=payload)
             assert response.status_code == 500
+    
+    def test_process_email_executor_saturated(self, client, mock_ssm_token):
+        """Test a saturated AWS executor sheds load with 503 and Retry-After"""
+        saturated = app_main.BoundedExecutor(max_workers=1, max_pending=0)
+        saturated._in_flight = saturated.capacity
+        with patch('app.main.get_aws_executor', return_value=saturated):
+            payload = {
+                "token": mock_ssm_token,
+                "data": {
+                    "email_subject": "Test Subject",
+                    "email_sender": "sender@example.com",
+                    "email_timestream": "2024-01-01T00:00:00Z",
+                    "email_content": "Test content"
+                }
+            }
+            
+            response = client.post("/api/email", json=payload)
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "1"
+
+
+
+class TestBinaryBodies:
+    """Test MessagePack and CBOR request bodies on the email endpoints"""
+    
+    @pytest.fixture
+    def mock_sqs(self):
+        with patch('app.main.get_sqs_client') as mock_sqs_client, \
+             patch('app.main.validate_token', return_value=True):
+            mock_sqs_client.return_value.send_message.return_value = {"MessageId": "m-1"}
+            mock_sqs_client.return_value.send_message_batch.side_effect = batch_send_side_effect
+            yield mock_sqs_client.return_value
+    
+    @pytest.mark.parametrize("content_type,encode", [
+        ("application/msgpack", msgpack.packb),
+        ("application/x-msgpack", msgpack.packb),
+        ("application/cbor", cbor2.dumps),
+    ])
+    def test_email_published_from_binary_body(self, client, mock_sqs, content_type, encode):
+        """Test a binary body is validated and published like its JSON equivalent"""
+        email = make_email(email_content="  Body  ")
+        response = client.post(
+            "/api/email",
+            content=encode({"token": "t", "data": email}),
+            headers={"Content-Type": content_type}
+        )
+        
+        assert response.status_code == 200
+        body = mock_sqs.send_message.call_args.kwargs["MessageBody"]
+        assert json.loads(body)["email_content"] == "Body"
+    
+    def test_invalid_binary_body_is_422(self, client, mock_sqs):
+        """Test an undecodable MessagePack body is a validation error"""
+        response = client.post("/api/email", content=b"\xc1", headers={"Content-Type": "application/msgpack"})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body"]
+    
+    def test_missing_field_in_binary_body_is_422(self, client, mock_sqs):
+        """Test binary bodies get the same field validation as JSON"""
+        email = make_email()
+        del email["email_sender"]
+        response = client.post(
+            "/api/email",
+            content=cbor2.dumps({"token": "t", "data": email}),
+            headers={"Content-Type": "application/cbor"}
+        )
+        assert response.status_code == 422
+        mock_sqs.send_message.assert_not_called()
+    
+    def test_unavailable_codec_is_415(self, client, mock_sqs):
+        """Test a format whose library is not installed gets 415"""
+        with patch.dict(body_codecs._DECODERS, {"application/cbor": None}):
+            response = client.post(
+                "/api/email",
+                content=cbor2.dumps({"token": "t", "data": make_email()}),
+                headers={"Content-Type": "application/cbor"}
+            )
+        assert response.status_code == 415
+    
+    def test_batch_accepts_msgpack(self, client, mock_sqs):
+        """Test /api/email/batch decodes MessagePack bodies"""
+        response = client.post(
+            "/api/email/batch",
+            content=msgpack.packb({"token": "t", "items": [make_email(i) for i in range(3)]}),
+            headers={"Content-Type": "application/msgpack"}
+        )
+        assert response.status_code == 200
+        assert response.json()["accepted"] == 3
+    
+    def test_openapi_lists_binary_content_types(self, client):
+        """Test the schema advertises every accepted body type"""
+        content = client.get("/openapi.json").json()["paths"]["/api/email"]["post"]["requestBody"]["content"]
+        assert sorted(content) == ["application/cbor", "application/json", "application/msgpack"]
+
+
+class TestIdempotency:
+    """Test Idempotency-Key handling on /api/email"""
+    
+    @staticmethod
+    def payload(subject="Test Subject"):
+        return {
+            "token": "test-token-12345",
+            "data": {
+                "email_subject": subject,
+                "email_sender": "sender@example.com",
+                "email_timestream": "2024-01-01T00:00:00Z",
+                "email_content": "Test content"
+            }
+        }
+    
+    def test_repeated_key_publishes_once(self, client):
+        """Test a retried request is answered from the cache and not published again"""
+        with patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs', return_value=True) as mock_publish:
+            headers = {"Idempotency-Key": "retry-1"}
+            first = client.post("/api/email", json=self.payload(), headers=headers)
+            second = client.post("/api/email", json=self.payload(), headers=headers)
+        
+        assert first.status_code == second.status_code == 200
+        assert first.json() == second.json()
+        assert "Idempotent-Replayed" not in first.headers
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert mock_publish.call_count == 1
+    
+    def test_key_reused_with_different_payload(self, client):
+        """Test reusing a key for a different email is rejected with 422"""
+        with patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs', return_value=True) as mock_publish:
+            headers = {"Idempotency-Key": "retry-2"}
+            client.post("/api/email", json=self.payload(), headers=headers)
+            response = client.post("/api/email", json=self.payload("Other"), headers=headers)
+        
+        assert response.status_code == 422
+        assert "Idempotency-Key" in response.json()["detail"]
+        assert mock_publish.call_count == 1
+    
+    def test_failed_publish_can_be_retried(self, client):
+        """Test a 500 is not cached, so the retry publishes"""
+        with patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs', side_effect=[Exception("SQS Error"), True]):
+            headers = {"Idempotency-Key": "retry-3"}
+            assert client.post("/api/email", json=self.payload(), headers=headers).status_code == 500
+            response = client.post("/api/email", json=self.payload(), headers=headers)
+        
+        assert response.status_code == 200
+        assert "Idempotent-Replayed" not in response.headers
+    
+    def test_without_key_every_request_publishes(self, client):
+        """Test requests without a key are not deduplicated by default"""
+        with patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs', return_value=True) as mock_publish:
+            client.post("/api/email", json=self.payload())
+            client.post("/api/email", json=self.payload())
+        
+        assert mock_publish.call_count == 2
+    
+    def test_derived_key_deduplicates_identical_payloads(self, client):
+        """Test IDEMPOTENCY_DERIVE_KEY deduplicates identical emails without a header"""
+        with patch('app.main.IDEMPOTENCY_DERIVE_KEY', True), \
+             patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs', return_value=True) as mock_publish:
+            client.post("/api/email", json=self.payload())
+            response = client.post("/api/email", json=self.payload())
+        
+        assert response.headers["Idempotent-Replayed"] == "true"
+        assert mock_publish.call_count == 1
+    
+    def test_invalid_key_rejected(self, client):
+        """Test an over-long Idempotency-Key is a 400"""
+        with patch('app.main.validate_token', return_value=True):
+            response = client.post(
+                "/api/email",
+                json=self.payload(),
+                headers={"Idempotency-Key": "x" * 256}
+            )
+        
+        assert response.status_code == 400
+
+
+class TestAdmissionControl:
+    """Test load shedding on /api/email"""
+    
+    @staticmethod
+    def payload(sender="sender@example.com"):
+        return {
+            "token": "test-token-12345",
+            "data": {
+                "email_subject": "Test Subject",
+                "email_sender": sender,
+                "email_timestream": "2024-01-01T00:00:00Z",
+                "email_content": "Test content"
+            }
+        }
+    
+    def test_overloaded_service_sheds_before_token_check(self, client):
+        """Test a saturated limiter answers 503 without touching SSM or SQS"""
+        limiter = app_main.ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=0)
+        limiter.active = 1
+        with patch('app.main.admission_limiter', limiter), \
+             patch('app.main.validate_token_async') as mock_validate, \
+             patch('app.main.publish_to_sqs') as mock_publish:
+            response = client.post("/api/email", json=self.payload())
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        mock_validate.assert_not_called()
+        mock_publish.assert_not_called()
+    
+    def test_sender_rate_limit(self, client):
+        """Test a sender over its budget gets 429 while other senders are served"""
+        limiter = app_main.SenderRateLimiter(rate=0.5, burst=1, stats=app_main.admission_stats)
+        with patch('app.main.sender_rate_limiter', limiter), \
+             patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs', return_value=True) as mock_publish:
+            first = client.post("/api/email", json=self.payload())
+            limited = client.post("/api/email", json=self.payload())
+            other = client.post("/api/email", json=self.payload("other@example.com"))
+        
+        assert first.status_code == 200
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "2"
+        assert other.status_code == 200
+        assert mock_publish.call_count == 2
+    
+    def test_admission_stats_endpoint(self, client):
+        """Test the shedding counters are exposed"""
+        response = client.get("/stats/admission")
+        assert response.status_code == 200
+        body = response.json()
+        for counter in ("admitted", "shed_queue_full", "shed_queue_timeout", "rate_limited", "active", "waiting"):
+            assert counter in body
+
+
+class TestMetricsEndpoint:
+    """Test the Prometheus /metrics endpoint"""
+    
+    def test_stage_histograms_recorded_for_email(self, client, mock_ssm_token):
+        """Test one request records token validation, validation and SQS send latencies"""
+        def count(stage):
+            return app_main.metrics.REGISTRY.get_sample_value(
+                "ms1_stage_duration_seconds_count", {"stage": stage}
+            ) or 0.0
+        
+        stages = ("ssm_fetch", "token_validation", "validation", "sqs_send", "publish")
+        before = {stage: count(stage) for stage in stages}
+        with patch('app.main.get_ssm_client') as mock_ssm_client, \
+             patch('app.main.get_sqs_client') as mock_sqs_client:
+            mock_ssm_client.return_value.get_parameter.return_value = {"Parameter": {"Value": mock_ssm_token}}
+            mock_sqs_client.return_value.send_message.return_value = {"MessageId": "m-1"}
+            response = client.post("/api/email", json={
+                "token": mock_ssm_token,
+                "data": make_email()
+            })
+        
+        assert response.status_code == 200
+        for stage in stages:
+            assert count(stage) == before[stage] + 1, stage
+    
+    def test_metrics_exposition(self, client):
+        """Test /metrics serves request, stage and admission metrics as Prometheus text"""
+        client.get("/health")
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'ms1_http_requests_total{endpoint="/health",method="GET",status="200"}' in text
+        assert "ms1_stage_duration_seconds_bucket" in text
+        assert "ms1_http_requests_in_flight" in text
+        assert 'ms1_admission_requests_total{outcome="shed_queue_full"}' in text
+
+
+class TestServerTiming:
+    """Test per-request stage timings on /api/email"""
+    
+    def test_server_timing_breakdown(self, mock_ssm_token):
+        """Test the header reports body read, validation, token (incl. SSM on the executor) and publish"""
+        timed_app = app_main.RequestTimingMiddleware(app, server_timing=True)
+        with patch('app.main.get_ssm_client') as mock_ssm_client, \
+             patch('app.main.get_sqs_client') as mock_sqs_client:
+            mock_ssm_client.return_value.get_parameter.return_value = {"Parameter": {"Value": mock_ssm_token}}
+            mock_sqs_client.return_value.send_message.return_value = {"MessageId": "m-1"}
+            response = TestClient(timed_app).post("/api/email", json={
+                "token": mock_ssm_token,
+                "data": make_email()
+            })
+        
+        assert response.status_code == 200
+        stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+        for expected in ("read_body", "validation", "ssm_fetch", "token_validation", "sqs_send", "publish", "total"):
+            assert expected in stages
+
+
+class FakeAWSClient:
+    """Client whose construction and first call are slow, like a cold boto3 client (TLS handshake)"""
+    
+    CONNECT_DELAY = 0.2
+    
+    def __init__(self, service_name, token):
+        time.sleep(self.CONNECT_DELAY)
+        self.service_name = service_name
+        self.token = token
+        self.connected = False
+    
+    def _call(self, result):
+        if not self.connected:
+            time.sleep(self.CONNECT_DELAY)
+            self.connected = True
+        return result
+    
+    def get_parameter(self, **kwargs):
+        return self._call({"Parameter": {"Value": self.token}})
+    
+    def send_message(self, **kwargs):
+        return self._call({"MessageId": "m-1"})
+    
+    def get_queue_attributes(self, **kwargs):
+        return self._call({"Attributes": {}})
+    
+    def get_bucket_location(self, **kwargs):
+        return self._call({"LocationConstraint": "eu-west-1"})
+
+
+class TestColdStart:
+    """Test clients are built and warmed at startup instead of on the first request"""
+    
+    @pytest.fixture
+    def fake_clients(self, mock_ssm_token):
+        created = []
+        
+        def create(service_name):
+            created.append(service_name)
+            return FakeAWSClient(service_name, mock_ssm_token)
+        
+        with patch('app.main._create_client', side_effect=create), \
+             patch('app.main.ssm_client', None), \
+             patch('app.main.sqs_client', None), \
+             patch('app.main.s3_client', None), \
+             patch('app.main.CLAIM_CHECK_BUCKET', "claim-bucket"):
+            yield created
+    
+    def first_request_seconds(self, client, token):
+        start = time.perf_counter()
+        response = client.post("/api/email", json={"token": token, "data": make_email()})
+        assert response.status_code == 200
+        return time.perf_counter() - start
+    
+    def test_first_request_pays_for_cold_clients_without_startup(self, fake_clients, mock_ssm_token):
+        """Test the baseline: lazily created clients make the first request slow"""
+        elapsed = self.first_request_seconds(TestClient(app), mock_ssm_token)
+        assert elapsed >= 4 * FakeAWSClient.CONNECT_DELAY
+    
+    def test_startup_removes_first_request_penalty(self, fake_clients, mock_ssm_token):
+        """Test that after startup the first request creates no client and opens no connection"""
+        with TestClient(app) as client:
+            assert sorted(fake_clients) == ["s3", "sqs", "ssm"]
+            assert app_main.sqs_client.connected and app_main.ssm_client.connected
+            assert app_main.token_cache.is_fresh()
+            
+            elapsed = self.first_request_seconds(client, mock_ssm_token)
+        
+        assert sorted(fake_clients) == ["s3", "sqs", "ssm"]
+        assert elapsed < FakeAWSClient.CONNECT_DELAY
+    
+    def test_client_config_is_tuned(self):
+        """Test pool size, timeouts and retry mode come from configuration"""
+        config = app_main._client_config()
+        assert config.max_pool_connections == app_main.AWS_MAX_POOL_CONNECTIONS
+        assert config.connect_timeout == app_main.AWS_CONNECT_TIMEOUT
+        assert config.read_timeout == app_main.AWS_READ_TIMEOUT
+        assert config.retries == {"mode": app_main.AWS_RETRY_MODE, "max_attempts": app_main.AWS_MAX_ATTEMPTS}
+    
+    def test_concurrent_getters_build_one_client(self):
+        """Test lazily creating a client from many threads builds it once"""
+        created = []
+        
+        def create(service_name):
+            created.append(service_name)
+            time.sleep(0.01)
+            return Mock()
+        
+        with patch('app.main._create_client', side_effect=create), \
+             patch('app.main.sqs_client', None):
+            threads = [threading.Thread(target=app_main.get_sqs_client) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        assert created == ["sqs"]
+    
+    def test_reset_after_fork_starts_worker_clean(self, mock_ssm_token):
+        """Test a forked worker drops inherited clients, background tasks, caches and circuit state"""
+        with patch('app.main.get_token_from_ssm', return_value=mock_ssm_token):
+            assert validate_token(mock_ssm_token)
+        app_main.idempotency_cache.backend.put("key", StoredResponse("fingerprint", {"status": "success"}))
+        app_main.sender_rate_limiter.check("sender@example.com")
+        for _ in range(app_main.sqs_circuit.failure_threshold):
+            app_main.sqs_circuit.record(False)
+        app_main.stats_publisher.publish()
+        
+        with patch('app.main.configure_logging') as mock_configure_logging, \
+             patch('app.main.ssm_client', Mock()), \
+             patch('app.main.sqs_client', Mock()), \
+             patch('app.main.s3_client', Mock()), \
+             patch('app.main.aws_executor', Mock()), \
+             patch('app.main.sqs_batcher', Mock()), \
+             patch('app.main.message_spool', Mock()), \
+             patch('app.main.spool_drainer', Mock()), \
+             patch('app.main.readiness_checker', Mock()):
+            app_main.reset_after_fork()
+            
+            mock_configure_logging.assert_called_once_with(force=True)
+            for name in ("ssm_client", "sqs_client", "s3_client", "aws_executor", "sqs_batcher",
+                         "message_spool", "spool_drainer", "readiness_checker"):
+                assert getattr(app_main, name) is None, name
+        
+        assert not app_main.token_cache.is_fresh()
+        assert app_main.idempotency_cache.backend.get("key") is None
+        assert len(app_main.sender_rate_limiter) == 0
+        assert app_main.sqs_circuit.state == "closed"
+        assert app_main.stats_publisher._published == {}
+
+
+class TestSQSCircuitBreaker:
+    """Test the SQS circuit breaker and the local spool under injected SQS failures"""
+    
+    @pytest.fixture
+    def local_sqs(self, sqs):
+        with patch('app.main.get_sqs_client', return_value=sqs), \
+             patch('app.main.validate_token', return_value=True), \
+             patch('app.main.AWS_WARMUP_ENABLED', False), \
+             patch.object(app_main.sqs_circuit, 'failure_threshold', 3), \
+             patch.object(app_main.sqs_circuit, 'reset_timeout', 0.1):
+            yield sqs
+    
+    @staticmethod
+    def post(client, index):
+        return client.post("/api/email", json={"token": "t", "data": make_email(index)})
+    
+    def test_open_circuit_fails_fast_without_spool(self, local_sqs, client):
+        """Test that once the circuit opens, requests get 503 without calling SQS"""
+        local_sqs.failing = True
+        statuses = [self.post(client, i).status_code for i in range(5)]
+        
+        assert statuses == [500, 500, 500, 503, 503]
+        assert local_sqs.calls == 3
+        response = self.post(client, 5)
+        assert response.headers["Retry-After"] == "1"
+    
+    def test_spooled_while_failing_and_replayed_after_recovery(self, local_sqs, tmp_path):
+        """Test requests are accepted into the spool during an outage and drained once SQS is back"""
+        with patch('app.main.SPOOL_DIR', str(tmp_path)), \
+             patch('app.main.SPOOL_DRAIN_INTERVAL_MS', 10):
+            with TestClient(app) as spool_client:
+                local_sqs.failing = True
+                responses = [self.post(spool_client, i) for i in range(6)]
+                assert [r.status_code for r in responses] == [200] * 6
+                assert all("spooled" in r.json()["message"] for r in responses)
+                assert local_sqs.calls <= 4  # 3 failed sends, at most one drain probe
+                assert app_main.spool_stats.spooled >= 6
+                
+                local_sqs.failing = False
+                deadline = time.monotonic() + 5
+                while len(local_sqs.received) < 6 and time.monotonic() < deadline:
+                    time.sleep(0.02)
+                
+                metrics_text = spool_client.get("/metrics").text
+        
+        assert len(local_sqs.received) == 6
+        assert app_main.sqs_circuit.state == "closed"
+        assert "ms1_spool_bytes 0.0" in metrics_text
+        assert 'ms1_spool_messages_total{event="drained"}' in metrics_text
+    
+    def test_shutdown_replays_spool_before_exit(self, local_sqs, tmp_path):
+        """Test messages spooled during an outage are replayed by shutdown once SQS is back"""
+        with patch('app.main.SPOOL_DIR', str(tmp_path)), \
+             patch('app.main.SPOOL_DRAIN_INTERVAL_MS', 60000):
+            with TestClient(app) as spool_client:
+                local_sqs.failing = True
+                statuses = [self.post(spool_client, i).status_code for i in range(4)]
+                assert statuses == [200] * 4
+                local_sqs.failing = False
+                app_main.sqs_circuit.reset()
+                assert local_sqs.received == []
+        
+        assert len(local_sqs.received) == 4
+        assert not any(name.endswith(".seg") for name in os.listdir(tmp_path))
+    
+    def test_slow_sqs_opens_circuit(self, local_sqs, client):
+        """Test sends slower than the slow-call threshold open the circuit"""
+        original = local_sqs.send_message
+        
+        def slow_send_message(**kwargs):
+            time.sleep(0.02)
+            return original(**kwargs)
+        
+        local_sqs.send_message = slow_send_message
+        with patch.object(app_main.sqs_circuit, 'slow_call_threshold', 0.01):
+            statuses = [self.post(client, i).status_code for i in range(4)]
+        
+        assert statuses == [200, 200, 200, 503]
+
+
+def make_email(index=0, **overrides):
+    """Build a valid EmailData dict"""
+    email = {
+        "email_subject": f"Subject {index}",
+        "email_sender": "sender@example.com",
+        "email_timestream": "1704067200",
+        "email_content": f"Content {index}"
+    }
+    email.update(overrides)
+    return email
+
+
+class TestReadinessEndpoint:
+    """Test /ready reflects dependency probes, the SQS circuit and admission"""
+    
+    @pytest.fixture
+    def checker(self):
+        async def healthy():
+            return None
+        
+        checker = app_main.ReadinessChecker({"ssm": healthy, "sqs": healthy})
+        asyncio.run(checker.check_once())
+        with patch('app.main.readiness_checker', checker):
+            yield checker
+    
+    def test_ready_when_dependencies_are_up(self, checker, client):
+        """Test a fresh successful probe of every dependency makes the task ready"""
+        response = client.get("/ready")
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ready"
+        assert body["reasons"] == []
+        assert body["dependencies"]["sqs"]["status"] == "ok"
+        assert "latency_ms" in body["dependencies"]["ssm"]
+    
+    def test_failing_dependency_is_not_ready(self, checker, client):
+        """Test a failing probe result turns /ready into a 503 naming the dependency"""
+        async def unreachable():
+            raise ConnectionError("could not connect")
+        
+        checker.probes["sqs"] = unreachable
+        asyncio.run(checker.check_once())
+        response = client.get("/ready")
+        
+        assert response.status_code == 503
+        body = response.json()
+        assert body["reasons"] == ["sqs failing"]
+        assert body["dependencies"]["sqs"]["error"] == "could not connect"
+        assert client.get("/health").status_code == 200
+    
+    def test_open_circuit_is_not_ready(self, checker, client):
+        """Test the task is taken out of rotation while the SQS circuit is open and nothing can be spooled"""
+        for _ in range(app_main.sqs_circuit.failure_threshold):
+            app_main.sqs_circuit.record(False)
+        response = client.get("/ready")
+        
+        assert response.status_code == 503
+        assert response.json()["reasons"] == ["sqs circuit open"]
+        assert response.json()["sqs_circuit"] == "open"
+    
+    def test_sqs_trouble_with_spool_stays_ready(self, checker, client):
+        """Test an open circuit and failing SQS probe only degrade a task that spools"""
+        async def unreachable():
+            raise ConnectionError("could not connect")
+        
+        checker.probes["sqs"] = unreachable
+        asyncio.run(checker.check_once())
+        for _ in range(app_main.sqs_circuit.failure_threshold):
+            app_main.sqs_circuit.record(False)
+        with patch('app.main.message_spool', Mock()):
+            response = client.get("/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["reasons"] == []
+        assert response.json()["degraded"] == ["sqs failing", "sqs circuit open"]
+    
+    def test_ssm_failure_with_cached_token_stays_ready(self, checker, client, mock_ssm_token):
+        """Test a failing SSM probe is tolerated while the cached token is valid, not once it expired"""
+        async def unreachable():
+            raise ConnectionError("could not connect")
+        
+        checker.probes["ssm"] = unreachable
+        asyncio.run(checker.check_once())
+        
+        assert client.get("/ready").status_code == 503
+        
+        with patch('app.main.get_token_from_ssm', return_value=mock_ssm_token):
+            app_main.token_cache.get()
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["degraded"] == ["ssm failing"]
+    
+    def test_saturated_admission_stays_ready(self, checker, client):
+        """Test a saturated task stays in rotation so its load does not cascade onto the others"""
+        limiter = app_main.ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=0)
+        limiter.active = 1
+        with patch('app.main.admission_limiter', limiter):
+            response = client.get("/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["degraded"] == ["admission saturated"]
+        assert response.json()["admission"]["saturated"] is True
+    
+    def test_probes_run_in_background_not_per_request(self):
+        """Test startup begins probing SSM and SQS and /ready itself makes no AWS call"""
+        ssm, sqs = Mock(), Mock()
+        ssm.get_parameter.return_value = {"Parameter": {"Value": "test-token-12345"}}
+        sqs.get_queue_attributes.return_value = {"Attributes": {}}
+        with patch('app.main.get_ssm_client', return_value=ssm), \
+             patch('app.main.get_sqs_client', return_value=sqs), \
+             patch('app.main.AWS_WARMUP_ENABLED', False), \
+             patch('app.main.READY_PROBE_INTERVAL', 60):
+            with TestClient(app) as ready_client:
+                deadline = time.monotonic() + 5
+                while not app_main.readiness_checker.ready and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                calls = (ssm.get_parameter.call_count, sqs.get_queue_attributes.call_count)
+                responses = [ready_client.get("/ready") for _ in range(5)]
+                metrics_text = ready_client.get("/metrics").text
+        
+        assert calls == (1, 1)
+        assert (ssm.get_parameter.call_count, sqs.get_queue_attributes.call_count) == calls
+        assert all(r.status_code == 200 for r in responses)
+        assert "ms1_ready 1.0" in metrics_text
+        assert app_main.readiness_checker is None
+
+
+def batch_send_side_effect(QueueUrl, Entries):
+    """Fake SendMessageBatch response accepting every entry"""
+    return {"Successful": [{"Id": e["Id"], "MessageId": f"id-{e['Id']}"} for e in Entries]}
+
+
+class TestBatchEndpoint:
+    """Test POST /api/email/batch"""
+    
+    @patch('app.main.get_sqs_client')
+    def test_batch_all_accepted(self, mock_sqs_client, client):
+        """Test a batch of 25 items is published in 3 SendMessageBatch calls"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.side_effect = batch_send_side_effect
+        mock_sqs_client.return_value = mock_sqs
+        
+        with patch('app.main.validate_token', return_value=True) as mock_validate:
+            response = client.post("/api/email/batch", json={
+                "token": "test-token",
+                "items": [make_email(i) for i in range(25)]
+            })
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "success"
+        assert body["accepted"] == 25
+        assert [r["index"] for r in body["results"]] == list(range(25))
+        assert mock_sqs.send_message_batch.call_count == 3
+        mock_validate.assert_called_once()
+    
+    @patch('app.main.get_sqs_client')
+    def test_batch_partial_rejection(self, mock_sqs_client, client):
+        """Test invalid items are rejected with a reason while others are published"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.side_effect = batch_send_side_effect
+        mock_sqs_client.return_value = mock_sqs
+        
+        items = [make_email(0), make_email(1, email_subject="   "), {"email_subject": "x"}, make_email(3)]
+        with patch('app.main.validate_token', return_value=True):
+            response = client.post("/api/email/batch", json={"token": "test-token", "items": items})
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "partial"
+        assert body["accepted"] == 2
+        assert [r["status"] for r in body["results"]] == ["accepted", "rejected", "rejected", "accepted"]
+        assert "email_subject" in body["results"][1]["reason"]
+        assert "email_content" in body["results"][2]["reason"]
+        entries = mock_sqs.send_message_batch.call_args.kwargs["Entries"]
+        assert len(entries) == 2
+    
+    @patch('app.main.get_sqs_client')
+    def test_batch_sqs_entry_failure(self, mock_sqs_client, client):
+        """Test an entry rejected by SQS is reported against the right item"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.return_value = {
+            "Successful": [{"Id": "0", "MessageId": "id-0"}],
+            "Failed": [{"Id": "1", "Code": "InternalError", "Message": "try again", "SenderFault": False}]
+        }
+        mock_sqs_client.return_value = mock_sqs
+        
+        with patch('app.main.validate_token', return_value=True):
+            response = client.post("/api/email/batch", json={
+                "token": "test-token",
+                "items": [make_email(0), make_email(1)]
+            })
+        
+        results = response.json()["results"]
+        assert results[0]["status"] == "accepted"
+        assert results[1]["status"] == "rejected"
+        assert "InternalError" in results[1]["reason"]
+    
+    def test_batch_invalid_token(self, client):
+        """Test the whole batch is refused with an invalid token"""
+        with patch('app.main.validate_token', return_value=False):
+            response = client.post("/api/email/batch", json={
+                "token": "invalid-token",
+                "items": [make_email(0)]
+            })
+        assert response.status_code == 401
+    
+    def test_batch_too_many_items(self, client):
+        """Test the item count limit"""
+        with patch('app.main.EMAIL_BATCH_MAX_ITEMS', 2), \
+             patch('app.main.validate_token', return_value=True) as mock_validate:
+            response = client.post("/api/email/batch", json={
+                "token": "test-token",
+                "items": [make_email(i) for i in range(3)]
+            })
+        assert response.status_code == 413
+        mock_validate.assert_not_called()
+    
+    def test_batch_body_too_large(self, client):
+        """Test the body size limit"""
+        with patch('app.main.EMAIL_BATCH_MAX_BYTES', 100):
+            response = client.post("/api/email/batch", json={
+                "token": "test-token",
+                "items": [make_email(0, email_content="x" * 200)]
+            })
+        assert response.status_code == 413
+    
+    def test_batch_malformed_payload(self, client):
+        """Test a body without items is a validation error"""
+        response = client.post("/api/email/batch", json={"token": "test-token"})
+        assert response.status_code == 422
+    
+    def test_batch_overloaded_service_sheds(self, client):
+        """Test a saturated limiter answers 503 to a batch before the token check"""
+        limiter = app_main.ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=0)
+        limiter.active = 1
+        with patch('app.main.admission_limiter', limiter), \
+             patch('app.main.validate_token_async') as mock_validate:
+            response = client.post("/api/email/batch", json={"token": "test-token", "items": [make_email(0)]})
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        mock_validate.assert_not_called()
+    
+    @patch('app.main.get_sqs_client')
+    def test_batch_sender_rate_limit_per_item(self, mock_sqs_client, client):
+        """Test items over their sender's budget are rejected while other senders are published"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.side_effect = batch_send_side_effect
+        mock_sqs_client.return_value = mock_sqs
+        limiter = app_main.SenderRateLimiter(rate=0.5, burst=2, stats=app_main.admission_stats)
+        items = [make_email(i) for i in range(3)] + [make_email(3, email_sender="other@example.com")]
+        with patch('app.main.sender_rate_limiter', limiter), \
+             patch('app.main.validate_token', return_value=True):
+            response = client.post("/api/email/batch", json={"token": "test-token", "items": items})
+        
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["accepted", "accepted", "rejected", "accepted"]
+        assert results[2]["reason"] == "Sender rate limit exceeded"
+    
+    def test_batch_send_failures_open_circuit(self, client, sqs):
+        """Test failed SendMessageBatch calls open the SQS circuit and later batches get 503"""
+        sqs.failing = True
+        with patch('app.main.get_sqs_client', return_value=sqs), \
+             patch('app.main.validate_token', return_value=True), \
+             patch.object(app_main.sqs_circuit, 'failure_threshold', 3):
+            failed = client.post("/api/email/batch", json={
+                "token": "test-token",
+                "items": [make_email(i) for i in range(30)]
+            })
+            refused = client.post("/api/email/batch", json={"token": "test-token", "items": [make_email(0)]})
+        
+        assert failed.json()["rejected"] == 30
+        assert app_main.sqs_circuit.state == "open"
+        assert refused.status_code == 503
+        assert "Retry-After" in refused.headers
+        assert sqs.calls == 3
+
+
+class TestStreamEndpoint:
+    """Test POST /api/email/stream"""
+    
+    @patch('app.main.get_sqs_client')
+    def test_stream_publishes_valid_lines(self, mock_sqs_client, client):
+        """Test NDJSON records are validated and published in batches"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.side_effect = batch_send_side_effect
+        mock_sqs_client.return_value = mock_sqs
+        
+        lines = [json.dumps(make_email(i)) for i in range(12)]
+        lines.insert(3, json.dumps(make_email(99, email_content="")))
+        lines.insert(6, "not json")
+        body = "\n".join(lines) + "\n"
+        
+        with patch('app.main.validate_token', return_value=True):
+            response = client.post(
+                "/api/email/stream",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson", "X-API-Token": "test-token"}
+            )
+        
+        assert response.status_code == 200
+        summary = response.json()
+        assert summary["received"] == 14
+        assert summary["accepted"] == 12
+        assert [r["line"] for r in summary["rejected_lines"]] == [4, 7]
+        assert mock_sqs.send_message_batch.call_count == 2
+    
+    async def test_stream_line_passthrough(self):
+        """Test unchanged records are forwarded byte-for-byte and others rebuilt"""
+        unchanged = json.dumps(make_email(0)).encode()
+        stripped = json.dumps(make_email(1, email_subject="  padded  ")).encode()
+        extra = json.dumps(make_email(2, extra_field="ignored")).encode()
+        
+        with patch('app.main.ENVELOPE_CODEC', 'identity'):
+            forwarded = await app_main.parse_email_line(unchanged + b"\r")
+            rebuilt = await app_main.parse_email_line(stripped)
+            without_extra = await app_main.parse_email_line(extra)
+        
+        assert forwarded.body.encode() == unchanged
+        assert json.loads(rebuilt.body)["email_subject"] == "padded"
+        assert "extra_field" not in json.loads(without_extra.body)
+    
+    def test_stream_requires_ndjson(self, client):
+        """Test other content types are refused"""
+        response = client.post(
+            "/api/email/stream",
+            json=make_email(0),
+            headers={"X-API-Token": "test-token"}
+        )
+        assert response.status_code == 415
+    
+    def test_stream_invalid_token(self, client):
+        """Test the stream is refused with an invalid token"""
+        with patch('app.main.validate_token', return_value=False):
+            response = client.post(
+                "/api/email/stream",
+                content=json.dumps(make_email(0)),
+                headers={"Content-Type": "application/x-ndjson", "X-API-Token": "bad"}
+            )
+        assert response.status_code == 401
+    
+    def test_stream_overloaded_service_sheds(self, client):
+        """Test a saturated limiter answers 503 to a stream before the token check"""
+        limiter = app_main.ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=0)
+        limiter.active = 1
+        with patch('app.main.admission_limiter', limiter), \
+             patch('app.main.validate_token_async') as mock_validate:
+            response = client.post(
+                "/api/email/stream",
+                content=json.dumps(make_email(0)),
+                headers={"Content-Type": "application/x-ndjson", "X-API-Token": "test-token"}
+            )
+        
+        assert response.status_code == 503
+        mock_validate.assert_not_called()
+    
+    @patch('app.main.get_sqs_client')
+    def test_stream_sender_rate_limit_per_line(self, mock_sqs_client, client):
+        """Test lines over their sender's budget are rejected"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.side_effect = batch_send_side_effect
+        mock_sqs_client.return_value = mock_sqs
+        limiter = app_main.SenderRateLimiter(rate=0.5, burst=2, stats=app_main.admission_stats)
+        body = "\n".join(json.dumps(make_email(i)) for i in range(4)) + "\n"
+        with patch('app.main.sender_rate_limiter', limiter), \
+             patch('app.main.validate_token', return_value=True):
+            response = client.post(
+                "/api/email/stream",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson", "X-API-Token": "test-token"}
+            )
+        
+        summary = response.json()
+        assert summary["accepted"] == 2
+        assert [r["line"] for r in summary["rejected_lines"]] == [3, 4]
+        assert summary["rejected_lines"][0]["reason"] == "Sender rate limit exceeded"
+
+
+class TestClaimCheck:
+    """Test offloading oversized email bodies to S3"""
+    
+    async def test_small_message_stays_inline(self):
+        """Test messages under the threshold are not offloaded"""
+        with patch('app.main.CLAIM_CHECK_BUCKET', 'test-bucket'), \
+             patch('app.main.get_s3_client') as mock_s3_client:
+            message = await app_main.prepare_message(make_email(0))
+        
+        assert json.loads(message.body)["email_content"] == "Content 0"
+        mock_s3_client.assert_not_called()
+    
+    async def test_large_message_is_offloaded(self):
+        """Test messages over the threshold are written to S3 and replaced by a pointer"""
+        mock_s3 = Mock()
+        large = make_email(0, email_content="x" * 2048)
+        with patch('app.main.CLAIM_CHECK_BUCKET', 'test-bucket'), \
+             patch('app.main.CLAIM_CHECK_THRESHOLD_BYTES', 1024), \
+             patch('app.main.ENVELOPE_CODEC', 'identity'), \
+             patch('app.main.get_s3_client', return_value=mock_s3):
+            message = await app_main.prepare_message(large)
+        
+        pointer = json.loads(message.body)
+        assert "email_content" not in pointer
+        assert pointer["email_subject"] == large["email_subject"]
+        assert pointer["claim_check"]["bucket"] == "test-bucket"
+        assert pointer["claim_check"]["key"].startswith("claim-checks/")
+        stored = mock_s3.put_object.call_args.kwargs
+        assert stored["Key"] == pointer["claim_check"]["key"]
+        assert json.loads(stored["Body"]) == large
+    
+    async def test_compressible_message_stays_inline(self):
+        """Test the threshold applies to the compressed size"""
+        large = make_email(0, email_content="x" * 4096)
+        with patch('app.main.CLAIM_CHECK_BUCKET', 'test-bucket'), \
+             patch('app.main.CLAIM_CHECK_THRESHOLD_BYTES', 1024), \
+             patch('app.main.ENVELOPE_CODEC', 'gzip'), \
+             patch('app.main.get_s3_client') as mock_s3_client:
+            message = await app_main.prepare_message(large)
+        
+        assert message.codec == "gzip"
+        assert message.size < 1024
+        mock_s3_client.assert_not_called()
+    
+    async def test_claim_check_disabled_without_bucket(self):
+        """Test nothing is offloaded when no bucket is configured"""
+        with patch('app.main.CLAIM_CHECK_BUCKET', None), \
+             patch('app.main.CLAIM_CHECK_THRESHOLD_BYTES', 10), \
+             patch('app.main.get_s3_client') as mock_s3_client:
+            message = await app_main.prepare_message(make_email(0))
+        
+        assert "email_content" in json.loads(message.body)
+        mock_s3_client.assert_not_called()
+    
+    def test_process_email_claim_check_failure(self, client):
+        """Test an S3 failure while offloading returns 500"""
+        mock_s3 = Mock()
+        mock_s3.put_object.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}}, 'PutObject')
+        with patch('app.main.CLAIM_CHECK_BUCKET', 'test-bucket'), \
+             patch('app.main.CLAIM_CHECK_THRESHOLD_BYTES', 10), \
+             patch('app.main.get_s3_client', return_value=mock_s3), \
+             patch('app.main.validate_token', return_value=True), \
+             patch('app.main.publish_to_sqs') as mock_publish:
+            response = client.post("/api/email", json={"token": "test-token", "data": make_email(0)})
+        
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Failed to store email content"
+        mock_publish.assert_not_called()
+
+
+class TestConcurrency:
+    """Test that slow AWS calls do not serialise requests"""
+    
+    async def test_parallel_requests_overlap_sqs_latency(self, mock_ssm_token):
+        """Test N parallel requests finish in about one SQS latency, not N"""
+        sqs_latency = 0.2
+        parallel_requests = 10
+        
+        def slow_send_message(**kwargs):
+            time.sleep(sqs_latency)
+            return {"MessageId": "test-message-id"}
+        
+        mock_sqs = Mock()
+        mock_sqs.send_message.side_effect = slow_send_message
+        payload = {
+            "token": mock_ssm_token,
+            "data": {
+                "email_subject": "Test Subject",
+                "email_sender": "sender@example.com",
+                "email_timestream": "2024-01-01T00:00:00Z",
+                "email_content": "Test content"
+            }
+        }
+        
+        with patch('app.main.validate_token', return_value=True), \
+             patch('app.main.get_sqs_client', return_value=mock_sqs):
+            async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+                start = time.perf_counter()
+                responses = await asyncio.gather(*(
+                    async_client.post("/api/email", json=payload)
+                    for _ in range(parallel_requests)
+                ))
+                elapsed = time.perf_counter() - start
+        
+        assert all(r.status_code == 200 for r in responses)
+        assert mock_sqs.send_message.call_count == parallel_requests
+        assert elapsed < sqs_latency * 3  # Serial execution would take sqs_latency * 10
 
 
 class TestSQSIntegration:
     """Test SQS publishing"""
     
+    def test_default_codec_is_readable_by_any_consumer(self):
+        """Test messages are published uncompressed unless a codec is configured"""
+        assert os.environ.get("ENVELOPE_CODEC") is None
+        assert app_main.ENVELOPE_CODEC == "identity"
+        message = app_main.encode_sqs_message(make_email(0, email_content="x" * 4096))
+        assert json.loads(message.body) == make_email(0, email_content="x" * 4096)
+    
     @patch('app.main.get_sqs_client')
     def test_publish_to_sqs_success(self, mock_sqs_client):
         """Test successful SQS publish"""
@@ -236,6 +1277,9 @@ class TestSQSIntegration:
         result = publish_to_sqs(message)
         assert result is True
         mock_sqs.send_message.assert_called_once()
+        attributes = mock_sqs.send_message.call_args.kwargs["MessageAttributes"]
+        assert attributes["EnvelopeVersion"]["StringValue"] == "1"
+        assert attributes["ContentEncoding"]["StringValue"] == "identity"
     
     @patch('app.main.get_sqs_client')
     def test_publish_to_sqs_error(self, mock_sqs_client):
@@ -255,4 +1299,54 @@ class TestSQSIntegration:
         }
         
         with pytest.raises(Exception):  # Should raise HTTPException
-            publish_to_sqs(message)
\ No newline at end of file
+            publish_to_sqs(message)
+    
+    @patch('app.main.get_sqs_client')
+    def test_publish_batch_to_sqs_maps_results(self, mock_sqs_client):
+        """Test per-entry batch results are returned in request order"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.return_value = {
+            "Successful": [
+                {"Id": "0", "MessageId": "id-0"},
+                {"Id": "2", "MessageId": "id-2"}
+            ],
+            "Failed": [
+                {"Id": "1", "Code": "InvalidMessageContents", "Message": "bad", "SenderFault": True}
+            ]
+        }
+        mock_sqs_client.return_value = mock_sqs
+        
+        results = app_main.publish_batch_to_sqs([app_main.EncodedMessage.identity(b) for b in ["a", "b", "c"]])
+        
+        assert results[0] == "id-0"
+        assert isinstance(results[1], app_main.SQSPublishError)
+        assert results[2] == "id-2"
+        entries = mock_sqs.send_message_batch.call_args.kwargs["Entries"]
+        assert [e["MessageBody"] for e in entries] == ["a", "b", "c"]
+    
+    @patch('app.main.get_sqs_client')
+    def test_process_email_with_batching(self, mock_sqs_client, mock_ssm_token):
+        """Test requests are published through send_message_batch when batching is enabled"""
+        mock_sqs = Mock()
+        mock_sqs.send_message_batch.side_effect = lambda QueueUrl, Entries: {
+            "Successful": [{"Id": e["Id"], "MessageId": f"id-{e['Id']}"} for e in Entries]
+        }
+        mock_sqs_client.return_value = mock_sqs
+        payload = {
+            "token": mock_ssm_token,
+            "data": {
+                "email_subject": "Test Subject",
+                "email_sender": "sender@example.com",
+                "email_timestream": "2024-01-01T00:00:00Z",
+                "email_content": "Test content"
+            }
+        }
+        
+        with patch('app.main.SQS_BATCHING_ENABLED', True), \
+             patch('app.main.validate_token', return_value=True):
+            with TestClient(app) as batching_client:
+                response = batching_client.post("/api/email", json=payload)
+        
+        assert response.status_code == 200
+        mock_sqs.send_message_batch.assert_called_once()
+        mock_sqs.send_message.assert_not_called()
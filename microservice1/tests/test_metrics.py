@@ -0,0 +1,129 @@
+"""
+Unit tests for the Prometheus metrics helpers
+"""
+import asyncio
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, Counter, Gauge
+
+from app import metrics
+
+
+def sample(name, **labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware, endpoints=("/ok", "/fail"))
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/fail")
+    async def fail():
+        raise HTTPException(status_code=503, detail="down")
+
+    return TestClient(app)
+
+
+class TestMetricsMiddleware:
+    """Test request counters and latency histograms"""
+
+    def test_requests_counted_by_status(self):
+        """Test each response is counted under its endpoint, method and status"""
+        client = make_app()
+        ok_before = sample("ms1_http_requests_total", endpoint="/ok", method="GET", status="200")
+        fail_before = sample("ms1_http_requests_total", endpoint="/fail", method="GET", status="503")
+
+        client.get("/ok")
+        client.get("/ok")
+        client.get("/fail")
+
+        assert sample("ms1_http_requests_total", endpoint="/ok", method="GET", status="200") == ok_before + 2
+        assert sample("ms1_http_requests_total", endpoint="/fail", method="GET", status="503") == fail_before + 1
+
+    def test_latency_observed_and_in_flight_returns_to_zero(self):
+        """Test a latency sample is recorded and the in-flight gauge is released"""
+        client = make_app()
+        before = sample("ms1_http_request_duration_seconds_count", endpoint="/ok")
+
+        client.get("/ok")
+
+        assert sample("ms1_http_request_duration_seconds_count", endpoint="/ok") == before + 1
+        assert sample("ms1_http_requests_in_flight", endpoint="/ok") == 0
+
+    def test_unknown_paths_share_one_label(self):
+        """Test arbitrary paths cannot blow up label cardinality"""
+        client = make_app()
+        before = sample("ms1_http_requests_total", endpoint="other", method="GET", status="404")
+
+        client.get("/does-not-exist/1")
+        client.get("/does-not-exist/2")
+
+        assert sample("ms1_http_requests_total", endpoint="other", method="GET", status="404") == before + 2
+
+
+class TestStatsPublisher:
+    """Test counters and gauges owned by other components"""
+
+    @staticmethod
+    def make_metrics():
+        registry = CollectorRegistry()
+        counter = Counter("requests", "Requests", ["outcome"], namespace="test", registry=registry)
+        gauge = Gauge("active", "Active requests", namespace="test", registry=registry)
+        return registry, counter, gauge
+
+    def test_running_totals_published_as_increments(self):
+        """Test each publish adds only the growth since the previous one"""
+        registry, counter, gauge = self.make_metrics()
+        stats = {"admitted": 1, "rate_limited": 0}
+        active = [3]
+        publisher = metrics.StatsPublisher(
+            counters=lambda: [(counter, stats)],
+            gauges=lambda: [(gauge, active[0])],
+        )
+
+        publisher.publish()
+        stats["admitted"] = 5
+        active[0] = 1
+        publisher.publish()
+
+        assert registry.get_sample_value("test_requests_total", {"outcome": "admitted"}) == 5
+        assert registry.get_sample_value("test_requests_total", {"outcome": "rate_limited"}) == 0
+        assert registry.get_sample_value("test_active") == 1
+
+    def test_reset_owner_keeps_counter_monotonic(self):
+        """Test a running total that went back to zero is counted again from there"""
+        registry, counter, _ = self.make_metrics()
+        stats = {"admitted": 4}
+        publisher = metrics.StatsPublisher(counters=lambda: [(counter, stats)])
+
+        publisher.publish()
+        stats["admitted"] = 2
+        publisher.publish()
+
+        assert registry.get_sample_value("test_requests_total", {"outcome": "admitted"}) == 6
+
+    async def test_background_publishing_and_final_publish_on_stop(self):
+        """Test values are published every interval and once more on stop"""
+        registry, counter, _ = self.make_metrics()
+        stats = {"admitted": 1}
+        publisher = metrics.StatsPublisher(counters=lambda: [(counter, stats)], interval=0.01)
+
+        await publisher.start()
+        await asyncio.sleep(0.05)
+        assert registry.get_sample_value("test_requests_total", {"outcome": "admitted"}) == 1
+        stats["admitted"] = 3
+        await publisher.stop()
+
+        assert registry.get_sample_value("test_requests_total", {"outcome": "admitted"}) == 3
+
+
+def test_render_is_prometheus_text():
+    """Test the exposition format and content type"""
+    body, content_type = metrics.render()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE ms1_stage_duration_seconds histogram" in body
@@ -0,0 +1,106 @@
+"""
+Unit tests for streaming NDJSON ingestion
+"""
+import asyncio
+import json
+
+from app.envelope import EncodedMessage
+from app.ndjson_ingest import ingest_ndjson, iter_ndjson_lines
+
+
+async def as_chunks(data: bytes, chunk_size: int):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+async def collect_lines(data: bytes, chunk_size: int, max_line_bytes: int = 1024):
+    return [item async for item in iter_ndjson_lines(as_chunks(data, chunk_size), max_line_bytes)]
+
+
+async def parse_line(raw: bytes) -> EncodedMessage:
+    record = json.loads(raw)
+    if "bad" in record:
+        raise ValueError("bad record")
+    return EncodedMessage.identity(json.dumps(record))
+
+
+class TestLineSplitting:
+    """Test incremental line splitting"""
+
+    async def test_lines_split_across_chunks(self):
+        """Test lines are reassembled regardless of chunk boundaries"""
+        data = b'{"a": 1}\n{"a": 2}\n\n{"a": 3}'
+        for chunk_size in (1, 3, 7, 100):
+            lines = await collect_lines(data, chunk_size)
+            assert lines == [(1, b'{"a": 1}'), (2, b'{"a": 2}'), (4, b'{"a": 3}')]
+
+    async def test_oversized_line_is_flagged(self):
+        """Test a line over the limit is reported without being buffered"""
+        data = b'{"a": 1}\n' + b"x" * 50 + b'\n{"a": 3}\n'
+        lines = await collect_lines(data, chunk_size=8, max_line_bytes=20)
+        assert lines == [(1, b'{"a": 1}'), (2, None), (3, b'{"a": 3}')]
+
+
+class TestIngest:
+    """Test validation, batching and summary"""
+
+    async def test_summary_counts_and_rejected_lines(self):
+        """Test valid records are published and invalid ones reported by line"""
+        published = []
+
+        async def publish_batch(messages):
+            published.extend(messages)
+            return [f"id-{i}" for i in range(len(messages))]
+
+        records = [{"n": i} if i % 5 else {"bad": i} for i in range(1, 24)]
+        data = "\n".join(json.dumps(r) for r in records).encode()
+        summary = await ingest_ndjson(as_chunks(data, 16), parse_line, publish_batch)
+
+        assert summary["received"] == 23
+        assert summary["rejected"] == 4
+        assert summary["accepted"] == 19
+        assert [r["line"] for r in summary["rejected_lines"]] == [5, 10, 15, 20]
+        assert len(published) == 19
+        assert summary["bytes_received"] == len(data)
+
+    async def test_publish_failures_are_reported(self):
+        """Test entries rejected by SQS appear as rejected lines"""
+        async def publish_batch(messages):
+            return [RuntimeError("rejected")] + ["ok"] * (len(messages) - 1)
+
+        data = b'{"n": 1}\n{"n": 2}\n'
+        summary = await ingest_ndjson(as_chunks(data, 64), parse_line, publish_batch)
+
+        assert summary["accepted"] == 1
+        assert summary["rejected_lines"] == [{"line": 1, "reason": "rejected"}]
+
+    async def test_in_flight_batches_are_bounded(self):
+        """Test no more than max_in_flight batches are outstanding"""
+        active = 0
+        peak = 0
+
+        async def publish_batch(messages):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return ["ok"] * len(messages)
+
+        data = b"".join(b'{"n": %d}\n' % i for i in range(200))
+        summary = await ingest_ndjson(as_chunks(data, 32), parse_line, publish_batch, max_in_flight=2)
+
+        assert summary["accepted"] == 200
+        assert peak <= 2
+
+    async def test_reported_errors_are_capped(self):
+        """Test the rejected line list stays bounded"""
+        async def publish_batch(messages):
+            return ["ok"] * len(messages)
+
+        data = b'{"bad": 1}\n' * 50
+        summary = await ingest_ndjson(as_chunks(data, 64), parse_line, publish_batch, max_reported_errors=10)
+
+        assert summary["rejected"] == 50
+        assert len(summary["rejected_lines"]) == 10
+        assert summary["rejected_lines_truncated"] is True
@@ -0,0 +1,92 @@
+"""
+Unit tests for the background readiness checker
+"""
+import asyncio
+
+from app.readiness import ReadinessChecker
+
+
+async def healthy():
+    return None
+
+
+async def broken():
+    raise ConnectionError("endpoint unreachable")
+
+
+async def hanging():
+    await asyncio.sleep(10)
+
+
+class TestReadinessChecker:
+    """Test probe results, staleness and the background loop"""
+
+    async def test_unknown_until_first_check(self, clock):
+        """Test a dependency that was never probed is not ready"""
+        checker = ReadinessChecker({"sqs": healthy}, clock=clock)
+        assert checker.snapshot() == {"sqs": {"status": "unknown"}}
+        assert not checker.ready
+
+    async def test_records_success_and_latency(self, clock):
+        """Test a successful probe makes the dependency ready and reports its latency"""
+        checker = ReadinessChecker({"ssm": healthy, "sqs": healthy}, clock=clock)
+        await checker.check_once()
+
+        snapshot = checker.snapshot()
+        assert checker.ready
+        assert snapshot["ssm"]["status"] == "ok"
+        assert snapshot["ssm"]["latency_ms"] >= 0
+        assert snapshot["ssm"]["age_seconds"] == 0
+
+    async def test_failure_is_reported_with_error(self, clock):
+        """Test one failing dependency makes the checker not ready"""
+        checker = ReadinessChecker({"ssm": healthy, "sqs": broken}, clock=clock)
+        await checker.check_once()
+
+        snapshot = checker.snapshot()
+        assert not checker.ready
+        assert snapshot["ssm"]["status"] == "ok"
+        assert snapshot["sqs"] == {
+            "status": "failing",
+            "latency_ms": snapshot["sqs"]["latency_ms"],
+            "age_seconds": 0,
+            "error": "endpoint unreachable",
+        }
+
+    async def test_timeout_counts_as_failure(self, clock):
+        """Test a probe slower than the timeout is recorded as failing"""
+        checker = ReadinessChecker({"sqs": hanging}, timeout=0.01, clock=clock)
+        await checker.check_once()
+
+        snapshot = checker.snapshot()
+        assert snapshot["sqs"]["status"] == "failing"
+        assert snapshot["sqs"]["latency_ms"] == 10.0
+        assert "timed out" in snapshot["sqs"]["error"]
+
+    async def test_results_go_stale(self, clock):
+        """Test an old success stops counting once the TTL has passed"""
+        checker = ReadinessChecker({"sqs": healthy}, ttl=30, clock=clock)
+        await checker.check_once()
+
+        clock.advance(30)
+        assert checker.ready
+        clock.advance(1)
+        assert checker.status("sqs") == "stale"
+        assert not checker.ready
+
+    async def test_background_loop_probes_periodically(self):
+        """Test the checker keeps probing until stopped"""
+        calls = []
+
+        async def counting():
+            calls.append(1)
+
+        checker = ReadinessChecker({"sqs": counting}, interval=0.01)
+        await checker.start()
+        assert checker.running
+        await asyncio.sleep(0.05)
+        await checker.stop()
+
+        assert not checker.running
+        assert len(calls) >= 2
+        assert checker.ready
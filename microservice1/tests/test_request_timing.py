@@ -0,0 +1,89 @@
+"""
+Unit tests for per-request stage timings
+"""
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.request_timing import RequestTimingMiddleware, RequestTimings, stage
+
+
+def make_client(**options):
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        with stage("parse"):
+            pass
+        with stage("publish"):
+            await asyncio.sleep(0.02)
+        with stage("publish"):
+            pass
+        return {"ok": True}
+
+    return TestClient(RequestTimingMiddleware(app, **options))
+
+
+def parse_server_timing(header):
+    timings = {}
+    for part in header.split(", "):
+        name, duration = part.split(";dur=")
+        timings[name] = float(duration)
+    return timings
+
+
+class TestRequestTimingMiddleware:
+    """Test the Server-Timing header and the slow-request log"""
+
+    def test_server_timing_header(self):
+        """Test stages are reported in milliseconds, repeated stages summed, with a total"""
+        response = make_client(server_timing=True).get("/work")
+
+        timings = parse_server_timing(response.headers["Server-Timing"])
+        assert list(timings) == ["parse", "publish", "total"]
+        assert timings["publish"] >= 20
+        assert timings["total"] >= timings["publish"]
+
+    def test_header_disabled_by_default(self):
+        """Test no timings are exposed unless enabled"""
+        response = make_client().get("/work")
+        assert "Server-Timing" not in response.headers
+
+    def test_slow_request_logged_with_breakdown(self, caplog):
+        """Test requests over the threshold are logged with their stages"""
+        with caplog.at_level(logging.WARNING, logger="app.request_timing"):
+            make_client(slow_request_seconds=0.01).get("/work")
+
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert "GET /work status=200" in message
+        assert "publish=" in message
+
+    def test_fast_request_not_logged(self, caplog):
+        """Test requests under the threshold are not logged"""
+        with caplog.at_level(logging.WARNING, logger="app.request_timing"):
+            make_client(slow_request_seconds=10).get("/work")
+        assert caplog.records == []
+
+
+def test_stage_outside_request_only_feeds_histogram():
+    """Test stage() works without a request and still observes the histogram"""
+    observed = []
+
+    class Histogram:
+        def observe(self, seconds):
+            observed.append(seconds)
+
+    with stage("publish", Histogram()):
+        pass
+    assert len(observed) == 1
+
+
+def test_breakdown_format():
+    """Test the log breakdown lists stages in order"""
+    timings = RequestTimings()
+    timings.add("parse", 0.0012)
+    timings.add("publish", 0.5)
+    assert timings.breakdown() == "parse=1.2ms publish=500.0ms"
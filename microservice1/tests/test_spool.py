@@ -0,0 +1,298 @@
+"""
+Unit tests for the disk spool and its drainer
+"""
+import asyncio
+import fcntl
+import glob
+import os
+import threading
+import time
+
+import pytest
+
+from app.circuit_breaker import OPEN, CircuitBreaker
+from app.envelope import EncodedMessage
+from app.spool import DiskSpool, SpoolDrainer, SpoolFull, encode_record, read_records
+
+
+def msg(body):
+    """Wrap a body in an uncompressed envelope"""
+    return EncodedMessage.identity(body)
+
+
+@pytest.fixture
+def spool_dir(tmp_path):
+    return str(tmp_path / "spool")
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+
+
+class TestRecords:
+    """Test the on-disk record format"""
+
+    def test_round_trip(self):
+        """Test messages and their attributes survive encoding"""
+        message = EncodedMessage("body", {"ContentEncoding": {"DataType": "String", "StringValue": "gzip"}})
+        records, corrupt = read_records(encode_record(message) + encode_record(msg("second")))
+        assert [m for _, m in records] == [message, msg("second")]
+        assert corrupt == 0
+
+    def test_torn_tail_is_ignored(self):
+        """Test a record cut short by a crash ends the segment"""
+        data = encode_record(msg("kept")) + encode_record(msg("torn"))[:-3]
+        records, _ = read_records(data)
+        assert [m.body for _, m in records] == ["kept"]
+
+    def test_corrupt_record_is_skipped(self):
+        """Test a record failing its checksum is skipped, later ones are kept"""
+        first = bytearray(encode_record(msg("first")))
+        first[-2] ^= 0xFF
+        records, corrupt = read_records(bytes(first) + encode_record(msg("second")))
+        assert [m.body for _, m in records] == ["second"]
+        assert corrupt == 1
+
+    def test_offset_resumes_after_committed_records(self):
+        """Test reading from a record's end offset returns the following records"""
+        data = encode_record(msg("a")) + encode_record(msg("b"))
+        records, _ = read_records(data)
+        resumed, _ = read_records(data, records[0][0])
+        assert [m.body for _, m in resumed] == ["b"]
+
+
+class TestDiskSpool:
+    """Test appends, group fsync and segment claiming"""
+
+    async def test_concurrent_appends_share_fsyncs(self, spool_dir, monkeypatch):
+        """Test appends arriving together are made durable by one fsync"""
+        fsyncs = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+        spool = DiskSpool(spool_dir, fsync_interval=0.01)
+
+        await asyncio.gather(*(spool.append(msg(str(i))) for i in range(50)))
+
+        assert spool.stats.spooled == 50
+        assert len(fsyncs) <= 3  # segment (+ directory once) per group
+        await spool.close()
+
+    async def test_append_during_rotate_is_fsynced(self, spool_dir, monkeypatch):
+        """Test a record appended while rotate() is syncing the segment is on disk when append returns"""
+        synced = {}  # inode -> bytes covered by its latest fsync
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            stat = os.fstat(fd)
+            time.sleep(0.05)
+            real_fsync(fd)
+            synced[stat.st_ino] = max(synced.get(stat.st_ino, 0), stat.st_size)
+
+        monkeypatch.setattr(os, "fsync", slow_fsync)
+        spool = DiskSpool(spool_dir, fsync_interval=0)
+        await spool.append(msg("before"))
+
+        async def append_during_rotate():
+            await asyncio.sleep(0.01)  # rotate() is now waiting for its fsync
+            await spool.append(msg("during"))
+
+        await asyncio.gather(spool.rotate(), append_during_rotate())
+
+        for name in segments(spool_dir):
+            stat = os.stat(os.path.join(spool_dir, name))
+            assert synced.get(stat.st_ino, 0) >= stat.st_size
+        await spool.close()
+
+    async def test_open_segment_is_not_claimable(self, spool_dir):
+        """Test a drainer cannot claim a segment its writer still holds"""
+        spool = DiskSpool(spool_dir)
+        other = DiskSpool(spool_dir)
+        await spool.append(msg("a"))
+
+        assert await other.claim() is None
+        await spool.rotate()
+        segment = await other.claim()
+        assert segment is not None
+        assert [m.body for _, m in segment.read()[0]] == ["a"]
+        segment.release()
+
+    async def test_claimed_segment_is_exclusive(self, spool_dir):
+        """Test two drainers never replay the same segment"""
+        spool = DiskSpool(spool_dir)
+        await spool.append(msg("a"))
+        await spool.rotate()
+
+        first = await spool.claim()
+        assert first is not None
+        assert await DiskSpool(spool_dir).claim() is None
+        first.release()
+
+    async def test_segment_sealed_at_size_limit(self, spool_dir):
+        """Test a full segment is sealed and a new one started"""
+        spool = DiskSpool(spool_dir, segment_bytes=100, fsync_interval=0)
+        for i in range(5):
+            await spool.append(msg("x" * 40 + str(i)))
+        await spool.close()
+        assert len(segments(spool_dir)) == 5
+
+    async def test_full_spool_rejects(self, spool_dir):
+        """Test appends beyond max_bytes raise SpoolFull"""
+        spool = DiskSpool(spool_dir, max_bytes=200, fsync_interval=0)
+        with pytest.raises(SpoolFull):
+            for i in range(10):
+                await spool.append(msg("x" * 40))
+        assert spool.stats.rejected_full == 1
+        await spool.close()
+
+    async def test_depth_counts_unreplayed_bytes(self, spool_dir):
+        """Test depth reports every segment and the bytes not yet replayed"""
+        spool = DiskSpool(spool_dir, fsync_interval=0)
+        await spool.append(msg("a"))
+        await spool.rotate()
+        await spool.append(msg("b"))
+        await spool.rotate()
+
+        count, pending = spool.depth()
+        assert count == 2
+        assert pending == 2 * len(encode_record(msg("a")))
+
+    async def test_orphaned_segment_from_dead_writer_is_claimable(self, spool_dir):
+        """Test a segment left unsealed by a crashed process can be replayed"""
+        os.makedirs(spool_dir)
+        path = os.path.join(spool_dir, "00000000000000000001-99999.seg")
+        with open(path, "wb") as f:
+            f.write(encode_record(msg("orphan")))
+
+        segment = await DiskSpool(spool_dir).claim()
+        assert segment.path == path
+        segment.release()
+
+
+class TestSpoolDrainer:
+    """Test replaying the spool against a local SQS stand-in"""
+
+    async def spool_with(self, spool_dir, bodies):
+        spool = DiskSpool(spool_dir, fsync_interval=0)
+        for body in bodies:
+            await spool.append(msg(body))
+        return spool
+
+    async def test_drains_in_batches_and_removes_segment(self, spool_dir, sqs):
+        """Test 25 spooled messages are replayed as 3 batches and the spool emptied"""
+        bodies = [str(i) for i in range(25)]
+        spool = await self.spool_with(spool_dir, bodies)
+        drainer = SpoolDrainer(spool, sqs.send_batch, CircuitBreaker())
+
+        assert await drainer.drain_once() == 25
+        assert sqs.received == bodies
+        assert sqs.batches == 3
+        assert segments(spool_dir) == []
+        assert spool.stats.drained == 25
+
+    async def test_failure_keeps_records_and_resumes(self, spool_dir, sqs):
+        """Test a failed batch is retried and earlier batches are not resent"""
+        bodies = [str(i) for i in range(25)]
+        spool = await self.spool_with(spool_dir, bodies)
+        sqs.fail_batches = {2}
+        drainer = SpoolDrainer(spool, sqs.send_batch, CircuitBreaker(failure_threshold=5))
+
+        assert await drainer.drain_once() == 10
+        assert spool.stats.drain_failures == 1
+        assert len(segments(spool_dir)) == 1
+
+        assert await drainer.drain_once() == 15
+        assert sqs.received == bodies
+        assert segments(spool_dir) == []
+
+    async def test_open_circuit_pauses_draining(self, spool_dir, sqs):
+        """Test nothing is sent while the circuit is open"""
+        spool = await self.spool_with(spool_dir, ["a", "b"])
+        sqs.failing = True
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        drainer = SpoolDrainer(spool, sqs.send_batch, breaker)
+
+        assert await drainer.drain_once() == 0
+        assert breaker.state == OPEN
+        sqs.failing = False
+        assert await drainer.drain_once() == 0
+        assert sqs.batches == 1
+
+    async def test_drain_remaining_replays_everything_after_stop(self, spool_dir, sqs):
+        """Test the final drain replays sealed and open segments once the background task has stopped"""
+        spool = await self.spool_with(spool_dir, ["a", "b"])
+        await spool.rotate()
+        await spool.append(msg("c"))
+        drainer = SpoolDrainer(spool, sqs.send_batch, CircuitBreaker(), interval=60)
+        await drainer.start()
+        await drainer.stop()
+
+        assert await drainer.drain_remaining(timeout=5) == 3
+        assert sorted(sqs.received) == ["a", "b", "c"]
+        assert segments(spool_dir) == []
+
+    async def test_drain_remaining_keeps_records_while_sqs_fails(self, spool_dir, sqs):
+        """Test a final drain against a failing SQS returns and leaves the records on disk"""
+        spool = await self.spool_with(spool_dir, ["a", "b"])
+        sqs.failing = True
+        drainer = SpoolDrainer(spool, sqs.send_batch, CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+        assert await drainer.drain_remaining(timeout=5) == 0
+        assert spool.depth()[1] == 2 * len(encode_record(msg("a")))
+
+    async def test_background_task_drains_after_recovery(self, spool_dir, sqs):
+        """Test the running drainer replays the spool once SQS recovers"""
+        spool = await self.spool_with(spool_dir, ["a", "b", "c"])
+        sqs.failing = True
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        drainer = SpoolDrainer(spool, sqs.send_batch, breaker, interval=0.01)
+        await drainer.start()
+        try:
+            await asyncio.sleep(0.03)
+            assert sqs.received == []
+            sqs.failing = False
+            for _ in range(100):
+                if sqs.received:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await drainer.stop()
+
+        assert sqs.received == ["a", "b", "c"]
+        assert spool.depth() == (0, 0)
+
+    async def test_file_system_calls_stay_off_the_event_loop(self, spool_dir, monkeypatch, sqs):
+        """Test appending, replaying and scanning the spool make no file system call on the loop thread"""
+        spool = DiskSpool(spool_dir, fsync_interval=0)
+        loop_thread = threading.current_thread()
+        on_loop = []
+
+        def watch(module, name):
+            real = getattr(module, name)
+
+            def watched(*args, **kwargs):
+                if threading.current_thread() is loop_thread:
+                    on_loop.append(name)
+                return real(*args, **kwargs)
+
+            monkeypatch.setattr(module, name, watched)
+
+        for module, name in ((glob, "glob"), (fcntl, "flock"), (os, "rename"), (os, "replace"),
+                             (os, "unlink"), (os, "fsync"), (os.path, "getsize")):
+            watch(module, name)
+
+        await spool.append(msg("a"))
+        await spool.append(msg("b"))
+        drainer = SpoolDrainer(spool, sqs.send_batch, CircuitBreaker())
+        assert await drainer.drain_once() == 2
+        assert await spool.refresh_depth() == (0, 0)
+        assert on_loop == []
+
+    async def test_segment_locked_elsewhere_is_skipped(self, spool_dir, sqs):
+        """Test a drainer leaves a segment another process is replaying"""
+        spool = await self.spool_with(spool_dir, ["a"])
+        await spool.rotate()
+        path = os.path.join(spool_dir, segments(spool_dir)[0])
+        with open(path, "rb") as held:
+            fcntl.flock(held.fileno(), fcntl.LOCK_EX)
+            assert await SpoolDrainer(spool, sqs.send_batch, CircuitBreaker()).drain_once() == 0
+        assert sqs.batches == 0
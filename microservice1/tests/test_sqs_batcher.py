@@ -0,0 +1,141 @@
+"""
+Unit tests for the SQS micro-batcher
+"""
+import asyncio
+
+import pytest
+
+from app.envelope import EncodedMessage
+from app.sqs_batcher import SQSBatcher, SQSPublishError, split_into_batches
+
+
+def msg(body):
+    """Wrap a body in an uncompressed envelope"""
+    return EncodedMessage.identity(body)
+
+
+class RecordingSender:
+    """Fake send_batch hook that records every batch it receives"""
+
+    def __init__(self, fail_bodies=()):
+        self.batches = []
+        self.fail_bodies = set(fail_bodies)
+
+    async def __call__(self, messages):
+        bodies = [m.body for m in messages]
+        self.batches.append(bodies)
+        await asyncio.sleep(0)
+        return [
+            SQSPublishError("rejected") if body in self.fail_bodies else f"id-{body}"
+            for body in bodies
+        ]
+
+
+class TestSQSBatcher:
+    """Test batching triggers and result routing"""
+
+    async def test_full_batch_is_flushed(self):
+        """Test 25 concurrent publishes become batches of 10, 10 and 5"""
+        sender = RecordingSender()
+        batcher = SQSBatcher(sender, linger=0.05)
+        await batcher.start()
+
+        results = await asyncio.gather(*(batcher.publish(msg(str(i))) for i in range(25)))
+        await batcher.stop()
+
+        assert results == [f"id-{i}" for i in range(25)]
+        assert [len(batch) for batch in sender.batches] == [10, 10, 5]
+
+    async def test_linger_flushes_partial_batch(self):
+        """Test a lone message is sent after the linger time"""
+        sender = RecordingSender()
+        batcher = SQSBatcher(sender, linger=0.01)
+        await batcher.start()
+
+        result = await asyncio.wait_for(batcher.publish(msg("only")), timeout=1)
+        await batcher.stop()
+
+        assert result == "id-only"
+        assert sender.batches == [["only"]]
+
+    async def test_byte_limit_splits_batches(self):
+        """Test a batch is flushed before it exceeds the byte limit"""
+        sender = RecordingSender()
+        batcher = SQSBatcher(sender, max_batch_bytes=350, linger=0.05)
+        await batcher.start()
+
+        bodies = ["a" * 100, "b" * 100, "c" * 100]
+        await asyncio.gather(*(batcher.publish(msg(body)) for body in bodies))
+        await batcher.stop()
+
+        assert [len(batch) for batch in sender.batches] == [2, 1]
+
+    async def test_oversized_message_is_rejected(self):
+        """Test a single message over the limit fails without being sent"""
+        sender = RecordingSender()
+        batcher = SQSBatcher(sender, max_batch_bytes=10)
+        await batcher.start()
+
+        with pytest.raises(SQSPublishError):
+            await batcher.publish(msg("x" * 11))
+        await batcher.stop()
+        assert sender.batches == []
+
+    async def test_entry_failures_reach_the_right_caller(self):
+        """Test a rejected entry fails only its own publish"""
+        sender = RecordingSender(fail_bodies={"bad"})
+        batcher = SQSBatcher(sender, linger=0.05)
+        await batcher.start()
+
+        results = await asyncio.gather(
+            batcher.publish(msg("good-1")), batcher.publish(msg("bad")), batcher.publish(msg("good-2")),
+            return_exceptions=True
+        )
+        await batcher.stop()
+
+        assert results[0] == "id-good-1"
+        assert isinstance(results[1], SQSPublishError)
+        assert results[2] == "id-good-2"
+
+    async def test_send_error_fails_whole_batch(self):
+        """Test an exception from the send hook reaches every entry of the batch"""
+        async def failing_sender(messages):
+            raise RuntimeError("SQS down")
+
+        batcher = SQSBatcher(failing_sender, linger=0.01)
+        await batcher.start()
+
+        results = await asyncio.gather(
+            batcher.publish(msg("a")), batcher.publish(msg("b")), return_exceptions=True
+        )
+        await batcher.stop()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def test_stop_flushes_pending_entries(self):
+        """Test entries waiting for the linger time are sent on shutdown"""
+        sender = RecordingSender()
+        batcher = SQSBatcher(sender, linger=10)
+        await batcher.start()
+
+        pending = asyncio.ensure_future(batcher.publish(msg("pending")))
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+
+        assert await pending == "id-pending"
+        assert not batcher.running
+
+
+class TestSplitIntoBatches:
+    """Test grouping of messages by SQS limits"""
+
+    def test_splits_by_entry_count(self):
+        """Test no batch holds more than 10 entries"""
+        batches = split_into_batches([1] * 23)
+        assert [len(b) for b in batches] == [10, 10, 3]
+        assert sum(batches, []) == list(range(23))
+
+    def test_splits_by_bytes(self):
+        """Test no batch exceeds the byte limit"""
+        batches = split_into_batches([60, 60, 60, 10], max_batch_bytes=130)
+        assert batches == [[0, 1], [2, 3]]
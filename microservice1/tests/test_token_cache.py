@@ -0,0 +1,104 @@
+"""
+Unit tests for the SSM token cache
+"""
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.token_cache import TokenCache
+
+
+class TestTokenCache:
+    """Test TTL, single-flight and rotation behaviour"""
+
+    def test_value_is_cached_within_ttl(self, clock):
+        """Test repeated reads hit SSM only once"""
+        fetch = Mock(return_value="token-a")
+        cache = TokenCache(fetch, ttl=60, refresh_ahead=1.0, clock=clock)
+
+        for _ in range(5):
+            assert cache.get() == "token-a"
+            clock.advance(10)
+        assert fetch.call_count == 1
+
+    def test_value_is_refreshed_after_ttl(self, clock):
+        """Test an expired entry is fetched again"""
+        fetch = Mock(side_effect=["token-a", "token-b"])
+        cache = TokenCache(fetch, ttl=60, refresh_ahead=1.0, clock=clock)
+
+        assert cache.get() == "token-a"
+        clock.advance(61)
+        assert cache.get() == "token-b"
+        assert fetch.call_count == 2
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Test concurrent callers on an empty cache trigger a single fetch"""
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return "token-a"
+
+        cache = TokenCache(slow_fetch, ttl=60)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["token-a"] * 20
+        assert len(calls) == 1
+
+    def test_refresh_ahead_runs_in_background(self, clock):
+        """Test a nearly expired entry is served while being refreshed"""
+        fetched = threading.Event()
+        values = iter(["token-a", "token-b"])
+
+        def fetch():
+            value = next(values)
+            if value == "token-b":
+                fetched.set()
+            return value
+
+        cache = TokenCache(fetch, ttl=100, refresh_ahead=0.5, clock=clock)
+        assert cache.get() == "token-a"
+        clock.advance(60)
+        assert cache.get() == "token-a"  # Stale value served immediately
+        assert fetched.wait(timeout=1)
+        cache._background_refresh.join(timeout=1)
+        assert cache.get() == "token-b"
+
+    def test_previous_token_accepted_during_rotation(self, clock):
+        """Test both tokens are accepted during the grace period"""
+        fetch = Mock(side_effect=["token-a", "token-b"])
+        cache = TokenCache(fetch, ttl=60, refresh_ahead=1.0, rotation_grace=30, clock=clock)
+
+        assert cache.accepted() == ("token-a",)
+        clock.advance(61)
+        assert cache.accepted() == ("token-b", "token-a")
+        clock.advance(31)
+        assert cache.accepted() == ("token-b",)
+
+    def test_force_refresh_is_rate_limited(self, clock):
+        """Test forced refreshes do not hammer SSM"""
+        fetch = Mock(return_value="token-a")
+        cache = TokenCache(fetch, ttl=60, min_refresh_interval=5, clock=clock)
+
+        cache.get()
+        assert cache.force_refresh() is False
+        clock.advance(6)
+        assert cache.force_refresh() is True
+        assert fetch.call_count == 2
+
+    def test_fetch_error_propagates_and_is_not_cached(self, clock):
+        """Test a failed fetch is retried on the next call"""
+        fetch = Mock(side_effect=[RuntimeError("throttled"), "token-a"])
+        cache = TokenCache(fetch, ttl=60, clock=clock)
+
+        with pytest.raises(RuntimeError):
+            cache.get()
+        assert cache.get() == "token-a"
@@ -0,0 +1,202 @@
+"""
+Batched acknowledgement of processed SQS messages
+
+Processing threads hand receipt handles to a BatchAcker instead of calling
+DeleteMessage once per message. A background thread sends them with
+DeleteMessageBatch once 10 are waiting (the SQS limit) or the oldest has
+waited ``max_delay`` seconds. Entries that fail for a reason other than a
+sender fault (e.g. throttling, an internal error) are sent again after an
+exponential backoff (``retry_backoff`` doubled per send, at most
+``retry_backoff_max``), up to ``max_attempts`` sends. A message that could
+not be deleted becomes visible again and is reprocessed. Every upload gets a
+new random key, so a reprocessed message is stored a second time.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQS_MAX_BATCH = 10
+
+
+class AckerStats:
+    """Counters of the batch acker"""
+
+    def __init__(self):
+        self.calls = 0
+        self.deleted = 0
+        self.retried = 0
+        self.failed = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "deleted": self.deleted,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+class BatchAcker:
+    """
+    ``delete_batch`` sends one DeleteMessageBatch request for a list of
+    ``{"Id", "ReceiptHandle"}`` entries and returns the response. ``ack`` is
+    safe to call from any thread and never blocks on SQS.
+    """
+
+    def __init__(
+        self,
+        delete_batch: Callable[[List[dict]], dict],
+        max_batch: int = SQS_MAX_BATCH,
+        max_delay: float = 0.05,
+        max_attempts: int = 3,
+        retry_backoff: float = 0.1,
+        retry_backoff_max: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.delete_batch = delete_batch
+        self.max_batch = min(max(max_batch, 1), SQS_MAX_BATCH)
+        self.max_delay = max_delay
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.stats = AckerStats()
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, int, float]] = []  # (receipt handle, sends so far, queued at)
+        self._retries: List[Tuple[str, int, float]] = []  # (receipt handle, sends so far, due at)
+        self._in_flight = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BatchAcker":
+        self._thread = threading.Thread(target=self._run, name="sqs-acker", daemon=True)
+        self._thread.start()
+        return self
+
+    def ack(self, receipt_handle: str) -> bool:
+        """Queue a receipt handle for deletion; False once the acker is closed"""
+        with self._cond:
+            if self._closed:
+                return False
+            self._pending.append((receipt_handle, 0, self._clock()))
+            # Wake the sender for a full batch, or to start the deadline of a new one
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued handle has been sent (retries included); False
+        on timeout. Skips the batching delay but not the retry backoff.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            # Everything queued so far is due now
+            self._pending = [(handle, sends, float("-inf")) for handle, sends, _ in self._pending]
+            self._cond.notify_all()
+            while self._pending or self._retries or self._in_flight:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+                self._pending = [(handle, sends, float("-inf")) for handle, sends, _ in self._pending]
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Send everything still queued, then stop the background thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        logger.info(f"Batch acker stopped: {self.stats.as_dict()}")
+
+    def _wait_time(self) -> Optional[float]:
+        """Seconds until the next batch is due; 0 when due now, None when nothing is queued"""
+        due = []
+        if self._pending:
+            if self._closed or len(self._pending) >= self.max_batch:
+                return 0.0
+            due.append(self._pending[0][2] + self.max_delay)
+        if self._retries:
+            due.append(min(due_at for _, _, due_at in self._retries))
+        if not due:
+            return None
+        return max(0.0, min(due) - self._clock())
+
+    def _next_batch(self) -> List[Tuple[str, int, float]]:
+        """Take the retries whose backoff is over, topped up with first sends"""
+        now = self._clock()
+        due = [entry for entry in self._retries if entry[2] <= now]
+        batch = due[:self.max_batch]
+        self._retries = due[self.max_batch:] + [entry for entry in self._retries if entry[2] > now]
+        fill = self._pending[:self.max_batch - len(batch)]
+        del self._pending[:len(fill)]
+        return batch + fill
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                wait = self._wait_time()
+                while wait is None or wait > 0:
+                    if wait is None and self._closed:
+                        return
+                    self._cond.wait(wait)
+                    wait = self._wait_time()
+                batch = self._next_batch()
+                self._in_flight += 1
+            try:
+                self._send(batch)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _send(self, batch: List[Tuple[str, int, float]]) -> None:
+        entries = [{"Id": str(index), "ReceiptHandle": handle} for index, (handle, _, _) in enumerate(batch)]
+        with self._cond:
+            self.stats.calls += 1
+        try:
+            response = self.delete_batch(entries)
+        except Exception as e:
+            logger.error(f"Error deleting {len(batch)} message(s) from SQS: {e}")
+            self._requeue(batch)
+            return
+
+        retry = []
+        rejected = 0
+        for failure in response.get("Failed", []):
+            handle, sends, _ = batch[int(failure["Id"])]
+            if failure.get("SenderFault"):
+                # Invalid or expired receipt handle: another send cannot succeed
+                logger.warning(f"Message not deleted from SQS ({failure.get('Code')}): {failure.get('Message')}")
+                rejected += 1
+            else:
+                retry.append((handle, sends, 0.0))
+        with self._cond:
+            self.stats.deleted += len(response.get("Successful", []))
+            self.stats.failed += rejected
+        if retry:
+            self._requeue(retry)
+
+    def _backoff(self, sends: int) -> float:
+        """Delay before the next send of an entry already sent ``sends`` times"""
+        return min(self.retry_backoff * 2 ** (sends - 1), self.retry_backoff_max)
+
+    def _requeue(self, batch: List[Tuple[str, int, float]]) -> None:
+        now = self._clock()
+        retry = []
+        for handle, sends, _ in batch:
+            if sends + 1 >= self.max_attempts:
+                logger.error(f"Giving up deleting a message after {sends + 1} attempts, it will be reprocessed")
+            else:
+                retry.append((handle, sends + 1, now + self._backoff(sends + 1)))
+        with self._cond:
+            # Every counter is updated under _cond, so stats are consistent when read under it
+            self.stats.failed += len(batch) - len(retry)
+            self.stats.retried += len(retry)
+            self._retries.extend(retry)
@@ -0,0 +1,212 @@
+"""
+Aggregating S3 sink: many emails per object
+
+Emails are buffered per ``emails/YYYY/MM/DD`` partition and written as one
+gzip-compressed NDJSON object once a partition holds ``max_bytes`` of
+NDJSON or its oldest email has waited ``max_age`` seconds. Next to each
+object a manifest lists every email in it:
+
+    emails/2024/05/17/batch-1715950000-1a2b3c4d.ndjson.gz
+    emails/2024/05/17/batch-1715950000-1a2b3c4d.manifest.json
+    {"object": "emails/.../batch-1715950000-1a2b3c4d.ndjson.gz",
+     "count": 2, "bytes": 512,
+     "emails": [{"message_id": "...", "email_timestream": "...", "offset": 0, "length": 250}, ...]}
+
+``offset`` and ``length`` locate the email's line in the decompressed NDJSON
+(without the newline). The manifest is written after the object, so an
+object without a manifest is an incomplete write and can be ignored.
+
+A message is only acknowledged (deleted from SQS) after the object holding it
+and its manifest were written. Until then it stays in flight, so the queue's
+visibility timeout must exceed ``max_age`` plus the time to write the
+object; otherwise SQS redelivers buffered messages and they are stored twice.
+A failed write acknowledges nothing: its messages are redelivered and land
+in a later object.
+
+Storage is therefore at least once. A redelivered message (failed write or
+delete, or a task killed before ``close()`` wrote its buffer) is stored
+again in a later object and listed in both manifests; readers deduplicate
+on ``message_id``. The consumer calls ``close()`` on SIGTERM, so a normal
+ECS stop loses no buffered email and causes no redelivery.
+"""
+
+import gzip
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from app import fast_json
+
+logger = logging.getLogger(__name__)
+
+
+class AggregatorStats:
+    """Counters of the aggregating sink"""
+
+    def __init__(self):
+        self.objects = 0
+        self.emails = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.failed = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "objects": self.objects,
+            "emails": self.emails,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "failed": self.failed,
+        }
+
+
+class _Partition:
+    """Emails buffered for one object"""
+
+    def __init__(self, opened_at: float):
+        self.opened_at = opened_at
+        self.records: List[bytes] = []
+        self.entries: List[dict] = []
+        self.receipt_handles: List[str] = []
+        self.size = 0
+
+
+class EmailAggregator:
+    """
+    ``put(key, body, content_type, content_encoding)`` writes one S3 object and
+    returns True on success; ``acknowledge(receipt_handle)`` deletes a message
+    once its email is stored. ``add`` is safe to call from any thread; a
+    partition that reaches ``max_bytes`` is written by the thread that filled
+    it, partitions that reach ``max_age`` by a background thread.
+    """
+
+    def __init__(
+        self,
+        put: Callable[[str, bytes, str, Optional[str]], bool],
+        acknowledge: Callable[[str], bool],
+        max_bytes: int = 8 * 1024 * 1024,
+        max_age: float = 10.0,
+        compress_level: int = 6,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.put = put
+        self.acknowledge = acknowledge
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress_level = compress_level
+        self.stats = AggregatorStats()
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._partitions: Dict[str, _Partition] = {}
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "EmailAggregator":
+        self._thread = threading.Thread(target=self._run, name="s3-aggregator", daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, partition: str, record: bytes, receipt_handle: str, message_id: str, email_timestream: str) -> None:
+        """
+        Buffer one email (a single line of compact JSON) for ``partition``
+
+        The message is acknowledged once the object holding it has been written.
+        """
+        if b"\n" in record:
+            raise ValueError("NDJSON records cannot contain newlines")
+        full = None
+        with self._cond:
+            buffer = self._partitions.get(partition)
+            if buffer is None:
+                buffer = self._partitions[partition] = _Partition(self._clock())
+                self._cond.notify_all()  # start the age deadline of the new buffer
+            buffer.entries.append({
+                "message_id": message_id,
+                "email_timestream": email_timestream,
+                "offset": buffer.size,
+                "length": len(record),
+            })
+            buffer.records.append(record)
+            buffer.receipt_handles.append(receipt_handle)
+            buffer.size += len(record) + 1
+            if buffer.size >= self.max_bytes:
+                full = self._partitions.pop(partition)
+        if full is not None:
+            self._write(partition, full)
+
+    def flush(self) -> None:
+        """Write every buffered partition now"""
+        with self._cond:
+            partitions, self._partitions = self._partitions, {}
+        for partition, buffer in partitions.items():
+            self._write(partition, buffer)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Stop the background thread and write everything still buffered"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+        logger.info(f"S3 aggregator stopped: {self.stats.as_dict()}")
+
+    def _expired(self) -> Dict[str, _Partition]:
+        now = self._clock()
+        expired = {p: b for p, b in self._partitions.items() if now - b.opened_at >= self.max_age}
+        for partition in expired:
+            del self._partitions[partition]
+        return expired
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                expired = self._expired()
+                while not expired and not self._closed:
+                    oldest = min((b.opened_at for b in self._partitions.values()), default=None)
+                    wait = None if oldest is None else max(0.0, oldest + self.max_age - self._clock())
+                    self._cond.wait(wait)
+                    expired = self._expired()
+                if self._closed and not expired:
+                    return
+            for partition, buffer in expired.items():
+                self._write(partition, buffer)
+
+    def _write(self, partition: str, buffer: _Partition) -> None:
+        name = f"{partition}/batch-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        object_key = f"{name}.ndjson.gz"
+        ndjson = b"\n".join(buffer.records) + b"\n"
+        body = gzip.compress(ndjson, compresslevel=self.compress_level)
+        manifest = fast_json.dumps({
+            "object": object_key,
+            "count": len(buffer.entries),
+            "bytes": len(ndjson),
+            "emails": buffer.entries,
+        })
+
+        try:
+            written = (
+                self.put(object_key, body, "application/x-ndjson", "gzip")
+                and self.put(f"{name}.manifest.json", manifest, "application/json", None)
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error writing {object_key}: {e}")
+            written = False
+
+        if not written:
+            # Nothing is acknowledged: the messages are redelivered after their visibility timeout
+            logger.error(f"Failed to write {object_key}, {len(buffer.entries)} message(s) will remain in queue")
+            with self._cond:
+                self.stats.failed += len(buffer.entries)
+            return
+
+        with self._cond:
+            self.stats.objects += 1
+            self.stats.emails += len(buffer.entries)
+            self.stats.bytes_in += len(ndjson)
+            self.stats.bytes_out += len(body)
+        logger.info(f"Wrote {len(buffer.entries)} email(s) to s3 object {object_key} ({len(ndjson)} -> {len(body)} bytes)")
+        for receipt_handle in buffer.receipt_handles:
+            self.acknowledge(receipt_handle)
@@ -0,0 +1,143 @@
+"""
+Asyncio consumer engine: concurrent long-poll receivers feeding a bounded
+processing stage
+
+boto3 calls block, so receives and message processing run on a thread pool;
+the event loop only coordinates them. Receivers stop taking messages from SQS
+while the hand-off queue is full, so nothing is received that cannot be
+processed well within its visibility timeout.
+"""
+
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.poll_scheduler import PollScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class ConsumerStats:
+    """Counters of the async consumer"""
+
+    def __init__(self):
+        self.polls = 0
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "polls": self.polls,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+class AsyncConsumer:
+    """
+    ``receivers`` tasks call ``receive`` (one SQS receive, returning a list of
+    messages) in a loop and put the messages on a queue of ``queue_size``;
+    ``workers`` tasks take them off and call ``process`` (returning True on
+    success). All receivers share one ``scheduler``, which decides how long to
+    wait after each poll (none while messages keep arriving, backoff after a
+    failed receive). On ``stop()`` receivers finish their current poll, and every
+    message already received is processed before ``run()`` returns.
+    """
+
+    def __init__(
+        self,
+        receive: Callable[[], list],
+        process: Callable[[dict], bool],
+        receivers: int = 2,
+        workers: int = 10,
+        queue_size: Optional[int] = None,
+        scheduler: Optional[PollScheduler] = None,
+    ):
+        self.receive = receive
+        self.process = process
+        self.receivers = max(receivers, 1)
+        self.workers = max(workers, 1)
+        self.queue_size = queue_size or self.workers
+        self.scheduler = scheduler or PollScheduler()
+        self.stats = ConsumerStats()
+        self._stopping: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def stop(self) -> None:
+        """Ask the consumer to drain and return; safe to call from any thread"""
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def _sleep_unless_stopping(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _receiver(self, queue: asyncio.Queue, executor: ThreadPoolExecutor) -> None:
+        while not self._stopping.is_set():
+            try:
+                messages = await self._loop.run_in_executor(executor, self.receive)
+            except Exception as e:
+                logger.error(f"Error receiving messages: {e}")
+                messages = None
+            self.stats.polls += 1
+            if messages is None:
+                delay = self.scheduler.record(error=True)
+            else:
+                self.stats.received += len(messages)
+                for message in messages:
+                    await queue.put(message)
+                delay = self.scheduler.record(len(messages))
+            if self.scheduler.report_due():
+                logger.info(f"Polling status: {self.scheduler.status()}")
+            if delay > 0:
+                await self._sleep_unless_stopping(delay)
+
+    async def _worker(self, queue: asyncio.Queue, executor: ThreadPoolExecutor) -> None:
+        while True:
+            message = await queue.get()
+            try:
+                ok = await self._loop.run_in_executor(executor, self.process, message)
+            except Exception as e:
+                logger.error(f"Error processing individual message: {e}")
+                ok = False
+            finally:
+                queue.task_done()
+            if ok:
+                self.stats.processed += 1
+            else:
+                self.stats.failed += 1
+
+    async def run(self, handle_signals: bool = False) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        if handle_signals:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                self._loop.add_signal_handler(signum, self._stopping.set)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # One thread per receiver (long polls block for up to the wait time) and per worker
+        executor = ThreadPoolExecutor(
+            max_workers=self.receivers + self.workers, thread_name_prefix="async-consumer"
+        )
+        workers = [asyncio.create_task(self._worker(queue, executor)) for _ in range(self.workers)]
+        receivers = [asyncio.create_task(self._receiver(queue, executor)) for _ in range(self.receivers)]
+        logger.info(f"Async consumer started ({self.receivers} receiver(s), {self.workers} worker(s))")
+        try:
+            await asyncio.gather(*receivers)
+            # Everything received so far is processed before shutting down
+            await queue.join()
+        finally:
+            for task in receivers + workers:
+                task.cancel()
+            await asyncio.gather(*receivers, *workers, return_exceptions=True)
+            executor.shutdown(wait=True)
+            if handle_signals:
+                for signum in (signal.SIGINT, signal.SIGTERM):
+                    self._loop.remove_signal_handler(signum)
+        logger.info(f"Async consumer stopped: {self.stats.as_dict()}")
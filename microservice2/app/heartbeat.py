@@ -0,0 +1,65 @@
+"""
+Liveness heartbeat for the consumer
+
+The poll loop touches a file after every successful SQS poll; a container
+health check fails when the file is older than a maximum age, which catches a
+consumer that is stuck (hung call, dead loop) or cannot reach SQS.
+
+Health check (ECS healthCheck command, from the app directory):
+    python -m app.heartbeat
+exits 0 while HEARTBEAT_FILE was touched within HEARTBEAT_MAX_AGE seconds,
+1 otherwise.
+"""
+
+import os
+import sys
+import time
+from typing import Callable, Optional, Tuple
+
+
+class Heartbeat:
+    """Touches ``path`` at most once per ``min_interval`` seconds"""
+
+    def __init__(self, path: str, min_interval: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.min_interval = min_interval
+        self._clock = clock
+        self._last: Optional[float] = None
+
+    def beat(self) -> None:
+        now = self._clock()
+        if self._last is not None and now - self._last < self.min_interval:
+            return
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            with open(self.path, "a"):
+                pass
+        self._last = now
+
+
+def check(path: str, max_age: float) -> Tuple[bool, Optional[float]]:
+    """Whether the heartbeat file is fresh, and its age in seconds (None if missing)"""
+    try:
+        age = time.time() - os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False, None
+    return age <= max_age, age
+
+
+def main() -> int:
+    path = os.getenv("HEARTBEAT_FILE")
+    max_age = float(os.getenv("HEARTBEAT_MAX_AGE", "120"))
+    if not path:
+        print("HEARTBEAT_FILE is not set", file=sys.stderr)
+        return 1
+    healthy, age = check(path, max_age)
+    if age is None:
+        print(f"No heartbeat at {path}", file=sys.stderr)
+    elif not healthy:
+        print(f"Last heartbeat {age:.0f}s ago (max {max_age:g}s)", file=sys.stderr)
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Logging setup shared by Microservice 1 and Microservice 2
+
+Records are put on a bounded in-memory queue and written to stdout (as JSON
+by default) by a background listener thread, so logging never blocks the
+caller on I/O; when the queue is full records are dropped and counted.
+``SampledLogger`` caps the INFO lines emitted once per message.
+
+This module is kept identical in microservice1/app and microservice2/app.
+"""
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Callable, Optional, TextIO
+
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:  # JSON output is optional; fall back to text
+    jsonlogger = None
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+JSON_FIELDS = "%(asctime)s %(name)s %(levelname)s %(message)s"
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now (they may change later) but leave the final
+        # formatting, including JSON encoding, to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogListener(logging.handlers.QueueListener):
+    """Queue listener whose ``stop`` may be called more than once (e.g. again at exit)"""
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+def make_formatter(service: str, fmt: str = "json") -> logging.Formatter:
+    """JSON formatter tagged with the service name, or the classic text format"""
+    if fmt == "json" and jsonlogger is not None:
+        return jsonlogger.JsonFormatter(
+            JSON_FIELDS,
+            rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
+            static_fields={"service": service},
+        )
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(
+    service: str,
+    level: str = "INFO",
+    fmt: str = "json",
+    queue_size: int = 10000,
+    stream: Optional[TextIO] = None,
+    force: bool = False,
+) -> Optional[LogListener]:
+    """
+    Route the root logger through a non-blocking queue to ``stream`` (stdout).
+
+    Like ``logging.basicConfig`` this does nothing when the root logger already
+    has handlers (e.g. under pytest), unless ``force`` is set.
+
+    Returns:
+        The started listener (stopped automatically at exit), or None if
+        logging was already configured
+    """
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return None
+    root.setLevel(level.upper())
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(make_formatter(service, fmt))
+
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    listener = LogListener(log_queue, output)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class SampledLogger:
+    """
+    INFO logging for lines emitted once per message or request.
+
+    At most ``rate_limit`` lines per second are emitted (0 = unlimited), and of
+    those only a ``sample_rate`` fraction. Each emitted line carries a
+    ``suppressed`` count of the lines skipped since the previous one.
+    Warnings and errors must go through the regular logger.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        rate_limit: float = 0,
+        sample_rate: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.logger = logger
+        self.rate_limit = rate_limit
+        self.sample_rate = sample_rate
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._burst = max(rate_limit, 1.0)
+        self._tokens = self._burst
+        self._updated_at = clock()
+        self._suppressed = 0
+
+    def _allow(self) -> bool:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.rate_limit <= 0:
+            return True
+        now = self._clock()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self.rate_limit)
+        self._updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def info(self, msg: str, *args) -> None:
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        with self._lock:
+            if not self._allow():
+                self._suppressed += 1
+                return
+            suppressed, self._suppressed = self._suppressed, 0
+        self.logger.info(msg, *args, extra={"suppressed": suppressed}, stacklevel=2)
@@ -3,38 +3,108 @@ Microservice 2 - SQS Consumer
 Polls SQS messages and uploads them to S3
 """
 
+import asyncio
 import os
+import signal
 import time
 import logging
-import json
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from app import fast_json
+from app.acker import BatchAcker
+from app.aggregator import EmailAggregator
+from app.async_consumer import AsyncConsumer
+from app.envelope import EnvelopeError, decode_message
+from app.heartbeat import Heartbeat
+from app.log_config import SampledLogger, setup_logging
+from app.poll_scheduler import PollScheduler
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Root log level
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json or text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered before new ones are dropped
+LOG_MESSAGE_RATE_LIMIT = float(os.getenv("LOG_MESSAGE_RATE_LIMIT", "10"))  # Per-message INFO lines per second (0 = unlimited)
+LOG_MESSAGE_SAMPLE_RATE = float(os.getenv("LOG_MESSAGE_SAMPLE_RATE", "1.0"))  # Fraction of per-message INFO lines kept
+
+setup_logging("microservice2", level=LOG_LEVEL, fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE)
 logger = logging.getLogger(__name__)
+# Per-message INFO lines, rate limited and sampled so they stay cheap under load
+message_log = SampledLogger(logger, rate_limit=LOG_MESSAGE_RATE_LIMIT, sample_rate=LOG_MESSAGE_SAMPLE_RATE)
 
 sqs_client = None
 s3_client = None
+processing_executor = None
+acker = None  # BatchAcker while the consumer runs with SQS_DELETE_BATCHING
+aggregator = None  # EmailAggregator while the consumer runs with S3_AGGREGATION_ENABLED
+shutdown_requested = threading.Event()  # Set by SIGTERM: the sync loop finishes its batch, then flushes
 
 AWS_REGION = os.getenv("AWS_REGION", "eu-west-1")
 SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
-SQS_POLL_INTERVAL = int(os.getenv("SQS_POLL_INTERVAL", "10"))  # Default 10 seconds
+SQS_POLL_INTERVAL = int(os.getenv("SQS_POLL_INTERVAL", "10"))  # Sleep after an empty poll, only when long polling is off
 SQS_WAIT_TIME = int(os.getenv("SQS_WAIT_TIME", "20"))  # Long polling wait time
+SQS_ERROR_BACKOFF_BASE = float(os.getenv("SQS_ERROR_BACKOFF_BASE", "1"))  # First delay after a failed poll, doubled per failure
+SQS_ERROR_BACKOFF_MAX = float(os.getenv("SQS_ERROR_BACKOFF_MAX", "60"))  # Longest delay between failing polls
+POLL_STATUS_INTERVAL = float(os.getenv("POLL_STATUS_INTERVAL", "60"))  # Seconds between polling mode/rate log lines
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))  # Max retries for S3 upload
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", "10"))  # Messages of a batch processed in parallel (1 = one at a time)
+CONSUMER_MODE = os.getenv("CONSUMER_MODE", "sync")  # sync (one poll loop) or async (concurrent receivers)
+SQS_RECEIVERS = int(os.getenv("SQS_RECEIVERS", "2"))  # Concurrent long polls in async mode
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", str(max(10, PROCESSING_WORKERS + SQS_RECEIVERS))))  # HTTP connections per client
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "2"))  # Seconds to establish a connection
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", str(SQS_WAIT_TIME + 10)))  # Must exceed the long-poll wait
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")  # botocore retry mode: legacy, standard or adaptive
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))  # Attempts per AWS call, including the first
+AWS_WARMUP_ENABLED = os.getenv("AWS_WARMUP_ENABLED", "true").lower() == "true"  # Open connections at startup
+SQS_DELETE_BATCHING = os.getenv("SQS_DELETE_BATCHING", "true").lower() == "true"  # Delete processed messages with DeleteMessageBatch
+SQS_DELETE_BATCH_MAX_DELAY_MS = float(os.getenv("SQS_DELETE_BATCH_MAX_DELAY_MS", "50"))  # Longest wait for a batch of deletes to fill up
+SQS_DELETE_MAX_ATTEMPTS = int(os.getenv("SQS_DELETE_MAX_ATTEMPTS", "3"))  # Sends of a failing batch entry before giving up
+SQS_DELETE_RETRY_BACKOFF_MS = float(os.getenv("SQS_DELETE_RETRY_BACKOFF_MS", "100"))  # Wait before resending a failed entry, doubled per send
+SQS_DELETE_RETRY_BACKOFF_MAX_MS = float(os.getenv("SQS_DELETE_RETRY_BACKOFF_MAX_MS", "2000"))  # Longest wait between sends of a failed entry
+S3_AGGREGATION_ENABLED = os.getenv("S3_AGGREGATION_ENABLED", "false").lower() == "true"  # Pack emails into gzip NDJSON objects
+S3_AGGREGATE_MAX_BYTES = int(os.getenv("S3_AGGREGATE_MAX_BYTES", str(8 * 1024 * 1024)))  # Uncompressed NDJSON per object
+S3_AGGREGATE_MAX_AGE = float(os.getenv("S3_AGGREGATE_MAX_AGE", "10"))  # Seconds an email waits for its object; keep below the visibility timeout
+HEARTBEAT_FILE = os.getenv("HEARTBEAT_FILE")  # File touched after every successful poll (heartbeat disabled when unset)
+
+if CONSUMER_MODE not in ("sync", "async"):
+    logger.warning(f"Unknown CONSUMER_MODE '{CONSUMER_MODE}', using sync")
+    CONSUMER_MODE = "sync"
+
+# Liveness signal read by the container health check (python -m app.heartbeat)
+heartbeat = Heartbeat(HEARTBEAT_FILE) if HEARTBEAT_FILE else None
+
+# boto3's default session is not thread-safe; clients are built under this lock
+_client_lock = threading.Lock()
+
+
+def _client_config() -> Config:
+    """botocore config: bounded timeouts, configurable pool size and retries"""
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        retries={"mode": AWS_RETRY_MODE, "max_attempts": AWS_MAX_ATTEMPTS},
+        tcp_keepalive=True
+    )
+
+
+def _create_client(service_name: str):
+    return boto3.session.Session().client(service_name, region_name=AWS_REGION, config=_client_config())
 
 
 def get_sqs_client():
     """Get or create SQS client"""
     global sqs_client
     if sqs_client is None:
-        sqs_client = boto3.client("sqs", region_name=AWS_REGION)
+        with _client_lock:
+            if sqs_client is None:
+                sqs_client = _create_client("sqs")
     return sqs_client
 
 
@@ -42,10 +112,52 @@ def get_s3_client():
     """Get or create S3 client"""
     global s3_client
     if s3_client is None:
-        s3_client = boto3.client("s3", region_name=AWS_REGION)
+        with _client_lock:
+            if s3_client is None:
+                s3_client = _create_client("s3")
     return s3_client
 
 
+def get_processing_executor() -> ThreadPoolExecutor:
+    """Get or create the thread pool messages are processed on"""
+    global processing_executor
+    if processing_executor is None:
+        with _client_lock:
+            if processing_executor is None:
+                processing_executor = ThreadPoolExecutor(
+                    max_workers=PROCESSING_WORKERS,
+                    thread_name_prefix="message-worker"
+                )
+    return processing_executor
+
+
+def _warm_up(description: str, call) -> None:
+    """
+    Make one cheap AWS call so the TLS connection is open before the first message.
+    An error response (e.g. AccessDenied) still leaves the connection pooled.
+    """
+    try:
+        call()
+    except ClientError as e:
+        logger.info(f"Warm-up {description} returned {e.response.get('Error', {}).get('Code')}, connection is open")
+    except Exception as e:
+        logger.warning(f"Warm-up {description} failed: {e}")
+
+
+def init_aws_clients() -> None:
+    """
+    Build the SQS and S3 clients before polling starts and, when
+    AWS_WARMUP_ENABLED, open their connections with one cheap call each
+    """
+    sqs = get_sqs_client()
+    s3 = get_s3_client()
+    if not AWS_WARMUP_ENABLED:
+        return
+    _warm_up("SQS", lambda: sqs.get_queue_attributes(QueueUrl=SQS_QUEUE_URL, AttributeNames=["QueueArn"]))
+    _warm_up("S3", lambda: s3.get_bucket_location(Bucket=S3_BUCKET_NAME))
+    logger.info("AWS clients ready")
+
+
 def validate_configuration():
     """Validate that required environment variables are set"""
     # Check environment variables directly to support testing (reads fresh from os.environ)
@@ -60,6 +172,37 @@ def validate_configuration():
     logger.info("Configuration validated successfully")
 
 
+def fetch_messages(max_messages: int = 10) -> list:
+    """
+    Receive messages from SQS queue using long polling
+    
+    Args:
+        max_messages: Maximum number of messages to receive (1-10)
+    
+    Returns:
+        List of messages, empty if none arrived within the wait time
+    
+    Raises:
+        ClientError / BotoCoreError if the receive failed
+    """
+    sqs = get_sqs_client()
+    response = sqs.receive_message(
+        QueueUrl=SQS_QUEUE_URL,
+        MaxNumberOfMessages=min(max_messages, 10),
+        WaitTimeSeconds=SQS_WAIT_TIME,  # Long polling
+        AttributeNames=['All'],
+        MessageAttributeNames=['All']
+    )
+    
+    if heartbeat is not None:
+        heartbeat.beat()
+    
+    messages = response.get('Messages', [])
+    if messages:
+        message_log.info("Received %d message(s) from SQS", len(messages))
+    return messages
+
+
 def receive_messages(max_messages: int = 10) -> list:
     """
     Receive messages from SQS queue using long polling
@@ -68,22 +211,10 @@ def receive_messages(max_messages: int = 10) -> list:
         max_messages: Maximum number of messages to receive (1-10)
     
     Returns:
-        List of messages or empty list
+        List of messages or empty list (also on error)
     """
     try:
-        sqs = get_sqs_client()
-        response = sqs.receive_message(
-            QueueUrl=SQS_QUEUE_URL,
-            MaxNumberOfMessages=min(max_messages, 10),
-            WaitTimeSeconds=SQS_WAIT_TIME,  # Long polling
-            AttributeNames=['All'],
-            MessageAttributeNames=['All']
-        )
-        
-        messages = response.get('Messages', [])
-        if messages:
-            logger.info(f"Received {len(messages)} message(s) from SQS")
-        return messages
+        return fetch_messages(max_messages)
     
     except ClientError as e:
         logger.error(f"Error receiving messages from SQS: {e}")
@@ -104,10 +235,19 @@ def parse_message_body(message_body: str) -> Optional[dict]:
         Parsed message dict or None if invalid
     """
     try:
-        data = json.loads(message_body)
+        data = fast_json.loads(message_body)
+        
+        # Claim-check messages carry a pointer to the body in S3 instead of email_content
+        if 'claim_check' in data:
+            pointer = data['claim_check']
+            if not isinstance(pointer, dict) or not pointer.get('bucket') or not pointer.get('key'):
+                logger.warning("Claim-check message has an invalid pointer")
+                return None
+            required_fields = ['email_subject', 'email_sender', 'email_timestream']
+        else:
+            required_fields = ['email_subject', 'email_sender', 'email_timestream', 'email_content']
         
         # Validate required fields
-        required_fields = ['email_subject', 'email_sender', 'email_timestream', 'email_content']
         missing_fields = [field for field in required_fields if field not in data]
         
         if missing_fields:
@@ -116,7 +256,7 @@ def parse_message_body(message_body: str) -> Optional[dict]:
         
         return data
     
-    except json.JSONDecodeError as e:
+    except fast_json.JSONDecodeError as e:
         logger.error(f"Invalid JSON in message body: {e}")
         return None
     except Exception as e:
@@ -124,6 +264,20 @@ def parse_message_body(message_body: str) -> Optional[dict]:
         return None
 
 
+def email_partition(email_data: dict) -> str:
+    """
+    S3 prefix of the day the email belongs to: emails/{year}/{month}/{day}
+    
+    Uses email_timestream, or the current time when it is missing or invalid.
+    """
+    try:
+        timestamp = int(email_data.get('email_timestream', str(int(time.time()))))
+        dt = datetime.fromtimestamp(timestamp)
+    except (TypeError, ValueError, OverflowError, OSError):
+        dt = datetime.fromtimestamp(time.time())
+    return f"emails/{dt.year:04d}/{dt.month:02d}/{dt.day:02d}"
+
+
 def generate_s3_key(email_data: dict) -> str:
     """
     Generate S3 key for the email data
@@ -157,7 +311,14 @@ def generate_s3_key(email_data: dict) -> str:
         return f"emails/{timestamp}-{unique_id}.json"
 
 
-def upload_to_s3(data: dict, s3_key: str, retry_count: int = 0) -> bool:
+def upload_to_s3(
+    data: Optional[dict],
+    s3_key: str,
+    retry_count: int = 0,
+    body: Optional[bytes] = None,
+    content_type: str = 'application/json',
+    content_encoding: Optional[str] = None
+) -> bool:
     """
     Upload email data to S3 bucket
     
@@ -165,6 +326,9 @@ def upload_to_s3(data: dict, s3_key: str, retry_count: int = 0) -> bool:
         data: Email data to upload
         s3_key: S3 object key
         retry_count: Current retry attempt
+        body: JSON already serialised for data (e.g. the SQS message body), uploaded as-is
+        content_type: Content-Type of the object
+        content_encoding: Content-Encoding of the object (e.g. gzip), if any
     
     Returns:
         True if successful, False otherwise
@@ -172,18 +336,22 @@ def upload_to_s3(data: dict, s3_key: str, retry_count: int = 0) -> bool:
     try:
         s3 = get_s3_client()
         
-        # Convert data to JSON string
-        json_data = json.dumps(data, indent=2)
+        # Compact JSON; skip re-serialising when the message body can be forwarded
+        if body is None:
+            body = fast_json.dumps(data)
+        
+        extra = {'ContentEncoding': content_encoding} if content_encoding else {}
         
         # Upload to S3
         s3.put_object(
             Bucket=S3_BUCKET_NAME,
             Key=s3_key,
-            Body=json_data.encode('utf-8'),
-            ContentType='application/json'
+            Body=body,
+            ContentType=content_type,
+            **extra
         )
         
-        logger.info(f"Successfully uploaded to S3: s3://{S3_BUCKET_NAME}/{s3_key}")
+        message_log.info("Successfully uploaded to S3: s3://%s/%s", S3_BUCKET_NAME, s3_key)
         return True
     
     except ClientError as e:
@@ -194,7 +362,10 @@ def upload_to_s3(data: dict, s3_key: str, retry_count: int = 0) -> bool:
         if retry_count < MAX_RETRIES and error_code in ['NoSuchBucket', 'ServiceUnavailable', 'SlowDown']:
             logger.info(f"Retrying upload to S3 (attempt {retry_count + 1}/{MAX_RETRIES})...")
             time.sleep(2 ** retry_count)  # Exponential backoff
-            return upload_to_s3(data, s3_key, retry_count + 1)
+            return upload_to_s3(
+                data, s3_key, retry_count + 1, body=body,
+                content_type=content_type, content_encoding=content_encoding
+            )
         
         return False
     
@@ -203,6 +374,52 @@ def upload_to_s3(data: dict, s3_key: str, retry_count: int = 0) -> bool:
         return False
 
 
+def copy_claim_check_to_s3(pointer: dict, s3_key: str, retry_count: int = 0) -> bool:
+    """
+    Copy an offloaded email body server-side into its final S3 key
+    
+    The claim-check object already holds the full email JSON, so the body never
+    passes through this service. The source object is left for the bucket
+    lifecycle rule to expire, so a redelivered message can still be copied.
+    
+    Args:
+        pointer: Claim-check pointer with 'bucket' and 'key'
+        s3_key: Destination S3 object key
+        retry_count: Current retry attempt
+    
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        s3 = get_s3_client()
+        s3.copy_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=s3_key,
+            CopySource={'Bucket': pointer['bucket'], 'Key': pointer['key']},
+            ContentType='application/json',
+            MetadataDirective='REPLACE'
+        )
+        
+        message_log.info("Successfully copied claim check to S3: s3://%s/%s", S3_BUCKET_NAME, s3_key)
+        return True
+    
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        logger.error(f"Error copying claim check to S3 (attempt {retry_count + 1}/{MAX_RETRIES}): {error_code} - {e}")
+        
+        # Retry on certain errors
+        if retry_count < MAX_RETRIES and error_code in ['ServiceUnavailable', 'SlowDown', 'InternalError']:
+            logger.info(f"Retrying claim check copy (attempt {retry_count + 1}/{MAX_RETRIES})...")
+            time.sleep(2 ** retry_count)  # Exponential backoff
+            return copy_claim_check_to_s3(pointer, s3_key, retry_count + 1)
+        
+        return False
+    
+    except Exception as e:
+        logger.error(f"Unexpected error copying claim check: {e}")
+        return False
+
+
 def delete_message(receipt_handle: str) -> bool:
     """
     Delete message from SQS queue after successful processing
@@ -230,6 +447,99 @@ def delete_message(receipt_handle: str) -> bool:
         return False
 
 
+def delete_message_batch(entries: List[dict]) -> dict:
+    """
+    Delete up to 10 messages from the SQS queue in one request
+    
+    Args:
+        entries: {"Id", "ReceiptHandle"} dicts
+    
+    Returns:
+        DeleteMessageBatch response with the Successful and Failed entries
+    """
+    sqs = get_sqs_client()
+    response = sqs.delete_message_batch(QueueUrl=SQS_QUEUE_URL, Entries=entries)
+    logger.debug(f"Deleted {len(response.get('Successful', []))} message(s) from SQS queue")
+    return response
+
+
+def acknowledge(receipt_handle: str) -> bool:
+    """
+    Delete a processed message: queued for a batched delete while the acker
+    runs, deleted right away otherwise
+    
+    Returns:
+        True if the delete was queued or succeeded, False otherwise
+    """
+    if acker is not None and acker.ack(receipt_handle):
+        return True
+    return delete_message(receipt_handle)
+
+
+def start_acker() -> None:
+    """Start batching deletes when SQS_DELETE_BATCHING is on"""
+    global acker
+    if SQS_DELETE_BATCHING:
+        acker = BatchAcker(
+            delete_batch=delete_message_batch,
+            max_delay=SQS_DELETE_BATCH_MAX_DELAY_MS / 1000,
+            max_attempts=SQS_DELETE_MAX_ATTEMPTS,
+            retry_backoff=SQS_DELETE_RETRY_BACKOFF_MS / 1000,
+            retry_backoff_max=SQS_DELETE_RETRY_BACKOFF_MAX_MS / 1000
+        ).start()
+
+
+def stop_acker() -> None:
+    """Send the deletes still queued and go back to deleting one by one"""
+    global acker
+    if acker is not None:
+        acker.close()
+        acker = None
+
+
+def put_aggregate(s3_key: str, body: bytes, content_type: str, content_encoding: Optional[str]) -> bool:
+    """Write an aggregate object or its manifest, with the retries of upload_to_s3"""
+    return upload_to_s3(None, s3_key, body=body, content_type=content_type, content_encoding=content_encoding)
+
+
+def check_visibility_timeout() -> None:
+    """Warn when buffered messages could become visible again before their object is written"""
+    try:
+        attributes = get_sqs_client().get_queue_attributes(
+            QueueUrl=SQS_QUEUE_URL, AttributeNames=["VisibilityTimeout"]
+        ).get('Attributes', {})
+        visibility_timeout = int(attributes['VisibilityTimeout'])
+    except Exception as e:
+        logger.warning(f"Could not read the queue visibility timeout: {e}")
+        return
+    if visibility_timeout < 2 * S3_AGGREGATE_MAX_AGE:
+        logger.warning(
+            f"Queue visibility timeout ({visibility_timeout}s) is less than twice S3_AGGREGATE_MAX_AGE "
+            f"({S3_AGGREGATE_MAX_AGE:g}s); buffered messages may be redelivered and stored twice"
+        )
+
+
+def start_aggregator() -> None:
+    """Start packing emails into aggregate objects when S3_AGGREGATION_ENABLED is on"""
+    global aggregator
+    if S3_AGGREGATION_ENABLED:
+        check_visibility_timeout()
+        aggregator = EmailAggregator(
+            put=put_aggregate,
+            acknowledge=acknowledge,
+            max_bytes=S3_AGGREGATE_MAX_BYTES,
+            max_age=S3_AGGREGATE_MAX_AGE
+        ).start()
+
+
+def stop_aggregator() -> None:
+    """Write the emails still buffered and go back to one object per email"""
+    global aggregator
+    if aggregator is not None:
+        aggregator.close()
+        aggregator = None
+
+
 def process_message(message: dict) -> bool:
     """
     Process a single SQS message:
@@ -244,33 +554,57 @@ def process_message(message: dict) -> bool:
         True if processed successfully, False otherwise
     """
     receipt_handle = message.get('ReceiptHandle')
-    message_body = message.get('Body', '')
     
-    logger.info(f"Processing message: {message.get('MessageId', 'unknown')}")
+    message_log.info("Processing message: %s", message.get('MessageId', 'unknown'))
+    
+    # Unwrap the envelope (compressed bodies are marked in the message attributes)
+    try:
+        message_body = decode_message(message.get('Body', ''), message.get('MessageAttributes'))
+    except EnvelopeError as e:
+        # Not deleted: an unsupported codec is a deployment issue, the DLQ catches the rest
+        logger.error(f"Cannot decode message envelope, message will remain in queue: {e}")
+        return False
     
     # Parse message body
     email_data = parse_message_body(message_body)
     if not email_data:
         logger.warning("Invalid message format, deleting from queue")
-        delete_message(receipt_handle)  # Delete invalid messages
+        acknowledge(receipt_handle)  # Delete invalid messages
         return False
     
+    # Buffer for an aggregate object; the message is deleted once that object is written
+    if aggregator is not None and 'claim_check' not in email_data:
+        record = message_body.encode('utf-8')
+        if b'\n' in record:
+            record = fast_json.dumps(email_data)
+        aggregator.add(
+            email_partition(email_data), record, receipt_handle,
+            message_id=message.get('MessageId', ''),
+            email_timestream=str(email_data.get('email_timestream', ''))
+        )
+        message_log.info("Buffered message for aggregation: %s", message.get('MessageId'))
+        return True
+    
     # Generate S3 key
     s3_key = generate_s3_key(email_data)
-    logger.info(f"Generated S3 key: {s3_key}")
+    message_log.info("Generated S3 key: %s", s3_key)
     
-    # Upload to S3
-    upload_success = upload_to_s3(email_data, s3_key)
+    # Upload to S3 (claim-check bodies are copied server-side from their S3 location)
+    if 'claim_check' in email_data:
+        upload_success = copy_claim_check_to_s3(email_data['claim_check'], s3_key)
+    else:
+        # The decoded message body already is the JSON document to store
+        upload_success = upload_to_s3(email_data, s3_key, body=message_body.encode('utf-8'))
     
     if upload_success:
         # Delete message from queue only after successful upload
-        delete_success = delete_message(receipt_handle)
+        delete_success = acknowledge(receipt_handle)
         if delete_success:
-            logger.info(f"Successfully processed and deleted message: {message.get('MessageId')}")
+            message_log.info("Successfully processed and deleted message: %s", message.get('MessageId'))
             return True
         else:
             logger.warning("Message uploaded to S3 but failed to delete from queue")
-            # Message will be reprocessed, but that's okay since S3 upload is idempotent
+            # Message will be reprocessed and stored again under a new key
             return True
     else:
         logger.error("Failed to upload message to S3, message will remain in queue")
@@ -278,6 +612,70 @@ def process_message(message: dict) -> bool:
         return False
 
 
+def _process_isolated(message: dict) -> bool:
+    """process_message, with any unexpected error confined to this message"""
+    try:
+        return process_message(message)
+    except Exception as e:
+        logger.error(f"Error processing individual message: {e}")
+        return False
+
+
+def process_batch(messages: list) -> List[bool]:
+    """
+    Process a received batch, up to PROCESSING_WORKERS messages in parallel
+    
+    Each message is parsed, uploaded and deleted by one worker, so a message is
+    still only deleted after its own upload succeeded, and a failing message
+    does not affect the others.
+    
+    Args:
+        messages: SQS messages from one receive
+    
+    Returns:
+        process_message result for each message, in order
+    """
+    if PROCESSING_WORKERS <= 1 or len(messages) <= 1:
+        return [_process_isolated(message) for message in messages]
+    return list(get_processing_executor().map(_process_isolated, messages))
+
+
+def create_poll_scheduler() -> PollScheduler:
+    """Scheduler for the poll loop(s): no sleep while messages keep arriving, backoff on errors"""
+    return PollScheduler(
+        idle_delay=0 if SQS_WAIT_TIME > 0 else SQS_POLL_INTERVAL,
+        backoff_base=SQS_ERROR_BACKOFF_BASE,
+        backoff_max=SQS_ERROR_BACKOFF_MAX,
+        report_interval=POLL_STATUS_INTERVAL
+    )
+
+
+def run_async_consumer() -> None:
+    """
+    Consume with the asyncio engine: SQS_RECEIVERS concurrent long polls feed
+    PROCESSING_WORKERS workers running process_message. Returns after SIGINT
+    or SIGTERM once every received message has been processed.
+    """
+    consumer = AsyncConsumer(
+        receive=lambda: fetch_messages(max_messages=10),
+        process=process_message,
+        receivers=SQS_RECEIVERS,
+        workers=PROCESSING_WORKERS,
+        scheduler=create_poll_scheduler()
+    )
+    asyncio.run(consumer.run(handle_signals=True))
+
+
+def install_shutdown_handler():
+    """
+    Make SIGTERM (sent by ECS on stop) end the sync loop after the batch in
+    hand, so the flush of buffered emails and queued deletes still runs.
+    Returns the previous handler.
+    """
+    shutdown_requested.clear()
+    return signal.signal(signal.SIGTERM, lambda signum, frame: shutdown_requested.set())
+
+
 def main():
     """
     Main function that polls SQS and uploads messages to S3
@@ -301,37 +699,58 @@ def main():
     logger.info(f"  AWS Region: {AWS_REGION}")
     logger.info(f"  SQS Queue URL: {SQS_QUEUE_URL}")
     logger.info(f"  S3 Bucket: {S3_BUCKET_NAME}")
-    logger.info(f"  Poll Interval: {SQS_POLL_INTERVAL} seconds")
+    logger.info(f"  Poll Interval (long polling off): {SQS_POLL_INTERVAL} seconds")
     logger.info(f"  Long Poll Wait Time: {SQS_WAIT_TIME} seconds")
     logger.info(f"  Max Retries: {MAX_RETRIES}")
+    logger.info(f"  Processing Workers: {PROCESSING_WORKERS}")
+    logger.info(f"  Consumer Mode: {CONSUMER_MODE}" + (f" ({SQS_RECEIVERS} receivers)" if CONSUMER_MODE == "async" else ""))
+    delete_batching = f"on ({SQS_DELETE_BATCH_MAX_DELAY_MS:g} ms)" if SQS_DELETE_BATCHING else "off"
+    logger.info(f"  Delete Batching: {delete_batching}")
+    aggregation = f"on ({S3_AGGREGATE_MAX_BYTES} bytes or {S3_AGGREGATE_MAX_AGE:g}s per object)" if S3_AGGREGATION_ENABLED else "off"
+    logger.info(f"  S3 Aggregation: {aggregation}")
+    logger.info(f"  Heartbeat File: {HEARTBEAT_FILE or 'disabled'}")
     logger.info("=" * 60)
     
+    init_aws_clients()
+    start_acker()
+    start_aggregator()
+    
+    if CONSUMER_MODE == "async":
+        run_async_consumer()
+        stop_aggregator()
+        stop_acker()
+        logger.info("Shut down gracefully")
+        return
+    
+    scheduler = create_poll_scheduler()
     consecutive_errors = 0
     max_consecutive_errors = 10
+    previous_sigterm_handler = install_shutdown_handler()
     
-    while True:
+    while not shutdown_requested.is_set():
         try:
             # Receive messages from SQS
-            messages = receive_messages(max_messages=10)
-            
-            if messages:
+            try:
+                messages = fetch_messages(max_messages=10)
+            except Exception as e:
+                logger.error(f"Error receiving messages from SQS: {e}")
+                delay = scheduler.record(error=True)
+            else:
                 consecutive_errors = 0  # Reset error counter on success
                 
-                # Process each message
-                for message in messages:
-                    try:
-                        process_message(message)
-                    except Exception as e:
-                        logger.error(f"Error processing individual message: {e}")
-                        # Continue with next message
+                # Process the batch; failures are isolated per message
+                if messages:
+                    process_batch(messages)
                 
-            else:
-                # No messages, log periodically (every 10th poll)
-                if consecutive_errors == 0:
-                    logger.debug("No messages in queue, waiting...")
+                delay = scheduler.record(len(messages))
+            
+            if scheduler.report_due():
+                logger.info(f"Polling status: {scheduler.status()}")
             
-            # Sleep before next poll
-            time.sleep(SQS_POLL_INTERVAL)
+            # Poll again at once while draining; back off after errors.
+            # Waiting on the event lets SIGTERM cut the backoff short
+            if delay > 0:
+                shutdown_requested.wait(delay)
         
         except KeyboardInterrupt:
             logger.info("Received shutdown signal, shutting down gracefully...")
@@ -346,7 +765,16 @@ def main():
                 break
             
             # Wait before retrying
-            time.sleep(SQS_POLL_INTERVAL)
+            shutdown_requested.wait(scheduler.record(error=True))
+    else:
+        logger.info("Received SIGTERM, shutting down gracefully...")
+    
+    signal.signal(signal.SIGTERM, previous_sigterm_handler)
+    if processing_executor is not None:
+        processing_executor.shutdown(wait=True)
+    # After the workers: they may still have buffered emails and queued deletes
+    stop_aggregator()
+    stop_acker()
 
 
 if __name__ == "__main__":
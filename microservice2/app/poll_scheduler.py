@@ -0,0 +1,96 @@
+"""
+Adaptive delay between SQS polls
+
+  drain    the last poll returned messages: poll again immediately
+  idle     the last poll returned nothing: rely on the long poll's own wait,
+           sleeping ``idle_delay`` only when long polling is disabled
+  backoff  the last poll failed: exponential backoff up to ``backoff_max``
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+MODE_DRAIN = "drain"
+MODE_IDLE = "idle"
+MODE_BACKOFF = "backoff"
+
+
+class PollScheduler:
+    """
+    Decides how long to wait before the next poll from the outcome of the last
+    one, and tracks the poll and message rate over the last ``window`` seconds.
+    Thread-safe, so concurrent receivers can share one scheduler.
+    """
+
+    def __init__(
+        self,
+        idle_delay: float = 0.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        window: float = 60.0,
+        report_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.idle_delay = idle_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.window = window
+        self.report_interval = report_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.mode = MODE_IDLE
+        self.consecutive_errors = 0
+        self._polls = deque()  # (time, messages received)
+        self._reported_at = clock()
+
+    def _set_mode(self, mode: str) -> None:
+        if mode != self.mode:
+            logger.info(f"Polling mode {self.mode} -> {mode}")
+            self.mode = mode
+
+    def record(self, received: int = 0, error: bool = False) -> float:
+        """Record the outcome of a poll; returns seconds to wait before the next one"""
+        now = self._clock()
+        with self._lock:
+            self._polls.append((now, received))
+            while self._polls and now - self._polls[0][0] > self.window:
+                self._polls.popleft()
+            if error:
+                self.consecutive_errors += 1
+                self._set_mode(MODE_BACKOFF)
+                # Exponent capped: the float would overflow after ~1000 failures in a row
+                exponent = min(self.consecutive_errors - 1, 32)
+                return min(self.backoff_max, self.backoff_base * 2 ** exponent)
+            self.consecutive_errors = 0
+            if received:
+                self._set_mode(MODE_DRAIN)
+                return 0.0
+            self._set_mode(MODE_IDLE)
+            return self.idle_delay
+
+    def status(self) -> dict:
+        """Current mode plus polls and messages per second over the window"""
+        now = self._clock()
+        with self._lock:
+            polls = [(at, received) for at, received in self._polls if now - at <= self.window]
+        span = min(self.window, max(now - polls[0][0], 1.0)) if polls else self.window
+        return {
+            "mode": self.mode,
+            "polls_per_second": round(len(polls) / span, 2),
+            "messages_per_second": round(sum(received for _, received in polls) / span, 1),
+            "consecutive_errors": self.consecutive_errors,
+        }
+
+    def report_due(self) -> bool:
+        """True once every ``report_interval`` seconds, to log the status periodically"""
+        now = self._clock()
+        with self._lock:
+            if now - self._reported_at < self.report_interval:
+                return False
+            self._reported_at = now
+            return True
@@ -0,0 +1 @@
+# Microservice 2 - Benchmarks
@@ -0,0 +1,95 @@
+"""
+Benchmark: batch processing time with PROCESSING_WORKERS workers
+
+Runs process_batch over batches of 10 messages against an in-memory S3/SQS
+stand-in that sleeps for a fixed latency per call (put_object and
+delete_message), the way a real round trip blocks the worker thread, and
+reports messages per second for each worker count.
+
+Usage (from microservice2/):
+    python -m benchmarks.bench_concurrency [--latency-ms 20] [--workers 1,2,5,10] [--json]
+"""
+
+import argparse
+import json
+import os
+import time
+from unittest.mock import patch
+
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue")
+os.environ.setdefault("S3_BUCKET_NAME", "bench-bucket")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app import main as app_main  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+
+
+class LatencyClient:
+    """S3/SQS stand-in whose calls block for ``latency`` seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def put_object(self, **kwargs):
+        time.sleep(self.latency)
+        return {}
+
+    def delete_message(self, **kwargs):
+        time.sleep(self.latency)
+        return {}
+
+
+def _batches(count: int) -> list:
+    messages = [
+        {"MessageId": f"m-{index}", "ReceiptHandle": f"r-{index}", "Body": json.dumps(email)}
+        for index, email in enumerate(make_corpus(count))
+    ]
+    return [messages[i:i + 10] for i in range(0, len(messages), 10)]
+
+
+def run(worker_counts, count: int, latency: float) -> list:
+    batches = _batches(count)
+    client = LatencyClient(latency)
+    results = []
+    for workers in worker_counts:
+        with patch.object(app_main, "get_s3_client", return_value=client), \
+             patch.object(app_main, "get_sqs_client", return_value=client), \
+             patch.object(app_main, "PROCESSING_WORKERS", workers), \
+             patch.object(app_main, "processing_executor", None):
+            start = time.perf_counter()
+            for batch in batches:
+                app_main.process_batch(batch)
+            seconds = time.perf_counter() - start
+            if app_main.processing_executor is not None:
+                app_main.processing_executor.shutdown()
+        results.append({
+            "workers": workers,
+            "messages": count,
+            "messages_per_second": round(count / seconds),
+            "ms_per_batch": round(seconds / len(batches) * 1000, 1),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,5,10", help="Comma-separated PROCESSING_WORKERS values")
+    parser.add_argument("--count", type=int, default=200, help="Messages processed per worker count")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latency of each S3/SQS call")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run([int(w) for w in args.workers.split(",")], args.count, args.latency_ms / 1000)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]["messages_per_second"]
+    print(f"{'workers':>8}{'msg/s':>10}{'ms/batch':>10}{'speedup':>10}")
+    for r in results:
+        print(f"{r['workers']:>8}{r['messages_per_second']:>10}{r['ms_per_batch']:>10}"
+              f"{r['messages_per_second'] / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
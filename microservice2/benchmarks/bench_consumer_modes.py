@@ -0,0 +1,129 @@
+"""
+Benchmark: draining a backlog with the sync loop vs the asyncio consumer
+
+An in-memory SQS/S3 stand-in blocks for a fixed latency per call
+(receive_message, put_object, delete_message[_batch]). The same backlog is drained by:
+  sync            main() poll loop, PROCESSING_WORKERS threads per batch
+  async_rN_wM     AsyncConsumer with N concurrent receivers and M workers
+
+and messages per second are reported for each.
+
+Usage (from microservice2/):
+    python -m benchmarks.bench_consumer_modes [--count 1000] [--latency-ms 20] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue")
+os.environ.setdefault("S3_BUCKET_NAME", "bench-bucket")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app import main as app_main  # noqa: E402
+from app.async_consumer import AsyncConsumer  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+
+ASYNC_VARIANTS = ((1, 10), (2, 10), (4, 20), (8, 40))
+
+
+class LatencyAWS:
+    """SQS/S3 stand-in holding a backlog; every call blocks for ``latency`` seconds"""
+
+    def __init__(self, messages: list, latency: float, on_empty):
+        self.pending = list(messages)
+        self.latency = latency
+        self.on_empty = on_empty
+        self._lock = threading.Lock()
+
+    def receive_message(self, MaxNumberOfMessages=10, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            batch = self.pending[:MaxNumberOfMessages]
+            del self.pending[:len(batch)]
+        if not batch:
+            self.on_empty()
+        return {"Messages": batch}
+
+    def put_object(self, **kwargs):
+        time.sleep(self.latency)
+        return {}
+
+    def delete_message(self, **kwargs):
+        time.sleep(self.latency)
+        return {}
+
+    def delete_message_batch(self, Entries, **kwargs):
+        time.sleep(self.latency)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+
+def _messages(count: int) -> list:
+    return [
+        {"MessageId": f"m-{index}", "ReceiptHandle": f"r-{index}", "Body": json.dumps(email)}
+        for index, email in enumerate(make_corpus(count))
+    ]
+
+
+def _stop_sync_loop():
+    raise KeyboardInterrupt  # main() treats it as a shutdown signal
+
+
+def _drain(aws: LatencyAWS, consume) -> float:
+    with patch.object(app_main, "get_sqs_client", return_value=aws), \
+         patch.object(app_main, "get_s3_client", return_value=aws), \
+         patch.object(app_main, "init_aws_clients"), \
+         patch.object(app_main, "processing_executor", None):
+        start = time.perf_counter()
+        consume()
+        return time.perf_counter() - start
+
+
+def run(count: int, latency: float) -> list:
+    messages = _messages(count)
+    results = []
+
+    aws = LatencyAWS(messages, latency, _stop_sync_loop)
+    seconds = _drain(aws, app_main.main)
+    results.append({"variant": "sync", "messages_per_second": round(count / seconds)})
+
+    for receivers, workers in ASYNC_VARIANTS:
+        consumer = AsyncConsumer(
+            receive=lambda: app_main.fetch_messages(max_messages=10),
+            process=app_main.process_message,
+            receivers=receivers,
+            workers=workers,
+        )
+        aws = LatencyAWS(messages, latency, consumer.stop)
+        seconds = _drain(aws, lambda: asyncio.run(consumer.run()))
+        results.append({
+            "variant": f"async_r{receivers}_w{workers}",
+            "messages_per_second": round(count / seconds),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000, help="Messages in the backlog")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latency of each SQS/S3 call")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.count, args.latency_ms / 1000)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]["messages_per_second"]
+    print(f"{'variant':<16}{'msg/s':>8}{'speedup':>10}")
+    for r in results:
+        print(f"{r['variant']:<16}{r['messages_per_second']:>8}{r['messages_per_second'] / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: consumer throughput with logging enabled
+
+Runs process_message over the synthetic corpus against in-memory S3/SQS stubs
+and reports messages per second for:
+  off              log level WARNING (upper bound)
+  sync_text        previous setup: basicConfig-style text lines written inline,
+                   every per-message INFO line emitted
+  queue_json       queue handler + JSON listener, every per-message line emitted
+  queue_json_rate  queue handler + JSON listener, per-message lines rate limited
+                   (LOG_MESSAGE_RATE_LIMIT default)
+
+Log output goes to a temporary file so real write syscalls are included.
+
+Usage (from microservice2/):
+    python -m benchmarks.bench_logging [--count 2000] [--json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue")
+os.environ.setdefault("S3_BUCKET_NAME", "bench-bucket")
+
+from app import main as app_main  # noqa: E402
+from app.log_config import TEXT_FORMAT, setup_logging  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+
+
+class StubClient:
+    """Accepts the S3/SQS calls process_message makes and does nothing"""
+
+    def put_object(self, **kwargs):
+        return {}
+
+    def copy_object(self, **kwargs):
+        return {}
+
+    def delete_message(self, **kwargs):
+        return {}
+
+
+def _messages(count: int) -> list:
+    return [
+        {"MessageId": f"m-{index}", "ReceiptHandle": f"r-{index}", "Body": json.dumps(email)}
+        for index, email in enumerate(make_corpus(count))
+    ]
+
+
+def _configure(variant: str, stream):
+    """Install the logging setup for one variant; returns the listener, if any"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    app_main.message_log.rate_limit = 0
+    if variant == "off":
+        root.setLevel(logging.WARNING)
+        return None
+    if variant == "sync_text":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        return None
+    if variant == "queue_json_rate":
+        app_main.message_log.rate_limit = app_main.LOG_MESSAGE_RATE_LIMIT
+    return setup_logging("microservice2", fmt="json", stream=stream, force=True)
+
+
+def run(count: int) -> list:
+    messages = _messages(count)
+    results = []
+    stub = StubClient()
+    with patch.object(app_main, "get_s3_client", return_value=stub), \
+         patch.object(app_main, "get_sqs_client", return_value=stub), \
+         tempfile.TemporaryFile("w") as stream:
+        for variant in ("off", "sync_text", "queue_json", "queue_json_rate"):
+            listener = _configure(variant, stream)
+            start = time.perf_counter()
+            for message in messages:
+                app_main.process_message(message)
+            elapsed = time.perf_counter() - start
+            if listener is not None:
+                drain_start = time.perf_counter()
+                listener.stop()
+                drain = time.perf_counter() - drain_start
+            else:
+                drain = 0.0
+            results.append({
+                "variant": variant,
+                "messages": count,
+                "messages_per_second": round(count / elapsed),
+                "us_per_message": round(elapsed / count * 1e6, 1),
+                "listener_drain_ms": round(drain * 1000, 1),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="Messages to process per variant")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'variant':<18}{'msg/s':>10}{'us/msg':>10}{'drain ms':>10}")
+    for r in results:
+        print(f"{r['variant']:<18}{r['messages_per_second']:>10}{r['us_per_message']:>10}{r['listener_drain_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: message parsing and S3 body serialisation in Microservice 2
+
+Compares CPU per message for:
+  before  json.loads + json.dumps(indent=2).encode (previous upload_to_s3 path)
+  after   fast_json.loads for validation + the decoded body forwarded as-is
+
+Usage (from microservice2/):
+    python -m benchmarks.bench_serialisation [--count 500] [--json]
+"""
+
+import argparse
+import json
+import time
+
+from app import fast_json
+from benchmarks.corpus import make_corpus
+
+
+def before(body: str) -> bytes:
+    data = json.loads(body)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def after(body: str) -> bytes:
+    fast_json.loads(body)
+    return body.encode("utf-8")
+
+
+def _best_of(repeats: int, fn, inputs) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeats: int = 5) -> list:
+    bodies = [fast_json.dumps(email).decode("utf-8") for email in make_corpus(count)]
+
+    results = []
+    for name, fn in (("before", before), ("after", after)):
+        seconds = _best_of(repeats, fn, bodies)
+        results.append({
+            "variant": name,
+            "messages": count,
+            "us_per_msg": round(seconds / count * 1e6, 1),
+            "s3_bytes": sum(len(fn(body)) for body in bodies),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Emails in the corpus")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]["us_per_msg"]
+    print(f"{'variant':<10}{'us/msg':>10}{'speedup':>10}{'S3 MB':>10}")
+    for r in results:
+        print(f"{r['variant']:<10}{r['us_per_msg']:>10}{baseline / r['us_per_msg']:>9.1f}x{r['s3_bytes'] / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Synthetic but realistic email corpus for benchmarks
+
+Sizes follow a log-normal distribution (most emails are a few KB, a long tail
+reaches hundreds of KB) and bodies mix prose, quoted reply chains, signatures,
+HTML markup and the occasional base64 attachment, which is what drives
+compression ratios and parse cost in production.
+"""
+
+import base64
+import random
+from typing import List
+
+WORDS = (
+    "the of and to in is for on that with as this be are by from at or an it "
+    "please review attached report meeting schedule quarterly budget update team "
+    "customer invoice payment order shipment delivery contract project deadline "
+    "thanks regards hello hi follow up question issue ticket status approval "
+    "security incident alert firewall policy access account password reset "
+    "revenue forecast pipeline analysis draft final version comments feedback"
+).split()
+
+SIZE_MEDIAN_BYTES = 4 * 1024
+SIZE_SIGMA = 1.2
+SIZE_MAX_BYTES = 240 * 1024
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _content(rng: random.Random, size: int) -> str:
+    parts: List[str] = []
+    length = 0
+    html = rng.random() < 0.3
+    while length < size:
+        roll = rng.random()
+        if roll < 0.6:
+            block = _paragraph(rng)
+            if html:
+                block = f"<p style=\"font-family:Arial;font-size:12px\">{block}</p>"
+        elif roll < 0.85:
+            block = "\n".join("> " + _sentence(rng) for _ in range(rng.randint(3, 8)))
+        elif roll < 0.98:
+            block = "--\nJane Doe | Senior Analyst\nExample Corp | +1 555 0100\nThis email is confidential."
+        else:
+            block = base64.b64encode(rng.randbytes(rng.randint(256, 2048))).decode()
+        parts.append(block)
+        length += len(block) + 2
+    return "\n\n".join(parts)[:size]
+
+
+def email_sizes(count: int, seed: int = 42) -> List[int]:
+    """Draw ``count`` content sizes from the production-like distribution"""
+    rng = random.Random(seed)
+    return [
+        max(64, min(SIZE_MAX_BYTES, int(rng.lognormvariate(0, SIZE_SIGMA) * SIZE_MEDIAN_BYTES)))
+        for _ in range(count)
+    ]
+
+
+def make_email(rng: random.Random, content_size: int) -> dict:
+    """Build one EmailData-shaped dict with roughly ``content_size`` bytes of content"""
+    return {
+        "email_subject": _sentence(rng)[:120],
+        "email_sender": f"user{rng.randint(1, 5000)}@example.com",
+        "email_timestream": str(1704067200 + rng.randint(0, 365 * 86400)),
+        "email_content": _content(rng, content_size),
+    }
+
+
+def make_corpus(count: int = 500, seed: int = 42) -> List[dict]:
+    """Build a reproducible corpus of ``count`` emails"""
+    rng = random.Random(seed)
+    return [make_email(rng, size) for size in email_sizes(count, seed)]
+
+
+def make_fixed_size_corpus(count: int, content_size: int, seed: int = 42) -> List[dict]:
+    """Build ``count`` emails of one content size, for per-size comparisons"""
+    rng = random.Random(seed)
+    return [make_email(rng, content_size) for _ in range(count)]
@@ -0,0 +1,179 @@
+"""
+Microbenchmarks of the consumer's per-message functions, with a regression gate
+
+Cases (µs per message over the log-normal corpus in benchmarks/corpus.py):
+  parse_message_body    JSON decode + required-field check of an SQS body
+  generate_s3_key       S3 key from email_timestream
+  upload_to_s3          upload_to_s3 forwarding the decoded SQS body, as
+                        process_message does, against a no-op S3 client
+
+Results are compared with benchmarks/baseline.json. Each timing is divided by
+a fixed pure-Python calibration loop timed alongside it, so a baseline
+recorded on one machine stays usable on another of a different speed. A case
+fails the gate when its normalised time is more than --threshold (default
+BENCH_REGRESSION_THRESHOLD or 0.25, i.e. 25%) above the baseline, or more
+than its CASE_THRESHOLDS entry when that is wider. The calibration only
+tracks interpreter speed, so the gate is most reliable with a baseline
+recorded on the machine that runs it (--save-baseline on the CI agent).
+
+Usage (from microservice2/):
+    python -m benchmarks.microbench                  # run and compare with the baseline
+    python -m benchmarks.microbench --check          # exit 1 if any case regressed
+    python -m benchmarks.microbench --save-baseline  # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SQS_QUEUE_URL", "https://sqs.eu-west-1.amazonaws.com/123456789/bench-queue")
+os.environ.setdefault("S3_BUCKET_NAME", "bench-bucket")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app import fast_json  # noqa: E402
+from app import main as app_main  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.25"))  # Allowed slowdown vs baseline
+# Cases that mostly run compiled code (orjson, os.urandom for uuid4) do not
+# scale with the pure-Python calibration loop across machines, and the
+# shortest ones vary by about 20% between runs, so they get more room
+CASE_THRESHOLDS = {
+    "parse_message_body": 0.5,
+    "generate_s3_key": 0.5,
+    "upload_to_s3": 0.5,
+}
+
+
+class NullS3:
+    """Accepts put_object and does nothing, so only the consumer's own work is timed"""
+
+    def put_object(self, **kwargs):
+        return {}
+
+
+def _calibrate() -> int:
+    """Fixed interpreter workload the case timings are normalised by"""
+    total = 0
+    for i in range(20000):
+        total += i * i % 7
+    return total
+
+
+def _time_pass(fn, inputs) -> float:
+    """Seconds per call for one pass over inputs"""
+    start = time.perf_counter()
+    for item in inputs:
+        fn(item)
+    return (time.perf_counter() - start) / len(inputs)
+
+
+def measure(fn, inputs, rounds: int = 15) -> tuple:
+    """
+    Median seconds per call and median ratio to the calibration loop. The
+    calibration is timed right before every pass, so both see the same CPU
+    speed (frequency scaling, noisy neighbours) and the ratio stays stable.
+    """
+    times, ratios = [], []
+    for _ in range(rounds):
+        calibration = _time_pass(lambda _: _calibrate(), range(3))
+        seconds = _time_pass(fn, inputs)
+        times.append(seconds)
+        ratios.append(seconds / calibration)
+    return statistics.median(times), statistics.median(ratios)
+
+
+def cases(count: int) -> dict:
+    """Case name -> (function, inputs)"""
+    corpus = make_corpus(count)
+    bodies = [fast_json.dumps(email).decode("utf-8") for email in corpus]
+    app_main.s3_client = NullS3()
+    return {
+        "parse_message_body": (app_main.parse_message_body, bodies),
+        "generate_s3_key": (app_main.generate_s3_key, corpus),
+        "upload_to_s3": (
+            lambda item: app_main.upload_to_s3(item[0], "emails/bench.json", body=item[1].encode("utf-8")),
+            list(zip(corpus, bodies))
+        ),
+    }
+
+
+def run(count: int, rounds: int = 15) -> dict:
+    results = {}
+    for name, (fn, inputs) in cases(count).items():
+        seconds, normalised = measure(fn, inputs, rounds)
+        results[name] = {"us_per_call": round(seconds * 1e6, 2), "normalised": round(normalised, 5)}
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "count": count,
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """One row per case; ``regressed`` when the normalised time grew by more than the case's threshold"""
+    rows = []
+    for name, result in current["cases"].items():
+        reference = baseline.get("cases", {}).get(name)
+        allowed = max(threshold, CASE_THRESHOLDS.get(name, 0.0))
+        change = None
+        if reference:
+            change = result["normalised"] / reference["normalised"] - 1
+        rows.append({
+            "case": name,
+            "us_per_call": result["us_per_call"],
+            "baseline_us_per_call": reference["us_per_call"] if reference else None,
+            "change_percent": round(change * 100, 1) if change is not None else None,
+            "threshold_percent": round(allowed * 100, 1),
+            "regressed": change is not None and change > allowed,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Emails in the corpus")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any case regressed")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    current = run(args.count)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    if args.json:
+        print(json.dumps({"results": current, "comparison": rows}, indent=2))
+    else:
+        print(f"{'case':<24}{'us/call':>10}{'baseline':>10}{'change':>9}{'allowed':>9}")
+        for row in rows:
+            change = "" if row["change_percent"] is None else f"{row['change_percent']:+.1f}%"
+            allowed = f"+{row['threshold_percent']:.0f}%"
+            flag = "  REGRESSED" if row["regressed"] else ""
+            print(f"{row['case']:<24}{row['us_per_call']:>10}{str(row['baseline_us_per_call']):>10}{change:>9}{allowed:>9}{flag}")
+
+    if args.check and any(row["regressed"] for row in rows):
+        print(f"Regression above the allowed slowdown vs {args.baseline}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
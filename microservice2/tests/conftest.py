@@ -0,0 +1,23 @@
+"""
+Shared fixtures for Microservice 2 tests
+"""
+import pytest
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """A FakeClock to pass as the ``clock`` of time-based components"""
+    return FakeClock()
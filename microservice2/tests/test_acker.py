@@ -0,0 +1,180 @@
+"""
+Unit tests for batched SQS acknowledgement
+"""
+import threading
+import time
+
+from app.acker import BatchAcker
+
+
+class FakeSQS:
+    """DeleteMessageBatch stand-in; ``failures`` maps a receipt handle to the error entries to return, in turn"""
+
+    def __init__(self, failures=None, error=None):
+        self.failures = {handle: list(errors) for handle, errors in (failures or {}).items()}
+        self.error = error
+        self.lock = threading.Lock()
+        self.calls = []
+        self.deleted = []
+
+    def delete_batch(self, entries):
+        with self.lock:
+            self.calls.append([entry["ReceiptHandle"] for entry in entries])
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+            successful, failed = [], []
+            for entry in entries:
+                errors = self.failures.get(entry["ReceiptHandle"])
+                if errors:
+                    failed.append({"Id": entry["Id"], **errors.pop(0)})
+                else:
+                    successful.append({"Id": entry["Id"]})
+                    self.deleted.append(entry["ReceiptHandle"])
+            return {"Successful": successful, "Failed": failed}
+
+
+THROTTLED = {"Code": "RequestThrottled", "Message": "slow down", "SenderFault": False}
+INVALID = {"Code": "ReceiptHandleIsInvalid", "Message": "expired", "SenderFault": True}
+
+
+class TestBatchAcker:
+    """Test receipt handles are deleted in batches of up to 10"""
+
+    def test_full_batch_is_sent_without_waiting(self):
+        """Test ten acks are sent as one call well before the deadline"""
+        sqs = FakeSQS()
+        acker = BatchAcker(sqs.delete_batch, max_delay=10).start()
+        start = time.perf_counter()
+        for i in range(10):
+            acker.ack(f"r-{i}")
+        assert acker.flush(timeout=1)
+        acker.close()
+
+        assert time.perf_counter() - start < 1
+        assert sqs.calls == [[f"r-{i}" for i in range(10)]]
+
+    def test_partial_batch_is_sent_after_deadline(self):
+        """Test fewer than ten acks are sent once the oldest has waited max_delay"""
+        sqs = FakeSQS()
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.05).start()
+        for i in range(3):
+            acker.ack(f"r-{i}")
+        assert sqs.calls == []
+
+        time.sleep(0.3)
+        assert sqs.calls == [["r-0", "r-1", "r-2"]]
+        acker.close()
+
+    def test_retryable_entry_failure_is_retried(self):
+        """Test an entry that failed on the SQS side is sent again"""
+        sqs = FakeSQS(failures={"r-1": [THROTTLED]})
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.01).start()
+        for i in range(3):
+            acker.ack(f"r-{i}")
+        assert acker.flush(timeout=2)
+        acker.close()
+
+        assert sorted(sqs.deleted) == ["r-0", "r-1", "r-2"]
+        assert sqs.calls[1] == ["r-1"]
+        assert acker.stats.as_dict() == {"calls": 2, "deleted": 3, "retried": 1, "failed": 0}
+
+    def test_sender_fault_is_not_retried(self):
+        """Test an invalid receipt handle is dropped instead of retried"""
+        sqs = FakeSQS(failures={"r-0": [INVALID]})
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.01).start()
+        acker.ack("r-0")
+        acker.ack("r-1")
+        assert acker.flush(timeout=2)
+        acker.close()
+
+        assert sqs.calls == [["r-0", "r-1"]]
+        assert acker.stats.failed == 1
+
+    def test_gives_up_after_max_attempts(self):
+        """Test an entry that keeps failing is sent max_attempts times, then left for redelivery"""
+        sqs = FakeSQS(failures={"r-0": [THROTTLED] * 5})
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.01, max_attempts=3).start()
+        acker.ack("r-0")
+        assert acker.flush(timeout=2)
+        acker.close()
+
+        assert sqs.calls == [["r-0"]] * 3
+        assert acker.stats.failed == 1
+        assert sqs.deleted == []
+
+    def test_retries_back_off_exponentially_up_to_the_cap(self):
+        """Test the gaps between sends of a failing entry double from retry_backoff and stop at retry_backoff_max"""
+        sqs = FakeSQS(failures={"r-0": [THROTTLED] * 3})
+        sent_at = []
+
+        def delete_batch(entries):
+            sent_at.append(time.monotonic())
+            return sqs.delete_batch(entries)
+
+        acker = BatchAcker(delete_batch, max_delay=0.01, max_attempts=4, retry_backoff=0.1, retry_backoff_max=0.25).start()
+        acker.ack("r-0")
+        assert acker.flush(timeout=2)
+        acker.close()
+
+        gaps = [later - earlier for earlier, later in zip(sent_at, sent_at[1:])]
+        assert sqs.deleted == ["r-0"]
+        assert len(gaps) == 3
+        assert all(expected <= gap < expected + 0.05 for gap, expected in zip(gaps, [0.1, 0.2, 0.25]))
+
+    def test_backoff_does_not_hold_up_new_acks(self):
+        """Test acks queued while an entry backs off are sent on their own deadline"""
+        sqs = FakeSQS(failures={"r-0": [THROTTLED]})
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.01, retry_backoff=0.5).start()
+        acker.ack("r-0")
+        time.sleep(0.1)
+        acker.ack("r-1")
+        time.sleep(0.1)
+
+        assert sqs.calls == [["r-0"], ["r-1"]]
+        assert acker.flush(timeout=2)
+        acker.close()
+        assert sqs.calls[2] == ["r-0"]
+
+    def test_failed_request_retries_whole_batch(self):
+        """Test a request that raised is retried with all of its entries"""
+        sqs = FakeSQS(error=ConnectionError("reset"))
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.01).start()
+        for i in range(4):
+            acker.ack(f"r-{i}")
+        assert acker.flush(timeout=2)
+        acker.close()
+
+        assert sorted(sqs.deleted) == [f"r-{i}" for i in range(4)]
+        assert len(sqs.calls) == 2
+
+    def test_close_sends_queued_acks(self):
+        """Test close sends acks still waiting for their deadline and rejects later ones"""
+        sqs = FakeSQS()
+        acker = BatchAcker(sqs.delete_batch, max_delay=60).start()
+        acker.ack("r-0")
+        acker.close()
+
+        assert sqs.deleted == ["r-0"]
+        assert acker.ack("r-1") is False
+
+    def test_concurrent_acks_are_each_deleted_once(self):
+        """Test acks from many threads are all deleted exactly once in full batches"""
+        sqs = FakeSQS()
+        acker = BatchAcker(sqs.delete_batch, max_delay=0.05).start()
+
+        def ack_range(start):
+            for i in range(start, start + 100):
+                acker.ack(f"r-{i}")
+
+        threads = [threading.Thread(target=ack_range, args=(n * 100,)) for n in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert acker.flush(timeout=5)
+        acker.close()
+
+        assert sorted(sqs.deleted) == sorted(f"r-{i}" for i in range(1000))
+        assert all(len(call) <= 10 for call in sqs.calls)
+        assert len(sqs.calls) <= 110
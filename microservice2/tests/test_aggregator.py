@@ -0,0 +1,125 @@
+"""
+Unit tests for the aggregating S3 sink
+"""
+import gzip
+import json
+import threading
+import time
+
+from app.aggregator import EmailAggregator
+
+
+class FakeStore:
+    """S3 stand-in for ``put``; writes of keys ending in ``fail_suffix`` fail"""
+
+    def __init__(self, fail_suffix=None):
+        self.fail_suffix = fail_suffix
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.acked = []
+
+    def put(self, key, body, content_type, content_encoding):
+        if self.fail_suffix and key.endswith(self.fail_suffix):
+            return False
+        with self.lock:
+            self.objects[key] = (body, content_type, content_encoding)
+        return True
+
+    def acknowledge(self, receipt_handle):
+        with self.lock:
+            self.acked.append(receipt_handle)
+        return True
+
+    def manifests(self):
+        return [json.loads(body) for key, (body, _, _) in self.objects.items() if key.endswith(".manifest.json")]
+
+
+def record(i):
+    return json.dumps({"email_subject": f"Test {i}", "email_timestream": str(1700000000 + i)}, separators=(",", ":")).encode()
+
+
+class TestEmailAggregator:
+    """Test emails are packed into gzip NDJSON objects with a manifest"""
+
+    def test_manifest_offsets_locate_each_email(self):
+        """Test each manifest entry's offset and length give back its email from the decompressed object"""
+        store = FakeStore()
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_age=60)
+        for i in range(5):
+            aggregator.add("emails/2023/11/14", record(i), f"r-{i}", message_id=f"m-{i}", email_timestream=str(i))
+        aggregator.flush()
+
+        [manifest] = store.manifests()
+        body, content_type, content_encoding = store.objects[manifest["object"]]
+        assert (content_type, content_encoding) == ("application/x-ndjson", "gzip")
+        assert manifest["object"].startswith("emails/2023/11/14/batch-")
+        ndjson = gzip.decompress(body)
+        assert manifest["count"] == 5
+        assert manifest["bytes"] == len(ndjson)
+        for i, entry in enumerate(manifest["emails"]):
+            assert entry["message_id"] == f"m-{i}"
+            assert ndjson[entry["offset"]:entry["offset"] + entry["length"]] == record(i)
+        assert ndjson.splitlines() == [record(i) for i in range(5)]
+
+    def test_partitions_are_written_separately(self):
+        """Test emails of different days go into different objects"""
+        store = FakeStore()
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_age=60)
+        aggregator.add("emails/2023/11/14", record(0), "r-0", message_id="m-0", email_timestream="0")
+        aggregator.add("emails/2023/11/15", record(1), "r-1", message_id="m-1", email_timestream="1")
+        aggregator.flush()
+
+        objects = sorted(m["object"].rsplit("/", 1)[0] for m in store.manifests())
+        assert objects == ["emails/2023/11/14", "emails/2023/11/15"]
+
+    def test_size_threshold_writes_object(self):
+        """Test a partition is written as soon as it holds max_bytes of NDJSON"""
+        store = FakeStore()
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_bytes=len(record(0)) * 3, max_age=60)
+        for i in range(3):
+            aggregator.add("emails/2023/11/14", record(i), f"r-{i}", message_id=f"m-{i}", email_timestream="0")
+            assert store.acked == ([] if i < 2 else ["r-0", "r-1", "r-2"])
+        assert len(store.manifests()) == 1
+
+    def test_age_threshold_writes_object(self):
+        """Test the background thread writes a partition once its oldest email is max_age old"""
+        store = FakeStore()
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_age=0.05).start()
+        aggregator.add("emails/2023/11/14", record(0), "r-0", message_id="m-0", email_timestream="0")
+        assert store.acked == []
+
+        deadline = time.monotonic() + 2
+        while not store.acked and time.monotonic() < deadline:
+            time.sleep(0.01)
+        aggregator.close()
+        assert store.acked == ["r-0"]
+
+    def test_failed_object_write_acknowledges_nothing(self):
+        """Test messages stay in the queue when their object cannot be written"""
+        store = FakeStore(fail_suffix=".ndjson.gz")
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_age=60)
+        aggregator.add("emails/2023/11/14", record(0), "r-0", message_id="m-0", email_timestream="0")
+        aggregator.flush()
+
+        assert store.acked == []
+        assert store.objects == {}
+        assert aggregator.stats.failed == 1
+
+    def test_failed_manifest_write_acknowledges_nothing(self):
+        """Test messages stay in the queue when the manifest cannot be written"""
+        store = FakeStore(fail_suffix=".manifest.json")
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_age=60)
+        aggregator.add("emails/2023/11/14", record(0), "r-0", message_id="m-0", email_timestream="0")
+        aggregator.flush()
+
+        assert store.acked == []
+
+    def test_close_writes_buffered_emails(self):
+        """Test close writes partitions that have not reached a threshold yet"""
+        store = FakeStore()
+        aggregator = EmailAggregator(store.put, store.acknowledge, max_age=60).start()
+        aggregator.add("emails/2023/11/14", record(0), "r-0", message_id="m-0", email_timestream="0")
+        aggregator.close()
+
+        assert store.acked == ["r-0"]
+        assert aggregator.stats.as_dict()["objects"] == 1
@@ -0,0 +1,126 @@
+"""
+Unit tests for the asyncio consumer engine
+"""
+import asyncio
+import threading
+import time
+
+from app.async_consumer import AsyncConsumer
+from app.poll_scheduler import PollScheduler
+
+
+class FakeQueue:
+    """Blocking SQS stand-in: each receive takes ``latency`` and returns up to 10 messages"""
+
+    def __init__(self, count, latency=0.0):
+        self.pending = [{"MessageId": f"m-{i}"} for i in range(count)]
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    def receive(self):
+        with self.lock:
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(self.latency)
+        with self.lock:
+            self.concurrent -= 1
+            batch, self.pending = self.pending[:10], self.pending[10:]
+        return batch
+
+
+class Processor:
+    """Records processed message ids; each call takes ``latency``"""
+
+    def __init__(self, latency=0.0, failing=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.lock = threading.Lock()
+        self.done = []
+
+    def __call__(self, message):
+        time.sleep(self.latency)
+        if message["MessageId"] in self.failing:
+            raise RuntimeError("boom")
+        with self.lock:
+            self.done.append(message["MessageId"])
+        return True
+
+
+async def consume_until(consumer, condition, timeout=10):
+    """Run the consumer until condition() holds, then stop it and wait for the drain"""
+    task = asyncio.create_task(consumer.run())
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+    consumer.stop()
+    await task
+
+
+class TestAsyncConsumer:
+    """Test receivers, workers, shutdown and scaling"""
+
+    async def test_processes_every_message(self):
+        """Test each received message is passed to process exactly once"""
+        queue, processor = FakeQueue(95), Processor()
+        consumer = AsyncConsumer(queue.receive, processor, receivers=3, workers=4, scheduler=PollScheduler(idle_delay=0.01))
+        await consume_until(consumer, lambda: len(processor.done) == 95)
+
+        assert sorted(processor.done) == sorted(f"m-{i}" for i in range(95))
+        assert consumer.stats.received == 95
+        assert consumer.stats.processed == 95
+
+    async def test_receivers_poll_concurrently(self):
+        """Test several long polls are outstanding at the same time"""
+        queue, processor = FakeQueue(0, latency=0.05), Processor()
+        consumer = AsyncConsumer(queue.receive, processor, receivers=4, workers=1)
+        await consume_until(consumer, lambda: consumer.stats.polls >= 8)
+
+        assert queue.max_concurrent == 4
+
+    async def test_failures_are_isolated(self):
+        """Test a message whose processing raises is counted as failed and the rest continue"""
+        queue, processor = FakeQueue(20), Processor(failing={"m-3"})
+        consumer = AsyncConsumer(queue.receive, processor, receivers=1, workers=2, scheduler=PollScheduler(idle_delay=0.01))
+        await consume_until(consumer, lambda: consumer.stats.processed + consumer.stats.failed == 20)
+
+        assert consumer.stats.failed == 1
+        assert len(processor.done) == 19
+
+    async def test_stop_drains_received_messages(self):
+        """Test messages already received are processed before run() returns"""
+        queue, processor = FakeQueue(30), Processor(latency=0.01)
+        consumer = AsyncConsumer(queue.receive, processor, receivers=2, workers=2, scheduler=PollScheduler(idle_delay=0.01))
+        await consume_until(consumer, lambda: consumer.stats.received > 0)
+
+        assert len(processor.done) == consumer.stats.received
+
+    async def test_receivers_wait_while_workers_are_busy(self):
+        """Test the bounded queue stops receivers from fetching far ahead of processing"""
+        queue, processor = FakeQueue(500), Processor(latency=0.01)
+        consumer = AsyncConsumer(queue.receive, processor, receivers=2, workers=2, queue_size=5)
+        backlog = []
+
+        def sample():
+            backlog.append(consumer.stats.received - len(processor.done))
+            return len(processor.done) >= 40
+
+        await consume_until(consumer, sample)
+
+        # Queue + one batch held by each blocked receiver + messages in the workers
+        assert max(backlog) <= 5 + 2 * 10 + 2
+
+    async def test_throughput_scales_with_receivers_and_workers(self):
+        """Test more receivers and workers drain the same backlog proportionally faster"""
+        async def drain_seconds(receivers, workers):
+            queue, processor = FakeQueue(200, latency=0.02), Processor(latency=0.005)
+            consumer = AsyncConsumer(queue.receive, processor, receivers=receivers, workers=workers, scheduler=PollScheduler(idle_delay=0.01))
+            start = time.perf_counter()
+            await consume_until(consumer, lambda: len(processor.done) == 200)
+            assert len(processor.done) == 200
+            return time.perf_counter() - start
+
+        single = await drain_seconds(1, 1)
+        scaled = await drain_seconds(4, 10)
+        assert single / scaled > 3
@@ -0,0 +1,69 @@
+"""
+Unit tests for decoding the SQS message envelope
+"""
+import base64
+import gzip
+import json
+
+import pytest
+
+from app.envelope import (
+    ATTR_ENCODING,
+    ATTR_VERSION,
+    EnvelopeError,
+    available_codecs,
+    decode_message,
+    encode_message,
+)
+
+
+def email_json(content_size=4096):
+    return json.dumps({
+        'email_subject': 'Test',
+        'email_sender': 'test@example.com',
+        'email_timestream': '1704067200',
+        'email_content': 'Hello team, please see the notes below. ' * (content_size // 40)
+    })
+
+
+class TestEnvelopeDecoding:
+    """Test transparent decoding of envelope codecs"""
+    
+    def test_message_without_attributes_is_plain_json(self):
+        """Test messages from producers without an envelope are read as-is"""
+        body = email_json(100)
+        assert decode_message(body, None) == body
+        assert decode_message(body, {}) == body
+    
+    @pytest.mark.parametrize("codec", available_codecs())
+    def test_round_trip(self, codec):
+        """Test every available codec decodes back to the original JSON"""
+        body = email_json()
+        message = encode_message(body, codec=codec, threshold=0)
+        assert decode_message(message.body, message.attributes) == body
+    
+    def test_gzip_body_is_compressed(self):
+        """Test a gzip envelope is smaller than the original body"""
+        body = email_json()
+        message = encode_message(body, codec='gzip', threshold=0)
+        assert message.attributes[ATTR_ENCODING]['StringValue'] == 'gzip'
+        assert len(message.body) < len(body)
+        assert gzip.decompress(base64.b64decode(message.body)).decode() == body
+    
+    def test_unknown_codec_is_rejected(self):
+        """Test an unsupported codec raises EnvelopeError"""
+        attributes = {ATTR_ENCODING: {'DataType': 'String', 'StringValue': 'brotli'}}
+        with pytest.raises(EnvelopeError):
+            decode_message('abc', attributes)
+    
+    def test_unknown_version_is_rejected(self):
+        """Test a future envelope version raises EnvelopeError"""
+        attributes = {ATTR_VERSION: {'DataType': 'Number', 'StringValue': '2'}}
+        with pytest.raises(EnvelopeError):
+            decode_message('{}', attributes)
+    
+    def test_corrupt_body_is_rejected(self):
+        """Test a body that is not valid for its codec raises EnvelopeError"""
+        attributes = {ATTR_ENCODING: {'DataType': 'String', 'StringValue': 'gzip'}}
+        with pytest.raises(EnvelopeError):
+            decode_message('not base64 !!', attributes)
@@ -0,0 +1,78 @@
+"""
+Unit tests for the consumer heartbeat
+"""
+import os
+import time
+
+from app import heartbeat
+from app.heartbeat import Heartbeat, check
+
+
+def age_file(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class TestHeartbeat:
+    """Test touching and checking the heartbeat file"""
+
+    def test_beat_creates_then_touches_file(self, tmp_path, clock):
+        """Test the first beat creates the file and later beats refresh its mtime"""
+        path = tmp_path / "heartbeat"
+        beat = Heartbeat(str(path), min_interval=1, clock=clock)
+
+        beat.beat()
+        assert path.exists()
+        age_file(path, 60)
+        clock.advance(1)
+        beat.beat()
+        assert check(str(path), max_age=5)[0]
+
+    def test_beats_are_rate_limited(self, tmp_path, clock):
+        """Test beats within min_interval do not touch the file again"""
+        path = tmp_path / "heartbeat"
+        beat = Heartbeat(str(path), min_interval=1, clock=clock)
+        beat.beat()
+        age_file(path, 60)
+
+        clock.advance(0.5)
+        beat.beat()
+        assert not check(str(path), max_age=5)[0]
+
+    def test_check_reports_age(self, tmp_path):
+        """Test an old or missing heartbeat is unhealthy"""
+        path = tmp_path / "heartbeat"
+        assert check(str(path), max_age=5) == (False, None)
+
+        path.touch()
+        age_file(path, 30)
+        healthy, age = check(str(path), max_age=5)
+        assert not healthy
+        assert 29 < age < 31
+        assert check(str(path), max_age=60)[0]
+
+
+class TestHealthCheckCommand:
+    """Test the exit code of python -m app.heartbeat"""
+
+    def test_fresh_heartbeat_passes(self, tmp_path, monkeypatch):
+        """Test a recent heartbeat exits 0"""
+        path = tmp_path / "heartbeat"
+        path.touch()
+        monkeypatch.setenv("HEARTBEAT_FILE", str(path))
+        assert heartbeat.main() == 0
+
+    def test_stale_heartbeat_fails(self, tmp_path, monkeypatch, capsys):
+        """Test a heartbeat older than HEARTBEAT_MAX_AGE exits 1 with the reason"""
+        path = tmp_path / "heartbeat"
+        path.touch()
+        age_file(path, 300)
+        monkeypatch.setenv("HEARTBEAT_FILE", str(path))
+        monkeypatch.setenv("HEARTBEAT_MAX_AGE", "120")
+        assert heartbeat.main() == 1
+        assert "Last heartbeat 300s ago" in capsys.readouterr().err
+
+    def test_unset_file_fails(self, monkeypatch):
+        """Test the check fails when no heartbeat file is configured"""
+        monkeypatch.delenv("HEARTBEAT_FILE", raising=False)
+        assert heartbeat.main() == 1
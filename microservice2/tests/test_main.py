@@ -3,7 +3,10 @@ Unit tests for Microservice 2
 """
 import pytest
 import os
+import gzip
 import json
+import signal
+import threading
 import time
 from unittest.mock import Mock, patch, MagicMock
 from botocore.exceptions import ClientError
@@ -23,7 +26,8 @@ from app.main import (
     generate_s3_key,
     upload_to_s3,
     delete_message,
-    process_message
+    process_message,
+    copy_claim_check_to_s3
 )
 from app import main as app_main
 
@@ -117,6 +121,35 @@ class TestSQSPolling:
         
         messages = receive_messages()
         assert messages == []
+    
+    @patch('app.main.get_sqs_client')
+    def test_successful_poll_beats_heartbeat(self, mock_sqs_client, tmp_path):
+        """Test the heartbeat file is touched by a successful poll, even an empty one"""
+        mock_sqs = Mock()
+        mock_sqs.receive_message.return_value = {}
+        mock_sqs_client.return_value = mock_sqs
+        path = tmp_path / "heartbeat"
+        
+        with patch('app.main.heartbeat', app_main.Heartbeat(str(path))):
+            receive_messages()
+        
+        assert path.exists()
+    
+    @patch('app.main.get_sqs_client')
+    def test_failed_poll_does_not_beat_heartbeat(self, mock_sqs_client, tmp_path):
+        """Test a consumer that cannot reach SQS stops signalling liveness"""
+        mock_sqs = Mock()
+        mock_sqs.receive_message.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied'}},
+            'ReceiveMessage'
+        )
+        mock_sqs_client.return_value = mock_sqs
+        path = tmp_path / "heartbeat"
+        
+        with patch('app.main.heartbeat', app_main.Heartbeat(str(path))):
+            receive_messages()
+        
+        assert not path.exists()
 
 
 class TestMessageParsing:
@@ -154,6 +187,30 @@ class TestMessageParsing:
         result = parse_message_body(message_body)
         assert result is None
     
+    def test_parse_message_body_claim_check(self):
+        """Test parsing a claim-check pointer message without email_content"""
+        message_body = json.dumps({
+            'email_subject': 'Large email',
+            'email_sender': 'sender@example.com',
+            'email_timestream': '1234567890',
+            'claim_check': {'bucket': 'test-bucket', 'key': 'claim-checks/abc.json', 'size': 300000}
+        })
+        
+        result = parse_message_body(message_body)
+        assert result is not None
+        assert result['claim_check']['key'] == 'claim-checks/abc.json'
+    
+    def test_parse_message_body_invalid_claim_check(self):
+        """Test a claim-check message without a key is rejected"""
+        message_body = json.dumps({
+            'email_subject': 'Large email',
+            'email_sender': 'sender@example.com',
+            'email_timestream': '1234567890',
+            'claim_check': {'bucket': 'test-bucket'}
+        })
+        
+        assert parse_message_body(message_body) is None
+    
     def test_parse_message_body_empty(self):
         """Test parsing empty message body"""
         result = parse_message_body("")
@@ -227,6 +284,34 @@ class TestS3Upload:
         assert result is True
         mock_s3.put_object.assert_called_once()
     
+    @patch('app.main.get_s3_client')
+    def test_upload_to_s3_writes_compact_json(self, mock_s3_client):
+        """Test uploaded objects are compact JSON"""
+        mock_s3 = Mock()
+        mock_s3_client.return_value = mock_s3
+        
+        email_data = {
+            'email_subject': 'Test',
+            'email_sender': 'test@example.com',
+            'email_timestream': '1234567890',
+            'email_content': 'Test content'
+        }
+        
+        assert upload_to_s3(email_data, 'emails/test-key.json') is True
+        body = mock_s3.put_object.call_args.kwargs['Body']
+        assert json.loads(body) == email_data
+        assert b'\n' not in body and b', ' not in body
+    
+    @patch('app.main.get_s3_client')
+    def test_upload_to_s3_passes_body_through(self, mock_s3_client):
+        """Test an already serialised body is uploaded without re-serialising"""
+        mock_s3 = Mock()
+        mock_s3_client.return_value = mock_s3
+        
+        raw = b'{"email_subject":"Test","email_sender":"a@b.c","email_timestream":"1","email_content":"x"}'
+        assert upload_to_s3({}, 'emails/test-key.json', body=raw) is True
+        assert mock_s3.put_object.call_args.kwargs['Body'] is raw
+    
     @patch('app.main.get_s3_client')
     def test_upload_to_s3_retry_on_error(self, mock_s3_client):
         """Test S3 upload retry on retryable error"""
@@ -271,6 +356,36 @@ class TestS3Upload:
         assert result is False
 
 
+class TestClaimCheckCopy:
+    """Test server-side copy of claim-check bodies"""
+    
+    @patch('app.main.get_s3_client')
+    def test_copy_claim_check_success(self, mock_s3_client):
+        """Test the body is copied from the claim-check key to the final key"""
+        mock_s3 = Mock()
+        mock_s3_client.return_value = mock_s3
+        
+        pointer = {'bucket': 'source-bucket', 'key': 'claim-checks/abc.json'}
+        result = copy_claim_check_to_s3(pointer, 'emails/2024/01/01/key.json')
+        
+        assert result is True
+        kwargs = mock_s3.copy_object.call_args.kwargs
+        assert kwargs['CopySource'] == {'Bucket': 'source-bucket', 'Key': 'claim-checks/abc.json'}
+        assert kwargs['Key'] == 'emails/2024/01/01/key.json'
+        mock_s3.put_object.assert_not_called()
+    
+    @patch('app.main.get_s3_client')
+    def test_copy_claim_check_missing_source(self, mock_s3_client):
+        """Test a missing claim-check object fails without retrying"""
+        mock_s3 = Mock()
+        mock_s3.copy_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'CopyObject')
+        mock_s3_client.return_value = mock_s3
+        
+        pointer = {'bucket': 'source-bucket', 'key': 'claim-checks/missing.json'}
+        assert copy_claim_check_to_s3(pointer, 'emails/key.json') is False
+        assert mock_s3.copy_object.call_count == 1
+
+
 class TestMessageDeletion:
     """Test SQS message deletion"""
     
@@ -298,6 +413,39 @@ class TestMessageDeletion:
         result = delete_message('invalid-receipt-handle')
         assert result is False
 
+    @patch('app.main.get_sqs_client')
+    def test_delete_message_batch(self, mock_sqs_client):
+        """Test a batch of entries is deleted with one DeleteMessageBatch call"""
+        mock_sqs = Mock()
+        mock_sqs.delete_message_batch.return_value = {'Successful': [{'Id': '0'}, {'Id': '1'}], 'Failed': []}
+        mock_sqs_client.return_value = mock_sqs
+        entries = [{'Id': '0', 'ReceiptHandle': 'r-0'}, {'Id': '1', 'ReceiptHandle': 'r-1'}]
+        
+        response = app_main.delete_message_batch(entries)
+        assert len(response['Successful']) == 2
+        mock_sqs.delete_message_batch.assert_called_once_with(QueueUrl=app_main.SQS_QUEUE_URL, Entries=entries)
+    
+    @patch('app.main.delete_message')
+    def test_acknowledge_queues_on_acker(self, mock_delete):
+        """Test acknowledge hands the receipt handle to the acker while it runs"""
+        acker = Mock()
+        acker.ack.return_value = True
+        with patch('app.main.acker', acker):
+            assert app_main.acknowledge('receipt-handle-1') is True
+        acker.ack.assert_called_once_with('receipt-handle-1')
+        mock_delete.assert_not_called()
+    
+    @patch('app.main.delete_message', return_value=True)
+    def test_acknowledge_deletes_without_acker(self, mock_delete):
+        """Test acknowledge deletes right away without an acker, or once it is closed"""
+        assert app_main.acknowledge('receipt-handle-1') is True
+        
+        closed = Mock()
+        closed.ack.return_value = False
+        with patch('app.main.acker', closed):
+            assert app_main.acknowledge('receipt-handle-2') is True
+        assert [c.args[0] for c in mock_delete.call_args_list] == ['receipt-handle-1', 'receipt-handle-2']
+
 
 class TestMessageProcessing:
     """Test complete message processing"""
@@ -329,6 +477,83 @@ class TestMessageProcessing:
         mock_upload.assert_called_once()
         mock_delete.assert_called_once()
     
+    @patch('app.main.copy_claim_check_to_s3')
+    @patch('app.main.upload_to_s3')
+    @patch('app.main.delete_message')
+    def test_process_message_claim_check(self, mock_delete, mock_upload, mock_copy):
+        """Test claim-check messages are copied instead of uploaded"""
+        mock_copy.return_value = True
+        mock_delete.return_value = True
+        
+        message = {
+            'MessageId': 'msg-1',
+            'Body': json.dumps({
+                'email_subject': 'Large email',
+                'email_sender': 'sender@example.com',
+                'email_timestream': '1704067200',
+                'claim_check': {'bucket': 'test-bucket', 'key': 'claim-checks/abc.json'}
+            }),
+            'ReceiptHandle': 'receipt-handle-1'
+        }
+        
+        result = process_message(message)
+        assert result is True
+        mock_copy.assert_called_once()
+        assert mock_copy.call_args.args[1].startswith('emails/2024/01/01/')
+        mock_upload.assert_not_called()
+        mock_delete.assert_called_once()
+    
+    @patch('app.main.upload_to_s3')
+    @patch('app.main.delete_message')
+    def test_process_message_compressed_envelope(self, mock_delete, mock_upload):
+        """Test gzip envelopes are decoded before parsing"""
+        from app.envelope import encode_message
+        email_data = {
+            'email_subject': 'Test',
+            'email_sender': 'test@example.com',
+            'email_timestream': '1704067200',
+            'email_content': 'Compressible content ' * 200
+        }
+        encoded = encode_message(json.dumps(email_data), codec='gzip', threshold=0)
+        mock_upload.return_value = True
+        mock_delete.return_value = True
+        
+        message = {
+            'MessageId': 'msg-1',
+            'Body': encoded.body,
+            'MessageAttributes': encoded.attributes,
+            'ReceiptHandle': 'receipt-handle-1'
+        }
+        
+        assert process_message(message) is True
+        assert mock_upload.call_args.args[0] == email_data
+    
+    @patch('app.main.delete_message')
+    def test_process_message_undecodable_envelope(self, mock_delete):
+        """Test messages with an unsupported codec stay in the queue"""
+        message = {
+            'MessageId': 'msg-1',
+            'Body': 'abc',
+            'MessageAttributes': {'ContentEncoding': {'DataType': 'String', 'StringValue': 'brotli'}},
+            'ReceiptHandle': 'receipt-handle-1'
+        }
+        
+        assert process_message(message) is False
+        mock_delete.assert_not_called()
+    
+    @patch('app.main.upload_to_s3')
+    @patch('app.main.delete_message')
+    def test_process_message_forwards_body(self, mock_delete, mock_upload):
+        """Test the decoded SQS body is uploaded byte-for-byte"""
+        raw = '{"email_subject":"Test","email_sender":"a@b.c","email_timestream":"1704067200","email_content":"x"}'
+        mock_upload.return_value = True
+        mock_delete.return_value = True
+        
+        message = {'MessageId': 'msg-1', 'Body': raw, 'ReceiptHandle': 'receipt-handle-1'}
+        
+        assert process_message(message) is True
+        assert mock_upload.call_args.kwargs['body'] == raw.encode('utf-8')
+    
     @patch('app.main.parse_message_body')
     @patch('app.main.delete_message')
     def test_process_message_invalid_format(self, mock_delete, mock_parse):
@@ -369,3 +594,483 @@ class TestMessageProcessing:
         assert result is False
         # Message should NOT be deleted if upload fails
 
+
+
+def email_message(index):
+    return {
+        'MessageId': f'msg-{index}',
+        'ReceiptHandle': f'receipt-handle-{index}',
+        'Body': json.dumps({
+            'email_subject': f'Test {index}',
+            'email_sender': 'test@example.com',
+            'email_timestream': '1234567890',
+            'email_content': 'Test content'
+        })
+    }
+
+
+class SlowS3:
+    """Thread-safe S3/SQS stand-in with per-call latency; uploads of listed subjects fail"""
+    
+    def __init__(self, latency=0.0, failing_subjects=()):
+        self.latency = latency
+        self.failing_subjects = set(failing_subjects)
+        self.lock = threading.Lock()
+        self.uploaded = []
+        self.deleted = []
+        self.delete_calls = 0
+        self.active = 0
+        self.max_active = 0
+    
+    def put_object(self, Body, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        subject = json.loads(Body)['email_subject']
+        if subject in self.failing_subjects:
+            raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'PutObject')
+        with self.lock:
+            self.uploaded.append(subject)
+        return {}
+    
+    def delete_message(self, ReceiptHandle, **kwargs):
+        with self.lock:
+            self.deleted.append(ReceiptHandle)
+            self.delete_calls += 1
+        return {}
+    
+    def delete_message_batch(self, Entries, **kwargs):
+        with self.lock:
+            self.deleted.extend(entry['ReceiptHandle'] for entry in Entries)
+            self.delete_calls += 1
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+
+class TestBatchProcessing:
+    """Test messages of a batch are processed in parallel with per-message isolation"""
+    
+    @pytest.fixture
+    def slow_aws(self):
+        aws = SlowS3(latency=0.05)
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws):
+            yield aws
+    
+    def test_batch_is_processed_in_parallel(self, slow_aws):
+        """Test ten messages take about one S3 round trip instead of ten"""
+        start = time.perf_counter()
+        results = app_main.process_batch([email_message(i) for i in range(10)])
+        elapsed = time.perf_counter() - start
+        
+        assert results == [True] * 10
+        assert slow_aws.max_active > 1
+        assert elapsed < 5 * slow_aws.latency
+        assert sorted(slow_aws.deleted) == sorted(f'receipt-handle-{i}' for i in range(10))
+    
+    def test_worker_count_bounds_concurrency(self, slow_aws):
+        """Test no more than PROCESSING_WORKERS uploads run at once"""
+        with patch('app.main.PROCESSING_WORKERS', 3), patch('app.main.processing_executor', None):
+            results = app_main.process_batch([email_message(i) for i in range(10)])
+            app_main.processing_executor.shutdown()
+        
+        assert results == [True] * 10
+        assert slow_aws.max_active <= 3
+    
+    def test_single_worker_is_sequential(self, slow_aws):
+        """Test PROCESSING_WORKERS=1 keeps the one-at-a-time behaviour"""
+        with patch('app.main.PROCESSING_WORKERS', 1):
+            app_main.process_batch([email_message(i) for i in range(3)])
+        assert slow_aws.max_active == 1
+    
+    def test_failed_upload_is_not_deleted(self, slow_aws):
+        """Test a failed upload leaves only that message in the queue"""
+        slow_aws.failing_subjects = {'Test 3'}
+        results = app_main.process_batch([email_message(i) for i in range(5)])
+        
+        assert results == [True, True, True, False, True]
+        assert 'receipt-handle-3' not in slow_aws.deleted
+        assert len(slow_aws.deleted) == 4
+    
+    def test_unexpected_error_is_isolated(self, slow_aws):
+        """Test an exception while processing one message does not stop the others"""
+        original = app_main.process_message
+        
+        def flaky(message):
+            if message['MessageId'] == 'msg-1':
+                raise RuntimeError("boom")
+            return original(message)
+        
+        with patch('app.main.process_message', side_effect=flaky):
+            results = app_main.process_batch([email_message(i) for i in range(4)])
+        
+        assert results == [True, False, True, True]
+        assert 'receipt-handle-1' not in slow_aws.deleted
+
+
+class TestAsyncConsumerMode:
+    """Test CONSUMER_MODE=async runs the receive -> process pipeline of the sync loop"""
+    
+    def test_async_mode_uploads_and_deletes_then_stops_on_sigterm(self):
+        """Test every queued email is uploaded and deleted and SIGTERM drains and returns"""
+        aws = SlowS3(latency=0.01)
+        pending = [email_message(i) for i in range(25)]
+        lock = threading.Lock()
+        
+        def receive_message(**kwargs):
+            with lock:
+                batch = pending[:kwargs['MaxNumberOfMessages']]
+                del pending[:len(batch)]
+            if not batch:
+                os.kill(os.getpid(), signal.SIGTERM)
+                time.sleep(0.01)
+            return {'Messages': batch}
+        
+        aws.receive_message = receive_message
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.init_aws_clients'), \
+             patch('app.main.CONSUMER_MODE', 'async'), \
+             patch('app.main.SQS_RECEIVERS', 3), \
+             patch('app.main.SQS_POLL_INTERVAL', 0):
+            app_main.main()
+        
+        assert sorted(aws.uploaded) == sorted(f'Test {i}' for i in range(25))
+        assert len(aws.deleted) == 25
+
+
+class TestAdaptivePolling:
+    """Test the sync loop polls back-to-back while draining and backs off only on errors"""
+
+    def run_main(self, aws):
+        """Run main() against the stand-in until it raises KeyboardInterrupt; returns the shutdown event mock"""
+        shutdown = Mock()  # record the delays without waiting them out
+        shutdown.is_set.return_value = False
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.init_aws_clients'), \
+             patch('app.main.processing_executor', None), \
+             patch('app.main.shutdown_requested', shutdown):
+            app_main.main()
+        return shutdown
+
+    def test_backlog_drains_at_the_rate_s3_allows(self):
+        """Test a 10k-message backlog drains without sleeping, bounded only by S3 latency"""
+        aws = SlowS3(latency=0.002)
+        pending = [email_message(i) for i in range(10_000)]
+        polls = []
+
+        def receive_message(**kwargs):
+            batch = pending[:kwargs['MaxNumberOfMessages']]
+            del pending[:len(batch)]
+            polls.append(len(batch))
+            if not batch:
+                raise KeyboardInterrupt
+            return {'Messages': batch}
+
+        aws.receive_message = receive_message
+        start = time.perf_counter()
+        shutdown = self.run_main(aws)
+        elapsed = time.perf_counter() - start
+
+        assert sorted(aws.deleted) == sorted(f'receipt-handle-{i}' for i in range(10_000))
+        assert len(polls) == 1001
+        # Deletes go out in batches: about 2 SQS calls per 10 messages instead of 11
+        assert aws.delete_calls <= 1100
+        assert app_main.acker is None
+        shutdown.wait.assert_not_called()
+        # 1000 batches of 10 parallel uploads: about one S3 round trip per batch
+        s3_bound = 1000 * aws.latency
+        assert elapsed < 4 * s3_bound
+
+    def test_errors_back_off_exponentially_then_resume(self):
+        """Test failed polls sleep 1s, 2s, 4s and a successful poll drains without sleeping"""
+        aws = SlowS3()
+        outcomes = ['error', 'error', 'error', [email_message(0)], [email_message(1)]]
+
+        def receive_message(**kwargs):
+            if not outcomes:
+                raise KeyboardInterrupt
+            outcome = outcomes.pop(0)
+            if outcome == 'error':
+                raise ClientError({'Error': {'Code': 'ServiceUnavailable', 'Message': 'down'}}, 'ReceiveMessage')
+            return {'Messages': outcome}
+
+        aws.receive_message = receive_message
+        with patch('app.main.SQS_ERROR_BACKOFF_BASE', 1), patch('app.main.SQS_ERROR_BACKOFF_MAX', 60):
+            shutdown = self.run_main(aws)
+
+        assert [c.args[0] for c in shutdown.wait.call_args_list] == [1, 2, 4]
+        assert len(aws.deleted) == 2
+
+    def test_empty_queue_relies_on_long_polling(self):
+        """Test an empty poll does not sleep while long polling is on, and sleeps the interval otherwise"""
+        aws = SlowS3()
+        polls = []
+
+        def receive_message(**kwargs):
+            polls.append(kwargs['WaitTimeSeconds'])
+            if len(polls) > 3:
+                raise KeyboardInterrupt
+            return {'Messages': []}
+
+        aws.receive_message = receive_message
+        with patch('app.main.SQS_WAIT_TIME', 20), patch('app.main.SQS_POLL_INTERVAL', 5):
+            shutdown = self.run_main(aws)
+        shutdown.wait.assert_not_called()
+        assert polls[0] == 20
+
+        polls.clear()
+        with patch('app.main.SQS_WAIT_TIME', 0), patch('app.main.SQS_POLL_INTERVAL', 5):
+            shutdown = self.run_main(aws)
+        assert [c.args[0] for c in shutdown.wait.call_args_list] == [5, 5, 5]
+
+
+class TestSyncShutdown:
+    """Test SIGTERM ends the sync loop through the same flush as KeyboardInterrupt"""
+    
+    def test_sigterm_finishes_the_batch_and_flushes_queued_deletes(self):
+        """Test a SIGTERM during a poll processes that batch, sends the queued deletes and restores the handler"""
+        aws = SlowS3()
+        polls = []
+        
+        def receive_message(**kwargs):
+            polls.append(kwargs)
+            os.kill(os.getpid(), signal.SIGTERM)
+            return {'Messages': [email_message(i) for i in range(10)]}
+        
+        aws.receive_message = receive_message
+        previous = signal.getsignal(signal.SIGTERM)
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.init_aws_clients'), \
+             patch('app.main.processing_executor', None), \
+             patch('app.main.SQS_DELETE_BATCHING', True), \
+             patch('app.main.SQS_DELETE_BATCH_MAX_DELAY_MS', 60_000):
+            app_main.main()
+        
+        assert len(polls) == 1
+        assert sorted(aws.uploaded) == sorted(f'Test {i}' for i in range(10))
+        # Held back by the 60s batching delay, so only the shutdown flush could have sent them
+        assert sorted(aws.deleted) == sorted(f'receipt-handle-{i}' for i in range(10))
+        assert app_main.acker is None
+        assert signal.getsignal(signal.SIGTERM) == previous
+
+
+class AggregatingAWS(SlowS3):
+    """SQS/S3 stand-in holding a backlog; stores put objects by key and records copies"""
+    
+    def __init__(self, messages):
+        super().__init__()
+        self.pending = list(messages)
+        self.objects = {}
+        self.copied = []
+    
+    def receive_message(self, MaxNumberOfMessages=10, **kwargs):
+        batch = self.pending[:MaxNumberOfMessages]
+        del self.pending[:len(batch)]
+        if not batch:
+            raise KeyboardInterrupt
+        return {'Messages': batch}
+    
+    def put_object(self, Key, Body, **kwargs):
+        with self.lock:
+            self.objects[Key] = (Body, kwargs)
+        return {}
+    
+    def copy_object(self, Key, **kwargs):
+        with self.lock:
+            self.copied.append(Key)
+        return {}
+    
+    def get_queue_attributes(self, **kwargs):
+        return {'Attributes': {'VisibilityTimeout': '30'}}
+
+
+class TestAggregation:
+    """Test S3_AGGREGATION_ENABLED packs emails into gzip NDJSON objects and defers deletes"""
+    
+    def test_backlog_is_packed_per_day(self):
+        """Test every email lands in its day's object, at the offset its manifest gives, and is then deleted"""
+        messages = [email_message(i) for i in range(250)]
+        for i, message in enumerate(messages):
+            body = json.loads(message['Body'])
+            body['email_timestream'] = str(1700000000 + (i % 2) * 86400)
+            message['Body'] = json.dumps(body)
+        aws = AggregatingAWS(messages)
+        
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.init_aws_clients'), \
+             patch('app.main.processing_executor', None), \
+             patch('app.main.S3_AGGREGATION_ENABLED', True):
+            app_main.main()
+        
+        manifests = [json.loads(body) for key, (body, _) in aws.objects.items() if key.endswith('.manifest.json')]
+        assert len(manifests) == 2
+        assert len(aws.objects) == 4  # one object and one manifest per day, instead of 250 objects
+        stored = {}
+        for manifest in manifests:
+            body, kwargs = aws.objects[manifest['object']]
+            assert kwargs['ContentEncoding'] == 'gzip'
+            ndjson = gzip.decompress(body)
+            for entry in manifest['emails']:
+                stored[entry['message_id']] = json.loads(ndjson[entry['offset']:entry['offset'] + entry['length']])
+        assert sorted(stored) == sorted(f'msg-{i}' for i in range(250))
+        assert stored['msg-7']['email_subject'] == 'Test 7'
+        assert len(aws.deleted) == 250
+        assert app_main.aggregator is None
+    
+    def test_delete_waits_for_aggregate_object(self):
+        """Test a buffered message is only deleted after its object has been written"""
+        aws = AggregatingAWS([])
+        aggregator = app_main.EmailAggregator(app_main.put_aggregate, app_main.acknowledge, max_age=60)
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.aggregator', aggregator):
+            assert process_message(email_message(0)) is True
+            assert aws.deleted == []
+            assert aws.objects == {}
+            
+            aggregator.flush()
+        
+        assert aws.deleted == ['receipt-handle-0']
+        assert len(aws.objects) == 2
+    
+    def test_sigterm_writes_buffered_emails_before_exiting(self):
+        """Test SIGTERM in the sync loop writes the partly filled object and then deletes its messages"""
+        aws = AggregatingAWS([email_message(i) for i in range(5)])
+        receive = aws.receive_message
+        
+        def receive_then_stop(**kwargs):
+            os.kill(os.getpid(), signal.SIGTERM)
+            return receive(**kwargs)
+        
+        aws.receive_message = receive_then_stop
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.init_aws_clients'), \
+             patch('app.main.processing_executor', None), \
+             patch('app.main.S3_AGGREGATION_ENABLED', True), \
+             patch('app.main.S3_AGGREGATE_MAX_AGE', 60):
+            app_main.main()
+        
+        manifests = [json.loads(body) for key, (body, _) in aws.objects.items() if key.endswith('.manifest.json')]
+        assert len(manifests) == 1
+        assert sorted(entry['message_id'] for entry in manifests[0]['emails']) == sorted(f'msg-{i}' for i in range(5))
+        assert sorted(aws.deleted) == sorted(f'receipt-handle-{i}' for i in range(5))
+        assert app_main.aggregator is None
+    
+    def test_claim_check_is_still_copied(self):
+        """Test claim-check messages keep the server-side copy to their own key"""
+        message = email_message(0)
+        body = json.loads(message['Body'])
+        del body['email_content']
+        body['claim_check'] = {'bucket': 'test-bucket', 'key': 'claim-checks/abc.json', 'size': 300000}
+        message['Body'] = json.dumps(body)
+        aws = AggregatingAWS([])
+        aggregator = Mock()
+        with patch('app.main.get_s3_client', return_value=aws), \
+             patch('app.main.get_sqs_client', return_value=aws), \
+             patch('app.main.aggregator', aggregator):
+            assert process_message(message) is True
+        
+        aggregator.add.assert_not_called()
+        assert len(aws.copied) == 1
+        assert aws.deleted == ['receipt-handle-0']
+
+
+class FakeAWSClient:
+    """Client whose construction and first call are slow, like a cold boto3 client (TLS handshake)"""
+    
+    CONNECT_DELAY = 0.2
+    
+    def __init__(self, service_name):
+        time.sleep(self.CONNECT_DELAY)
+        self.service_name = service_name
+        self.connected = False
+    
+    def _call(self, result=None):
+        if not self.connected:
+            time.sleep(self.CONNECT_DELAY)
+            self.connected = True
+        return result or {}
+    
+    def get_queue_attributes(self, **kwargs):
+        return self._call()
+    
+    def get_bucket_location(self, **kwargs):
+        return self._call()
+    
+    def put_object(self, **kwargs):
+        return self._call()
+    
+    def delete_message(self, **kwargs):
+        return self._call()
+
+
+class TestClientInitialisation:
+    """Test clients are built and warmed before polling starts"""
+    
+    @pytest.fixture
+    def fake_clients(self):
+        created = []
+        
+        def create(service_name):
+            created.append(service_name)
+            return FakeAWSClient(service_name)
+        
+        with patch('app.main._create_client', side_effect=create), \
+             patch('app.main.sqs_client', None), \
+             patch('app.main.s3_client', None):
+            yield created
+    
+    @staticmethod
+    def message():
+        return {
+            'MessageId': 'msg-1',
+            'ReceiptHandle': 'receipt-handle-1',
+            'Body': json.dumps({
+                'email_subject': 'Test',
+                'email_sender': 'test@example.com',
+                'email_timestream': '1234567890',
+                'email_content': 'Test content'
+            })
+        }
+    
+    def test_first_message_pays_for_cold_clients(self, fake_clients):
+        """Test the baseline: lazily created clients make the first message slow"""
+        start = time.perf_counter()
+        assert process_message(self.message()) is True
+        assert time.perf_counter() - start >= 4 * FakeAWSClient.CONNECT_DELAY
+    
+    def test_init_removes_first_message_penalty(self, fake_clients):
+        """Test that after init the first message creates no client and opens no connection"""
+        app_main.init_aws_clients()
+        assert sorted(fake_clients) == ["s3", "sqs"]
+        assert app_main.sqs_client.connected and app_main.s3_client.connected
+        
+        start = time.perf_counter()
+        assert process_message(self.message()) is True
+        assert time.perf_counter() - start < FakeAWSClient.CONNECT_DELAY
+        assert sorted(fake_clients) == ["s3", "sqs"]
+    
+    def test_warm_up_errors_are_not_fatal(self):
+        """Test a denied warm-up call does not stop the consumer from starting"""
+        sqs, s3 = Mock(), Mock()
+        sqs.get_queue_attributes.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'GetQueueAttributes'
+        )
+        s3.get_bucket_location.side_effect = Exception("network down")
+        with patch('app.main.get_sqs_client', return_value=sqs), \
+             patch('app.main.get_s3_client', return_value=s3):
+            app_main.init_aws_clients()
+        sqs.get_queue_attributes.assert_called_once()
+    
+    def test_read_timeout_exceeds_long_poll(self):
+        """Test the default read timeout leaves room for the long-poll wait"""
+        config = app_main._client_config()
+        assert config.read_timeout > app_main.SQS_WAIT_TIME
+        assert config.retries == {"mode": app_main.AWS_RETRY_MODE, "max_attempts": app_main.AWS_MAX_ATTEMPTS}
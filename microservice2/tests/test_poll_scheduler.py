@@ -0,0 +1,72 @@
+"""
+Unit tests for the adaptive poll scheduler
+"""
+from app.poll_scheduler import MODE_BACKOFF, MODE_DRAIN, MODE_IDLE, PollScheduler
+
+
+class TestPollScheduler:
+    """Test the delay and mode chosen after each poll"""
+
+    def test_messages_poll_again_immediately(self):
+        """Test a poll that returned messages is followed by no delay"""
+        scheduler = PollScheduler(idle_delay=5)
+        assert scheduler.record(10) == 0
+        assert scheduler.record(3) == 0
+        assert scheduler.mode == MODE_DRAIN
+
+    def test_empty_poll_waits_idle_delay(self):
+        """Test an empty poll waits idle_delay (0 when long polling does the waiting)"""
+        assert PollScheduler(idle_delay=0).record(0) == 0
+        scheduler = PollScheduler(idle_delay=5)
+        assert scheduler.record(0) == 5
+        assert scheduler.mode == MODE_IDLE
+
+    def test_errors_back_off_exponentially_up_to_max(self):
+        """Test consecutive errors double the delay and stop at backoff_max"""
+        scheduler = PollScheduler(backoff_base=1, backoff_max=5)
+        delays = [scheduler.record(error=True) for _ in range(5)]
+        assert delays == [1, 2, 4, 5, 5]
+        assert scheduler.mode == MODE_BACKOFF
+        assert scheduler.consecutive_errors == 5
+
+    def test_long_outage_does_not_overflow(self):
+        """Test thousands of consecutive errors keep returning backoff_max"""
+        scheduler = PollScheduler(backoff_base=1, backoff_max=60)
+        for _ in range(2000):
+            delay = scheduler.record(error=True)
+        assert delay == 60
+
+    def test_success_resets_backoff(self):
+        """Test a successful poll resets the backoff to its base"""
+        scheduler = PollScheduler(backoff_base=1)
+        scheduler.record(error=True)
+        scheduler.record(error=True)
+        assert scheduler.record(0) == 0
+        assert scheduler.consecutive_errors == 0
+        assert scheduler.record(error=True) == 1
+
+    def test_status_reports_mode_and_rates(self, clock):
+        """Test status reports the current mode and poll/message rates over the window"""
+        scheduler = PollScheduler(window=10, clock=clock)
+        for _ in range(20):
+            scheduler.record(10)
+            clock.advance(0.5)
+        status = scheduler.status()
+        assert status["mode"] == MODE_DRAIN
+        assert status["polls_per_second"] == 2.0
+        assert status["messages_per_second"] == 20.0
+
+    def test_status_forgets_polls_outside_window(self, clock):
+        """Test polls older than the window no longer count towards the rates"""
+        scheduler = PollScheduler(window=10, clock=clock)
+        scheduler.record(10)
+        clock.advance(30)
+        assert scheduler.status()["polls_per_second"] == 0
+
+    def test_report_due_once_per_interval(self, clock):
+        """Test report_due is true once per report_interval"""
+        scheduler = PollScheduler(report_interval=60, clock=clock)
+        assert not scheduler.report_due()
+        clock.advance(61)
+        assert scheduler.report_due()
+        assert not scheduler.report_due()
@@ -28,7 +28,7 @@ resource "aws_lb_target_group" "microservice1" {
     unhealthy_threshold = 2
     timeout             = 5
     interval            = 30
-    path                = "/health"
+    path                = "/ready"
     protocol            = "HTTP"
     matcher             = "200"
   }
@@ -0,0 +1,55 @@
+# Durable storage for the microservice 1 spool (SPOOL_DIR). Fargate task storage
+# is discarded when a task stops, which would lose messages already answered
+# 200; on EFS the segments outlive the task and are replayed by the others.
+resource "aws_efs_file_system" "spool" {
+  creation_token = "${var.project_name}-ms1-spool-${var.environment}"
+  encrypted      = true
+
+  tags = {
+    Name        = "${var.project_name}-ms1-spool"
+    Description = "Spool of messages accepted by microservice 1 while SQS is unavailable"
+  }
+}
+
+resource "aws_security_group" "spool" {
+  name        = "${var.project_name}-spool-sg-${var.environment}"
+  description = "Security group for the microservice 1 spool file system"
+  vpc_id      = var.vpc_id
+
+  ingress {
+    description     = "NFS from microservice 1"
+    from_port       = 2049
+    to_port         = 2049
+    protocol        = "tcp"
+    security_groups = [aws_security_group.microservice1.id]
+  }
+
+  tags = {
+    Name        = "${var.project_name}-spool-sg"
+    Description = "Security group for the spool file system"
+  }
+}
+
+resource "aws_efs_mount_target" "spool" {
+  count           = length(var.private_subnet_ids)
+  file_system_id  = aws_efs_file_system.spool.id
+  subnet_id       = var.private_subnet_ids[count.index]
+  security_groups = [aws_security_group.spool.id]
+}
+
+resource "aws_efs_access_point" "spool" {
+  file_system_id = aws_efs_file_system.spool.id
+
+  root_directory {
+    path = "/microservice1-spool"
+    creation_info {
+      owner_uid   = 0
+      owner_gid   = 0
+      permissions = "0750"
+    }
+  }
+
+  tags = {
+    Name = "${var.project_name}-ms1-spool-ap"
+  }
+}
@@ -37,7 +37,8 @@ resource "aws_ecs_service" "microservice1" {
 
   depends_on = [
     aws_lb_listener.main,
-    aws_cloudwatch_log_group.microservice1
+    aws_cloudwatch_log_group.microservice1,
+    aws_efs_mount_target.spool
   ]
 
   tags = {
@@ -7,11 +7,37 @@ resource "aws_ecs_task_definition" "microservice1" {
   execution_role_arn       = var.ecs_task_execution_role_arn
   task_role_arn            = var.microservice1_task_role_arn
 
+  # The spool must survive the task: see efs.tf
+  volume {
+    name = "spool"
+
+    efs_volume_configuration {
+      file_system_id     = aws_efs_file_system.spool.id
+      transit_encryption = "ENABLED"
+
+      authorization_config {
+        access_point_id = aws_efs_access_point.spool.id
+      }
+    }
+  }
+
   container_definitions = jsonencode([
     {
       name  = "microservice1"
       image = "${aws_ecr_repository.microservice1.repository_url}:latest"
 
+      mountPoints = [
+        {
+          sourceVolume  = "spool"
+          containerPath = "/var/spool/microservice1"
+          readOnly      = false
+        }
+      ]
+
+      # Above GUNICORN_GRACEFUL_TIMEOUT (30s), so workers finish the final spool
+      # drain before ECS sends SIGKILL
+      stopTimeout = 45
+
       portMappings = [
         {
           containerPort = 8000
@@ -19,7 +45,7 @@ resource "aws_ecs_task_definition" "microservice1" {
         }
       ]
 
-      environment = [
+      environment = concat([
         {
           name  = "SQS_QUEUE_URL"
           value = var.sqs_queue_url
@@ -28,11 +54,32 @@ resource "aws_ecs_task_definition" "microservice1" {
           name  = "SSM_TOKEN_PARAMETER"
           value = var.ssm_token_parameter_name
         },
+        {
+          # Compress only once every microservice 2 task decodes the codec
+          name  = "ENVELOPE_CODEC"
+          value = var.envelope_codec
+        },
+        {
+          # Messages accepted while SQS is unavailable are spooled here (EFS) and replayed
+          name  = "SPOOL_DIR"
+          value = "/var/spool/microservice1"
+        },
+        {
+          # One worker process per vCPU
+          name  = "WEB_CONCURRENCY"
+          value = tostring(max(1, floor(var.microservice1_cpu / 1024)))
+        },
         {
           name  = "AWS_REGION"
           value = var.aws_region
         }
-      ]
+        ], var.claim_check_enabled ? [
+        {
+          # Only once every microservice 2 task resolves claim-check pointers
+          name  = "CLAIM_CHECK_BUCKET"
+          value = var.s3_bucket_name
+        }
+      ] : [])
 
       logConfiguration = {
         logDriver = "awslogs"
@@ -82,6 +129,11 @@ resource "aws_ecs_task_definition" "microservice2" {
           name  = "S3_BUCKET_NAME"
           value = var.s3_bucket_name
         },
+        {
+          # Touched after every successful poll, checked by the health check below
+          name  = "HEARTBEAT_FILE"
+          value = "/tmp/microservice2.heartbeat"
+        },
         {
           name  = "AWS_REGION"
           value = var.aws_region
@@ -96,6 +148,14 @@ resource "aws_ecs_task_definition" "microservice2" {
           "awslogs-stream-prefix" = "ecs"
         }
       }
+
+      healthCheck = {
+        command     = ["CMD-SHELL", "python -m app.heartbeat || exit 1"]
+        interval    = 30
+        timeout     = 5
+        retries     = 3
+        startPeriod = 60
+      }
     }
   ])
 
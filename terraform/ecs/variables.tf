@@ -59,6 +59,18 @@ variable "ssm_token_parameter_name" {
   type        = string
 }
 
+variable "envelope_codec" {
+  description = "Codec for SQS message bodies (identity, gzip or zstd)"
+  type        = string
+  default     = "identity"
+}
+
+variable "claim_check_enabled" {
+  description = "Offload oversized emails from microservice 1 to S3 (claim check)"
+  type        = bool
+  default     = false
+}
+
 variable "microservice1_cpu" {
   description = "CPU units for microservice 1 (1024 = 1 vCPU)"
   type        = number
@@ -20,7 +20,7 @@ resource "aws_iam_role" "microservice1_task_role" {
   }
 }
 
-# IAM Policy for Microservice 1 - Access to SQS and SSM
+# IAM Policy for Microservice 1 - Access to SQS, SSM and S3 claim checks
 resource "aws_iam_role_policy" "microservice1_policy" {
   name = "${var.project_name}-ms1-policy-${var.environment}"
   role = aws_iam_role.microservice1_task_role.id
@@ -32,7 +32,8 @@ resource "aws_iam_role_policy" "microservice1_policy" {
         Effect = "Allow"
         Action = [
           "sqs:SendMessage",
-          "sqs:GetQueueUrl"
+          "sqs:GetQueueUrl",
+          "sqs:GetQueueAttributes"
         ]
         Resource = var.sqs_queue_arn
       },
@@ -43,6 +44,21 @@ resource "aws_iam_role_policy" "microservice1_policy" {
           "ssm:GetParameters"
         ]
         Resource = var.ssm_token_parameter_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = "${var.s3_bucket_arn}/claim-checks/*"
+      },
+      {
+        # Cheap call used to open the S3 connection at startup
+        Effect = "Allow"
+        Action = [
+          "s3:GetBucketLocation"
+        ]
+        Resource = var.s3_bucket_arn
       }
     ]
   })
@@ -100,6 +116,14 @@ resource "aws_iam_role_policy" "microservice2_policy" {
         ]
         Resource = "${var.s3_bucket_arn}/*"
       },
+      {
+        # Source of server-side copies for claim-check messages
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject"
+        ]
+        Resource = "${var.s3_bucket_arn}/claim-checks/*"
+      },
       {
         Effect = "Allow"
         Action = [
@@ -49,4 +49,8 @@ module "ecs" {
   sqs_queue_url            = module.storage.sqs_queue_url
   s3_bucket_name           = module.storage.s3_bucket_name
   ssm_token_parameter_name = module.storage.ssm_token_parameter_name
+
+  # Rollout switches
+  envelope_codec      = var.envelope_codec
+  claim_check_enabled = var.claim_check_enabled
 }
\ No newline at end of file
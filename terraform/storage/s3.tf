@@ -23,4 +23,26 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "microservice2_upl
       sse_algorithm = "AES256"
     }
   }
-}
\ No newline at end of file
+}
+
+# Claim-check objects are only needed until Microservice 2 has copied them
+resource "aws_s3_bucket_lifecycle_configuration" "microservice2_uploads" {
+  bucket = aws_s3_bucket.microservice2_uploads.id
+
+  rule {
+    id     = "expire-claim-checks"
+    status = "Enabled"
+
+    filter {
+      prefix = "claim-checks/"
+    }
+
+    expiration {
+      days = 7
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
+}
@@ -16,6 +16,18 @@ variable "project_name" {
   default     = "RoyalHA"
 }
 
+variable "envelope_codec" {
+  description = "Codec for SQS message bodies (identity, gzip or zstd); switch only after microservice 2 decodes it"
+  type        = string
+  default     = "identity"
+}
+
+variable "claim_check_enabled" {
+  description = "Offload oversized emails to S3 (claim check); enable only after microservice 2 resolves the pointers"
+  type        = bool
+  default     = false
+}
+
 variable "api_token_default" {
   description = "Default API token value (should be overridden via tfvars in production)"
   type        = string